@@ -0,0 +1,182 @@
+"""
+Headless benchmark suite for the layout and reshade paths.
+
+Every benchmark is timed over a number of repeats, and a single run of it is
+traced with tracemalloc for the peak memory and number of allocations. The
+results can be saved as json and compared against an earlier run.
+
+Run it from the repository root with
+
+    python -m benchmarks.bench_suite --output results.json
+    python -m benchmarks.bench_suite --compare results.json
+
+--quick runs small trees only, to check that the suite itself works.
+"""
+from typing import Any, Callable
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from cheeze import *
+from .generators import layout_wide, layout_deep, layout_nodes, mark_all_dirty, shader_bounds_nodes, shader_bounds_tree, random_rects, random_points
+
+VIEWPORT = LUnit2(1920, 1080)
+
+# Sizes of the trees, the quick ones are for checking that the suite runs
+SIZES = {
+    "full": {"rows": 100, "columns": 50, "depth": 60, "fanout": 8, "bounds_depth": 4, "bounds_fanout": 6, "queries": 200},
+    "quick": {"rows": 5, "columns": 5, "depth": 4, "fanout": 3, "bounds_depth": 2, "bounds_fanout": 3, "queries": 10},
+}
+
+def measure(run: Callable[[], Any], *, setup: Callable[[], Any] = None, repeat: int = 10) -> dict[str, float]:
+    """
+    Time run over repeat runs, setup is called before every run and is not timed
+    """
+    times = []
+    gc.collect()
+    collections = sum(x["collections"] for x in gc.get_stats())
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    collections = sum(x["collections"] for x in gc.get_stats()) - collections
+
+    # Trace the allocations of a single run
+    if setup is not None:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(x.count for x in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+
+    return {
+        "min_ms": min(times)*1000,
+        "median_ms": statistics.median(times)*1000,
+        "gc_collections": collections/repeat,
+        "peak_kib": peak/1024,
+        "live_blocks": blocks,
+    }
+
+def bench_layout(name: str, root: LayoutObject, repeat: int) -> dict[str, dict]:
+    space = LUnit2(1920, 1080*10)
+    root.calculate(space, VIEWPORT)
+    leaves = [x for x in layout_nodes(root) if not hasattr(x, "children")]
+    leaf = leaves[len(leaves)//2]
+
+    return {
+        f"layout_{name}_full": {
+            "nodes": len(layout_nodes(root)),
+            **measure(lambda: root.calculate(space, VIEWPORT), setup=lambda: mark_all_dirty(root), repeat=repeat),
+        },
+        f"layout_{name}_incremental": {
+            "nodes": len(layout_nodes(root)),
+            **measure(lambda: root.calculate(space, VIEWPORT), setup=lambda: setattr(leaf, "dim", leaf.dim), repeat=repeat),
+        },
+    }
+
+def bench_hit_test(root: LayoutObject, queries: int, repeat: int) -> dict[str, dict]:
+    root.calculate(LUnit2(1920, 1080*10), VIEWPORT)
+    points = random_points(queries, root.rendered.as_float())
+    index = LayoutHitIndex(root)
+
+    def query():
+        for x in points:
+            index.node_at(x)
+
+    return {
+        "hit_index_build": {"nodes": len(index._entries), **measure(lambda: LayoutHitIndex(root), repeat=repeat)},
+        "hit_test": {"queries": queries, **measure(query, repeat=repeat)},
+    }
+
+def bench_shader_bounds(depth: int, fanout: int, queries: int, repeat: int) -> dict[str, dict]:
+    bounds = shader_bounds_tree(depth, fanout)
+    nodes = len(shader_bounds_nodes(bounds))
+    rects = random_rects(queries)
+    damage = Region(rects[:queries//10 or 1])
+
+    def query():
+        for x in rects:
+            bounds.check_reshade(x)
+
+    results = {
+        "child_bounds": {"nodes": nodes, **measure(bounds.calculate_child_bounds, repeat=repeat)},
+        "check_reshade": {"queries": queries, **measure(query, repeat=repeat)},
+        "check_reshade_region": {"rects": len(damage), **measure(lambda: bounds.check_reshade(damage, cull_occluded=True), repeat=repeat)},
+    }
+    results["compile"] = {"nodes": nodes, **measure(bounds.compile, repeat=repeat)}
+    results["check_reshade_compiled"] = {"queries": queries, **measure(query, repeat=repeat)}
+    results["check_reshade_region_compiled"] = {"rects": len(damage), **measure(lambda: bounds.check_reshade(damage, cull_occluded=True), repeat=repeat)}
+    return results
+
+def run(quick: bool = False, repeat: int = None) -> dict[str, Any]:
+    """
+    Run all the benchmarks, returns the results along with a description of the machine
+    """
+    sizes = SIZES["quick" if quick else "full"]
+    if repeat is None:
+        repeat = 2 if quick else 10
+
+    results = {}
+    results.update(bench_layout("wide", layout_wide(sizes["rows"], sizes["columns"]), repeat))
+    results.update(bench_layout("deep", layout_deep(sizes["depth"], sizes["fanout"]), repeat))
+    results.update(bench_hit_test(layout_wide(sizes["rows"], sizes["columns"]), sizes["queries"], repeat))
+    results.update(bench_shader_bounds(sizes["bounds_depth"], sizes["bounds_fanout"], sizes["queries"], repeat))
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "repeat": repeat,
+        "results": results,
+    }
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float = 0.2) -> list[str]:
+    """
+    Benchmarks whose median time is slower than the baseline by more than tolerance
+    """
+    regressions = []
+    for (name, x) in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["median_ms"]
+        after = x["median_ms"]
+        if before > 0 and after > before * (1 + tolerance):
+            regressions.append(f"{name}: {before:.3f} ms -> {after:.3f} ms ({after/before:.2f}x)")
+    return regressions
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="save the results as json")
+    parser.add_argument("--compare", help="json results to compare against, exits with 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="how much slower than the baseline is a regression")
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--quick", action="store_true", help="small trees only")
+    args = parser.parse_args(argv)
+
+    results = run(args.quick, args.repeat)
+    for (name, x) in results["results"].items():
+        print(f"{name}:".ljust(32), f"{x['median_ms']:10.3f} ms", f"{x['peak_kib']:10.1f} KiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for x in regressions:
+            print("regression", x)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
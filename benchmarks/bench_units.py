@@ -0,0 +1,102 @@
+"""
+Micro benchmark for the layout units.
+
+Relayouts a large LayoutSequence tree and reports the time taken, the number
+of garbage collections triggered and the peak memory allocated (traced using
+tracemalloc) per relayout.
+
+The same tree is relayouted once more with plain_units, which turns off the
+interning of common values and the reuse of already absolute units, and the
+savings are reported against it. Both runs are in the same process on the
+same tree, so the savings compare across machines and versions of the tree.
+
+Run it from the repository root with
+
+    python -m benchmarks.bench_units
+"""
+import contextlib
+import time
+import tracemalloc
+import gc
+
+from cheeze import *
+from cheeze.layout_manager import units, layout_numpy
+from .generators import layout_wide, mark_all_dirty
+
+@contextlib.contextmanager
+def plain_units():
+    """
+    Every unit is a new object, no values are interned and absolute units are not reused
+    """
+    lunit = units._lunit
+    lunit_abs = units.LUnit.abs
+
+    def plain_lunit(val: float, unit: UNIT) -> LUnit:
+        obj = object.__new__(LUnit)
+        units._set_val(obj, val)
+        units._set_unit(obj, unit)
+        return obj
+
+    def plain_abs(self, space, viewport_space):
+        if self.unit is UNIT.px:
+            return plain_lunit(float(min(self.val, space)), UNIT.px)
+        return lunit_abs(self, space, viewport_space)
+
+    units._lunit = layout_numpy._lunit = plain_lunit
+    units.LUnit.abs = plain_abs
+    try:
+        yield
+    finally:
+        units._lunit = layout_numpy._lunit = lunit
+        units.LUnit.abs = lunit_abs
+
+def bench(rows: int = 100, columns: int = 50, repeat: int = 10):
+    root = layout_wide(rows, columns)
+    space = LUnit2(1920, 1080*rows)
+    viewport = LUnit2(1920, 1080)
+    root.calculate(space, viewport)
+
+    # Time the relayouts
+    total = 0
+    gc.collect()
+    collections = sum(x["collections"] for x in gc.get_stats())
+    for _ in range(repeat):
+        mark_all_dirty(root)
+        start = time.perf_counter()
+        root.calculate(space, viewport)
+        total += time.perf_counter() - start
+    collections = sum(x["collections"] for x in gc.get_stats()) - collections
+
+    # Trace the allocations of a single relayout
+    mark_all_dirty(root)
+    gc.collect()
+    tracemalloc.start()
+    root.calculate(space, viewport)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "nodes": rows*columns + rows + 1,
+        "relayout_ms": total*1000/repeat,
+        "gc_collections": collections/repeat,
+        "peak_kib": peak/1024,
+    }
+
+def compare(**kwargs):
+    """
+    The benchmark with the interned units and with plain_units, and how much is saved
+    """
+    interned = bench(**kwargs)
+    with plain_units():
+        plain = bench(**kwargs)
+    saved = {k: 1 - interned[k]/plain[k] if plain[k] else 0.0 for k in ("relayout_ms", "gc_collections", "peak_kib")}
+    return {"interned": interned, "plain": plain, "saved": saved}
+
+if __name__ == "__main__":
+    results = compare()
+    print("".ljust(20), "interned".rjust(10), "plain".rjust(10), "saved".rjust(8))
+    for k, v in results["interned"].items():
+        line = f"{k}:".ljust(20) + f"{round(v, 3)}".rjust(11) + f"{round(results['plain'][k], 3)}".rjust(11)
+        if k in results["saved"]:
+            line += f"{results['saved'][k]:.0%}".rjust(9)
+        print(line)
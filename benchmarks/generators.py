@@ -0,0 +1,117 @@
+"""
+Synthetic trees for the benchmarks, every generator is deterministic for a given seed.
+"""
+import random
+
+from cheeze import *
+
+# Sizes along the main and cross axis of the generated layout objects, mixing all the units
+SPECS = [
+    ("40 px", "1 f"),
+    ("10 %", "20 px"),
+    ("1 f", "1 f"),
+    ("5 vw", "50 %"),
+    ("2 f", "30 px"),
+    ("3 vh", "80 %"),
+    ("25 %", "2 vh"),
+]
+
+def layout_wide(rows: int, columns: int) -> LayoutSequence:
+    """
+    A column of rows, each row containing columns children
+    """
+    return LayoutSequence(
+        LUnit2("1 f", "1 f"), main_axis="y", cross_axis="x",
+        children=[
+            LayoutSequence(
+                LUnit2("1 f", "40 px"),
+                main_axis_align=MainAxisAlignment.space_between,
+                cross_axis_align=CrossAxisAlignment.center,
+                children=[LayoutSimple(LUnit2(*SPECS[(i + row) % len(SPECS)])) for i in range(columns)]
+            )
+            for row in range(rows)
+        ]
+    )
+
+def layout_deep(depth: int, fanout: int, seed: int = 0) -> LayoutObject:
+    """
+    A tree of nested sequences depth levels deep, alternating between the axes,
+    every sequence has fanout children and one of them nests further
+    """
+    rng = random.Random(seed)
+
+    def build(level: int, axis: str) -> LayoutObject:
+        if level == depth:
+            return LayoutSimple(LUnit2(*rng.choice(SPECS)))
+        cross = "y" if axis == "x" else "x"
+        children = [LayoutSimple(LUnit2(*rng.choice(SPECS))) for _ in range(fanout - 1)]
+        children.insert(rng.randrange(fanout), build(level + 1, cross))
+        return LayoutSequence(
+            LUnit2("1 f", "1 f"), main_axis=axis, cross_axis=cross,
+            main_axis_align=rng.choice(list(MainAxisAlignment)),
+            cross_axis_align=rng.choice(list(CrossAxisAlignment)),
+            children=children
+        )
+
+    return build(0, "x")
+
+def layout_nodes(layout: LayoutObject) -> list[LayoutObject]:
+    """
+    All the layout objects of a tree, children before their parents
+    """
+    nodes = []
+    for x in getattr(layout, "children", ()):
+        nodes.extend(layout_nodes(x))
+    nodes.append(layout)
+    return nodes
+
+def shader_bounds_nodes(bounds: ShaderBounds) -> list[ShaderBounds]:
+    """
+    All the shaderbounds of a tree, in the order they are drawn in
+    """
+    nodes = []
+    stack = [bounds]
+    while stack:
+        x = stack.pop()
+        nodes.append(x)
+        stack.extend(reversed(x.children))
+    return nodes
+
+def mark_all_dirty(layout: LayoutObject):
+    """
+    Force a full relayout of the tree on the next calculate
+    """
+    for x in layout_nodes(layout):
+        x.dim = x.dim
+
+def shader_bounds_tree(depth: int, fanout: int, size: float = 4096, seed: int = 0) -> ShaderBounds:
+    """
+    A tree of shaderbounds with fanout children per level, children are placed inside
+    of their parents but some of them stick out. Half of the shaders are partial
+    shaders and a few are opaque.
+    """
+    rng = random.Random(seed)
+
+    def build(level: int, x: float, y: float, w: float, h: float) -> ShaderBounds:
+        children = []
+        if level < depth:
+            for _ in range(fanout):
+                cw = w * rng.uniform(0.1, 0.5)
+                ch = h * rng.uniform(0.1, 0.5)
+                cx = x + rng.uniform(-0.05, 1) * (w - cw)
+                cy = y + rng.uniform(-0.05, 1) * (h - ch)
+                children.append(build(level + 1, cx, cy, cw, ch))
+        return ShaderBounds(
+            (x, y), (w, h), partial_shader=rng.random() < 0.5, drawable=rng.random() < 0.9,
+            parent=None, children=children, opaque=rng.random() < 0.1
+        )
+
+    return build(0, 0, 0, size, size)
+
+def random_rects(count: int, size: float = 4096, max_size: float = 256, seed: int = 0) -> list[tuple[float, float, float, float]]:
+    rng = random.Random(seed)
+    return [(rng.uniform(0, size), rng.uniform(0, size), rng.uniform(1, max_size), rng.uniform(1, max_size)) for _ in range(count)]
+
+def random_points(count: int, size: tuple[float, float], seed: int = 0) -> list[tuple[float, float]]:
+    rng = random.Random(seed)
+    return [(rng.uniform(0, size[0]), rng.uniform(0, size[1])) for _ in range(count)]
@@ -1,12 +1,24 @@
 from .color_theme import ColorTheme
 from .font_loader import FontLoader
-from .text_theme import TextStyle, TextTheme
+from .text_theme import TextStyle, TextTheme, TextMetrics
 from .build_context import BuildContext
+from .damage_tracker import DamageTracker
+from .scheduler import Scheduler, Timer
+from .frame_timer import FrameTimer
+from .text_cache import TextCache
+from .font_cache import FontCache
 
 __all__ = [
     "ColorTheme",
     "FontLoader",
     "TextStyle",
     "TextTheme",
-    "BuildContext"
+    "TextMetrics",
+    "BuildContext",
+    "DamageTracker",
+    "Scheduler",
+    "Timer",
+    "FrameTimer",
+    "TextCache",
+    "FontCache"
 ]
\ No newline at end of file
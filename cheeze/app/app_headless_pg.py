@@ -0,0 +1,75 @@
+import pygame
+from .app_pg import AppPygame
+from .build_context import BuildContext
+from .scheduler import Scheduler
+from ..layout_manager.region import Region
+from ..widget.widget import Widget
+
+class AppHeadlessPygame(AppPygame):
+    """
+    Runs an app on an offscreen surface, without a window or a display.
+
+    Frames are stepped manually with step, and timers run on the time of the
+    app, which only advances by the dt of every step, so that the same steps
+    always render the same frames. The frame can be read back with get_at,
+    pixels or save.
+    """
+    def __init__(self, size: tuple[int, int] = (700, 500), *, scaling: float = 1, build_context: BuildContext, fps: int = 60, child: Widget, damage_tile_size: int = 32) -> None:
+        super().__init__(size, scaling=scaling, build_context=build_context, fps=fps, child=child, damage_tile_size=damage_tile_size)
+        self.time = 0.0
+        self.scheduler = Scheduler(clock=lambda: self.time)
+        self.build_context.scheduler = self.scheduler
+        self.changed = Region()  # Area of the surface that changed in the last frame
+
+        self.surf = pygame.Surface(size)
+        self.init_compositor()
+
+    def run(self, frames: int = 1, dt: float = None) -> Region:
+        """
+        Step the given number of frames, returns the area that changed over all of them
+        """
+        changed = Region()
+        for _ in range(frames):
+            changed = changed | self.step(dt)
+        return changed
+
+    def step(self, dt: float = None) -> Region:
+        """
+        Advance the app by dt seconds, 1/fps by default, and render a frame.
+        Returns the area of the surface that changed.
+        """
+        if dt is None:
+            dt = 1/self.fps
+        self.time += dt
+        self.frame_timer.begin_frame()
+        self.scheduler.run_due()
+        self.frame_timer.mark("events")
+        self.changed = self.render_frame(dt)
+        self.frame_timer.end_frame()
+        return self.changed
+
+    def present(self, changed: Region):
+        # There is no display to push to
+        self.bytes_pushed = 0
+
+    def resize(self, size: tuple[int, int]):
+        """
+        Render onto a surface of a new size, the layout is calculated again in the next frame
+        """
+        self.surf = pygame.Surface(size)
+        self.init_compositor()
+
+    def get_at(self, pos: tuple[int, int]) -> tuple[int, int, int]:
+        return tuple(self.surf.get_at(pos))[:3]
+
+    def pixels(self):
+        """
+        Copy of the frame as a numpy array of shape (height, width, 3), needs numpy
+        """
+        return pygame.surfarray.array3d(self.surf).swapaxes(0, 1)
+
+    def save(self, path) -> None:
+        """
+        Save the frame as an image, the format is chosen from the file extension
+        """
+        pygame.image.save(self.surf, path)
@@ -1,11 +1,33 @@
 import pygame
 from .build_context import BuildContext
+from .damage_tracker import DamageTracker
+from .compositor_pg import CompositorPygame, _pixel_rect
+from .scheduler import Scheduler, Timer
+from .frame_timer import FrameTimer
+from ..layout_manager.shader_bounds import ShaderBounds
+from ..layout_manager.region import Region
+from ..layout_manager.units import LUnit2
 from ..widget.widget import Widget
 
 class AppPygame:
-    def __init__(self, initial_size: tuple[int, int] = (700, 500), *, scaling: float = 1, build_context: BuildContext, fps: int = 60, child: Widget) -> None:
+    """
+    Runs an app on a pygame window.
+
+    Only the parts of the window that changed are pushed to the display, unless they cover
+    more than full_update_threshold of the window, then the whole window is flipped.
+    bytes_pushed is how much was pushed in the last frame.
+
+    Frames are only drawn at fps while something is changing, that is while there is
+    damage, dynamic widgets or animations. Otherwise the app sleeps until an event
+    comes in, a timer is due or another thread wakes it up.
+
+    The phases of every frame are timed by frame_timer, show_hud draws their
+    timings over the app, it can be toggled with F3.
+    """
+    def __init__(self, initial_size: tuple[int, int] = (700, 500), *, scaling: float = 1, build_context: BuildContext, fps: int = 60, child: Widget, damage_tile_size: int = 32, full_update_threshold: float = 0.6, show_hud: bool = False) -> None:
         pygame.init()
         self.initial_size = initial_size
+        self.size = initial_size
         self.scaling = scaling
         self.build_context = build_context
         self.running = False
@@ -13,8 +35,28 @@ class AppPygame:
         self.shader_bounds_root = None
         self.clock = pygame.time.Clock()
         self.child = child
+        self.damage_tracker = DamageTracker(damage_tile_size)
+        self.build_context.damage_tracker = self.damage_tracker
+        self.wakeup_event = pygame.event.custom_type()
+        self.scheduler = Scheduler(waker=self._post_wakeup)
+        self.build_context.scheduler = self.scheduler
+        self.reshades = []  # What was damaged in the last frame
         self.child.set_build_context(build_context)
-        self.static_surface: pygame.Surface = None
+        self.surf: pygame.Surface = None
+        self.compositor: CompositorPygame = None
+        self._dynamic_shaders = set()  # Shaders on the dynamic layer in the last frame
+
+        self.full_update_threshold = full_update_threshold
+        self.bytes_pushed = 0
+        self.total_bytes_pushed = 0
+        self.full_updates = 0
+        self.partial_updates = 0
+        self.frames = 0
+
+        self.frame_timer = FrameTimer()
+        self.show_hud = show_hud
+        self._hud_rect: pygame.Rect = None  # Where the hud was drawn in the last frame
+        self._hud_font: pygame.font.Font = None
 
     def run(self):
         """
@@ -23,18 +65,298 @@ class AppPygame:
 
         # Initialize surfaces
         self.surf = pygame.display.set_mode(self.initial_size)
-        self.static_surface = pygame.Surface(self.initial_size)
-        self.dynamic_surface = pygame.Surface(self.initial_size)
-        
+        self.init_compositor()
+
         self.running = True
         self.clock = pygame.time.Clock()
 
         while self.running:
-            dt = self.clock.tick(self.fps)/1000  # Delta time
+            dt = self.next_frame()
+
+            self.frame_timer.begin_frame()
             for evt in pygame.event.get():
-                match evt.type:
-                    case pygame.QUIT:
-                        self.running = False
+                self.handle_event(evt)
+            self.scheduler.run_due()
+            if not self.running:
+                break
+            self.frame_timer.mark("events")
+
+            self.present(self.render_frame(dt))
+            self.frame_timer.mark("flip")
+            self.frame_timer.end_frame()
+
+    def next_frame(self) -> float:
+        """
+        Wait until the next frame is due and return the time in seconds to advance it by.
+        After sleeping, the frame is only a frame later, so that an animation started by
+        whatever woke the app up does not skip the time slept for.
+        """
+        if self.is_active():
+            return self.clock.tick(self.fps)/1000
+        self.wait()
+        self.clock.tick()
+        return 1/self.fps
+
+    def is_active(self) -> bool:
+        """
+        If the next frame has to be drawn right away
+        """
+        if self.damage_tracker.has_damage() or self.shader_bounds_root is None:
+            return True
+        if self.child.layout_object is not None and self.child.layout_object.dirty:
+            return True
+        return len(self._dynamic_shaders) > 0  # Dynamic widgets of the last frame, their animations keep going
+
+    def wait(self):
+        """
+        Sleep until an event comes in or the next timer is due
+        """
+        timeout = self.scheduler.time_until_next()
+        if timeout is None:
+            evt = pygame.event.wait()
+        elif timeout > 0:
+            evt = pygame.event.wait(max(1, round(timeout*1000)))
+        else:
+            return
+        self.handle_event(evt)
+
+    def handle_event(self, evt: pygame.event.Event):
+        match evt.type:
+            case pygame.QUIT:
+                self.running = False
+            case pygame.KEYDOWN if evt.key == pygame.K_F3:
+                self.show_hud = not self.show_hud
+
+    def add_timer(self, delay: float, callback, *, repeat: bool = False) -> Timer:
+        """
+        Call callback after delay seconds from the main loop, see Scheduler.add_timer
+        """
+        return self.scheduler.add_timer(delay, callback, repeat=repeat)
+
+    def call_soon_threadsafe(self, callback):
+        """
+        Call callback from the main loop, can be used from any thread
+        """
+        self.scheduler.call_soon_threadsafe(callback)
+
+    def _post_wakeup(self):
+        pygame.event.post(pygame.event.Event(self.wakeup_event))
+
+    def present(self, changed: Region):
+        """
+        Push the changed region of the display surface to the display
+        """
+        w, h = self.size
+        if changed.is_empty():
+            pushed = 0
+        elif changed.area >= self.full_update_threshold * w * h:
+            pygame.display.flip()
+            pushed = w * h
+            self.full_updates += 1
+        else:
+            rects = [_pixel_rect(x) for x in changed]
+            pygame.display.update(rects)
+            pushed = sum(x.w * x.h for x in rects)
+            self.partial_updates += 1
+
+        self.bytes_pushed = pushed * self.surf.get_bytesize()
+        self.total_bytes_pushed += self.bytes_pushed
+
+    def init_compositor(self):
+        """
+        Create the layers for the current display surface, everything is shaded again in the next frame
+        """
+        self.size = self.surf.get_size()
+        try:
+            background = self.build_context.color_theme["background"]
+        except KeyError:
+            background = (0, 0, 0)
+        self.compositor = CompositorPygame(self.size, background)
+        self.shader_bounds_root = None
+        self.damage_tracker.add((0, 0, *self.size))
+
+    def render_frame(self, dt: float):
+        """
+        Advance the app by dt seconds and compose the frame onto the display surface
+        """
+        self.frames += 1
+
+        # Setup all the animation frames
+        self.child.render_frame(dt)
+        self.frame_timer.mark("animation")
+        self.update_layout()
+        self.frame_timer.mark("layout")
+
+        # Widgets moving between the layers have to be reshaded on the static layer
+        dynamic = self.dynamic_widgets()
+        dynamic_shaders = {x.shader for x in dynamic}
+        for x in dynamic_shaders ^ self._dynamic_shaders:
+            if x.shader_bounds is not None:
+                self.damage_tracker.add(x.shader_bounds.get_shadable_rect())
+        self._dynamic_shaders = dynamic_shaders
+
+        # The area under the hud is composed again when it is hidden
+        if self._hud_rect is not None and not self.show_hud:
+            self.damage_tracker.add(tuple(self._hud_rect))
+            self._hud_rect = None
+
+        # Everything damaged during this frame is reshaded at once
+        self.reshades = self.damage_tracker.flush(self.shader_bounds_root)
+        self.frame_timer.mark("reshade")
+        changed = self.compositor.compose(self.surf, self.reshades, self.damage_tracker.damage, dynamic, self.build_context.scaling, self.frame_timer, self.shader_bounds_root)
+        if self.show_hud:
+            changed = changed | self.draw_hud()
+            self.frame_timer.mark("hud")
+        return changed
+
+    def draw_hud(self) -> Region:
+        """
+        Draw the p50/p95/p99 timings of the frame phases at the top left, returns where it was drawn.
+        The hud is drawn over the display surface, so it is drawn again in every frame.
+        """
+        if self._hud_font is None:
+            self._hud_font = pygame.font.Font(None, 16)
+        summary = self.frame_timer.summary()
+        lines = ["phase       p50   p95   p99 (ms)"]
+        for (phase, x) in summary.items():
+            lines.append(f"{phase:<10}{x['p50']:>6.2f}{x['p95']:>6.2f}{x['p99']:>6.2f}")
+
+        rendered = [self._hud_font.render(x, True, (255, 255, 255)) for x in lines]
+        line_height = self._hud_font.get_linesize()
+        rect = pygame.Rect(0, 0, max(x.get_width() for x in rendered) + 8, line_height*len(rendered) + 8)
+        rect = rect.clip(self.surf.get_rect())
+        self.surf.fill((0, 0, 0), rect)
+        for (i, x) in enumerate(rendered):
+            self.surf.blit(x, (4, 4 + i*line_height))
+
+        # What was under a larger hud in the last frame has to be shown again
+        if self._hud_rect is not None and not rect.contains(self._hud_rect):
+            self.damage_tracker.add(tuple(self._hud_rect))
+        self._hud_rect = rect
+        return Region(tuple(rect))
+
+    def update_layout(self):
+        """
+        Calculate the layout if it has changed and update the shader boundaries from it
+        """
+        layout = self.child.layout_object
+        if layout is None:
+            return
+        if layout.dirty or self.shader_bounds_root is None:
+            space = LUnit2(*self.size)
+            layout.calculate(space, space)
+            if self.shader_bounds_root is None:
+                self.build_shader_bounds()
+                self.damage_tracker.add((0, 0, *self.size))
+            else:
+                # Only where widgets moved, resized, appeared or disappeared is shaded again
+                for rect in self.update_shader_bounds():
+                    self.damage_tracker.add(rect)
+
+    def build_shader_bounds(self):
+        """
+        Build the shader boundaries of every widget, nested the same as the widgets
+        """
+        self.shader_bounds_root = ShaderBounds((0, 0), self.size, drawable=False, partial_shader=False, parent=None)
+        self._build_shader_bounds(self.child, self.shader_bounds_root)
+        self.shader_bounds_root.calculate_child_bounds()
+        self.shader_bounds_root.compile()
+
+    def _build_shader_bounds(self, widget: Widget, parent_bounds: ShaderBounds):
+        if widget.shader is not None and widget.layout_object is not None:
+            widget.shader.calculate_shader_boundary(widget.layout_object)
+            parent_bounds.children.append(widget.shader.shader_bounds)
+            widget.shader.shader_bounds.parent_bounds = parent_bounds
+            parent_bounds = widget.shader.shader_bounds
+
+        for x in widget.get_children():
+            self._build_shader_bounds(x, parent_bounds)
+
+    def update_shader_bounds(self) -> list[tuple[float, float, float, float]]:
+        """
+        Bring the shader boundaries up to date with the widgets after a relayout. The tree is
+        kept, only the shaderbounds that moved or resized are refit and the ones of added
+        and removed widgets go through add_child and remove_child.
+
+        Returns the rectangles the changed shaderbounds covered before and after.
+        """
+        damage = []
+        moved = []
+        children = []
+        self._update_shader_bounds(self.child, children, damage, moved)
+        self._set_bounds_children(self.shader_bounds_root, children, damage)
+
+        # The shadable rectangles have changed even where the rendered ones have not
+        bvh = self.shader_bounds_root._compiled_bvh()
+        if bvh is not None:
+            bvh.update_nodes(moved)
+        return damage
+
+    def _update_shader_bounds(self, widget: Widget, children: list[ShaderBounds], damage: list, moved: list):
+        """
+        Update the shaderbounds of the widget and its descendants, the ones that belong
+        to the parent shaderbounds are added to children in the order they are drawn in
+        """
+        if widget.shader is None or widget.layout_object is None:
+            for x in widget.get_children():
+                self._update_shader_bounds(x, children, damage, moved)
+            return
+
+        old = widget.shader.shader_bounds
+        widget.shader.calculate_shader_boundary(widget.layout_object)
+        bounds = widget.shader.shader_bounds
+        changed = False
+        if old is not None:
+            changed = (old.pos, old.size, old.opaque) != (bounds.pos, bounds.size, bounds.opaque)
+            if changed:
+                damage.append(old.get_shadable_rect().as_float())
+                damage.append(bounds.get_shadable_rect().as_float())
+                old.pos, old.size, old.opaque = bounds.pos, bounds.size, bounds.opaque
+                moved.append(old)
+            widget.shader.shader_bounds = bounds = old
+        children.append(bounds)
+
+        own = []
+        for x in widget.get_children():
+            self._update_shader_bounds(x, own, damage, moved)
+        self._set_bounds_children(bounds, own, damage)
+        if changed:
+            bounds.refit()
+
+    def _set_bounds_children(self, bounds: ShaderBounds, children: list[ShaderBounds], damage: list):
+        """
+        Make children the children of bounds, in the same order
+        """
+        if bounds.children == children:
+            return
+        wanted = set(children)
+        for x in [x for x in bounds.children if x not in wanted]:
+            damage.append(x.rendered.as_float())
+            bounds.remove_child(x)
+        current = set(bounds.children)
+        for x in children:
+            if x not in current:
+                bounds.add_child(x)
+                damage.append(x.rendered.as_float())
+
+        # Moved around between their siblings, the order they are drawn in changes
+        if bounds.children != children:
+            damage.extend(x.rendered.as_float() for x in children)
+            bounds.children[:] = children
+            bounds._invalidate_bvh()
+
+    def dynamic_widgets(self) -> list[Widget]:
+        """
+        Widgets that are drawn on the dynamic layer, in the order they are drawn in.
+        Children of dynamic widgets are dynamic as well.
+        """
+        dynamic = []
+        self._dynamic_widgets(self.child, False, dynamic)
+        return dynamic
 
-            # Setup all the animation frames
-            self.child.render_frame(dt)
+    def _dynamic_widgets(self, widget: Widget, dynamic_parent: bool, dynamic: list[Widget]):
+        is_dynamic = dynamic_parent or widget.is_dynamic()
+        if is_dynamic and widget.shader is not None and widget.shader.shader_bounds is not None:
+            dynamic.append(widget)
+        for x in widget.get_children():
+            self._dynamic_widgets(x, is_dynamic, dynamic)
@@ -0,0 +1,183 @@
+"""
+Render many widget trees to images across a pool of processes.
+
+A scene is described by a RenderJob, which names a factory that builds the
+widget tree, so that jobs can be sent to other processes and read from json.
+Every worker builds its BuildContext once, with build_context_factory, so that
+the fonts and shaders are loaded once per worker instead of once per scene.
+
+    python -m cheeze.app.batch_render jobs.jsonl --build-context mymodule:build_context
+
+jobs.jsonl has a RenderJob per line as a json object, the results are written
+as json lines to stdout as soon as they are done.
+"""
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Iterable, Iterator
+from pathlib import Path
+import argparse
+import contextlib
+import dataclasses
+import importlib
+import io
+import json
+import os
+import sys
+import time
+
+from .build_context import BuildContext
+
+FORMATS = ("png", "rgba")
+
+@dataclasses.dataclass(kw_only=True)
+class RenderJob:
+    """
+    factory is called with args and kwargs to build the widget tree, it is either a callable
+    that can be pickled or a "module:name" string. The tree is stepped for frames frames
+    and saved to output, the result holds the encoded image if there is no output.
+    """
+    factory: Callable | str
+    args: tuple = ()
+    kwargs: dict = dataclasses.field(default_factory=dict)
+    size: tuple[int, int] = (700, 500)
+    frames: int = 1
+    format: str = "png"
+    output: str = None
+    id: Any = None  # Given back with the result
+
+
+@dataclasses.dataclass(kw_only=True)
+class RenderResult:
+    id: Any
+    output: str = None
+    data: bytes = None  # Encoded image, if there was no output
+    size: tuple[int, int] = None
+    error: str = None
+    seconds: float = 0
+
+    def as_json(self) -> dict:
+        return {"id": self.id, "output": self.output, "size": self.size, "error": self.error, "seconds": self.seconds}
+
+
+_build_context: BuildContext = None  # BuildContext of the worker process
+
+def _init_worker(build_context_factory: Callable[[], BuildContext] | str) -> None:
+    global _build_context
+    _build_context = _import_object(build_context_factory)()
+
+
+def _import_object(obj: Callable | str) -> Callable:
+    """
+    Import "module:name" strings, anything else is returned as is
+    """
+    if not isinstance(obj, str):
+        return obj
+    module, _, name = obj.partition(":")
+    if not name:
+        raise ValueError(f"expected 'module:name', got {obj!r}")
+    obj = importlib.import_module(module)
+    for x in name.split("."):
+        obj = getattr(obj, x)
+    return obj
+
+
+def render_job(job: RenderJob, build_context: BuildContext = None) -> RenderResult:
+    """
+    Render a single job, with the build context of the worker process if none is given
+    """
+    from .app_headless_pg import AppHeadlessPygame
+    import pygame
+
+    start = time.perf_counter()
+    try:
+        if job.format not in FORMATS:
+            raise ValueError(f"unknown format {job.format!r}, expected one of {FORMATS}")
+        child = _import_object(job.factory)(*job.args, **job.kwargs)
+        app = AppHeadlessPygame(tuple(job.size), build_context=build_context or _build_context, child=child)
+        app.run(job.frames)
+
+        if job.format == "rgba":
+            # The frame has no alpha channel, it is made opaque
+            surf = pygame.Surface(app.surf.get_size(), pygame.SRCALPHA)
+            surf.blit(app.surf, (0, 0))
+            data = pygame.image.tobytes(surf, "RGBA")
+        else:
+            buffer = io.BytesIO()
+            pygame.image.save(app.surf, buffer, "png")
+            data = buffer.getvalue()
+
+        result = RenderResult(id=job.id, size=app.surf.get_size())
+        if job.output is None:
+            result.data = data
+        else:
+            Path(job.output).write_bytes(data)
+            result.output = str(job.output)
+    except Exception as e:
+        result = RenderResult(id=job.id, error=f"{e.__class__.__name__}: {e}")
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def render_batch(jobs: Iterable[RenderJob], *, build_context_factory: Callable[[], BuildContext] | str, workers: int = None, max_pending: int = None) -> Iterator[RenderResult]:
+    """
+    Render all the jobs across workers processes, os.cpu_count() by default, results are
+    yielded in the order they finish. A failed job does not stop the batch, its result has
+    the error set. At most max_pending jobs are submitted at once, so that jobs can be
+    generated lazily. With 0 workers, everything is rendered in this process.
+    """
+    if workers == 0:
+        build_context = _import_object(build_context_factory)()
+        for job in jobs:
+            yield render_job(job, build_context)
+        return
+
+    workers = workers or os.cpu_count()
+    if max_pending is None:
+        max_pending = workers * 4
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(build_context_factory, )) as executor:
+        jobs = iter(jobs)
+        pending = set()
+        while True:
+            for job in jobs:
+                pending.add(executor.submit(render_job, job))
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for x in done:
+                yield x.result()
+
+
+def _read_jobs(file, output_dir: Path, format: str) -> Iterator[RenderJob]:
+    for (i, line) in enumerate(file):
+        if not line.strip():
+            continue
+        job = RenderJob(**{"format": format, **json.loads(line)})
+        if job.id is None:
+            job.id = i
+        if job.output is None:
+            job.output = str(output_dir / f"{job.id}.{job.format}")
+        yield job
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="cheeze-render", description="Render scenes to images across a pool of processes")
+    parser.add_argument("jobs", help="json lines file with a job per line, - for stdin")
+    parser.add_argument("--build-context", required=True, help="module:name of a function that returns the BuildContext")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes, 0 to render in this process")
+    parser.add_argument("--output-dir", default=".", help="directory for the jobs without an output")
+    parser.add_argument("--format", choices=FORMATS, default="png", help="format for the jobs without a format")
+    args = parser.parse_args(argv)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    failed = 0
+    with contextlib.nullcontext(sys.stdin) if args.jobs == "-" else open(args.jobs) as file:  # stdin is left open
+        for result in render_batch(_read_jobs(file, output_dir, args.format), build_context_factory=args.build_context, workers=args.workers):
+            failed += result.error is not None
+            print(json.dumps(result.as_json()), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,10 +8,11 @@ class BuildContext:
         self.shader_pack = shader_pack
         self.text_theme = text_theme
         self.color_theme = color_theme
+        self.damage_tracker = None  # Set by the app
+        self.scheduler = None  # Set by the app
 
         # Set the build context
-        for v in self.shader_pack.shaders.items():
-            v.set_build_context(self)
+        self.shader_pack.set_build_context(self)
         self.text_theme.set_build_context(self)
         self.color_theme.set_build_context(self)
         
\ No newline at end of file
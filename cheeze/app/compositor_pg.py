@@ -0,0 +1,155 @@
+import pygame
+import math
+from ..layout_manager.region import Region
+from ..layout_manager.shader_bounds import ShaderBounds
+from ..shader.shader_object import ShaderObject
+from ..widget.widget import Widget
+from .damage_tracker import _animated_rect
+from .frame_timer import FrameTimer
+
+class CompositorPygame:
+    """
+    Composes the display out of two retained layers.
+
+    The static layer holds everything that does not change by itself, it is only
+    reshaded in the damaged regions of a frame. The dynamic layer is transparent
+    and holds the dynamic and animating widgets, which are shaded every frame.
+
+    Only the parts of the display that changed are composed again, that is the
+    damaged regions and the areas of the dynamic layer from this and the last frame.
+
+    The dynamic layer is composed over the static one, so static widgets drawn after a
+    dynamic widget that overlap it are shaded again onto the dynamic layer, over the
+    area of the dynamic widgets drawn before them. This needs the root shaderbounds.
+    """
+    def __init__(self, size: tuple[int, int], background: tuple = (0, 0, 0)) -> None:
+        self.size = size
+        self.background = background
+        self.static_surface = pygame.Surface(size)
+        self.static_surface.fill(background)
+        self.dynamic_surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.dynamic_region = Region()  # Area drawn onto the dynamic layer in the last frame
+        self.changed = Region()  # Area of the display that changed in the last frame
+
+        # Number of shaders shaded in the last frame
+        self.static_shaded = 0
+        self.dynamic_shaded = 0
+        self.overlay_shaded = 0  # Static shaders shaded over the dynamic layer
+
+    def compose(self, display: pygame.Surface, reshades: list[tuple[ShaderBounds, Region]], damage: Region, dynamic: list[Widget], scaling: float = 1, timer: FrameTimer = None, shader_bounds: ShaderBounds = None) -> Region:
+        """
+        Compose a frame onto the display. reshades and damage are what the damage
+        tracker found to be damaged in this frame, dynamic are the widgets that
+        are drawn on the dynamic layer, in the order they are drawn in. shader_bounds
+        is the root shaderbounds, without it static widgets are always drawn below the
+        dynamic ones.
+
+        Returns the region of the display that changed, the shading and composing are
+        marked on the timer if one is given
+        """
+        screen = Region((0, 0, *self.size))
+        damage = damage & screen
+        dynamic_shaders = {x.shader for x in dynamic}
+
+        # Static layer, only the damaged parts are redrawn
+        self.static_shaded = 0
+        for rect in damage:
+            self.static_surface.fill(self.background, _pixel_rect(rect))
+        for (bounds, regions) in reshades:
+            shader = bounds.parent
+            if not isinstance(shader, ShaderObject) or shader in dynamic_shaders:
+                continue
+            self._shade(shader, self.static_surface, bounds, regions, damage)
+            self.static_shaded += 1
+
+        # Dynamic layer is redrawn every frame
+        for rect in self.dynamic_region:
+            self.dynamic_surface.fill((0, 0, 0, 0), _pixel_rect(rect))
+        rects = []
+        for x in dynamic:
+            x.shader.shade(regions=None, surf=self.dynamic_surface, animation_result=x.animation_result_)
+            rects.append(_animated_rect(x.shader.shader_bounds.get_shadable_rect().as_float(), x.animation_result_, scaling))
+        self.dynamic_shaded = len(dynamic)
+
+        current_dynamic_region = Region(rects) & screen
+        self.overlay_shaded = 0
+        if shader_bounds is not None and not current_dynamic_region.is_empty():
+            self._overlay(shader_bounds, dynamic, rects, current_dynamic_region, dynamic_shaders)
+        if timer is not None:
+            timer.mark("shade")
+
+        self.changed = damage | self.dynamic_region | current_dynamic_region
+        self.dynamic_region = current_dynamic_region
+
+        for rect in self.changed:
+            r = _pixel_rect(rect)
+            display.blit(self.static_surface, r, r)
+            display.blit(self.dynamic_surface, r, r)
+        if timer is not None:
+            timer.mark("compose")
+        return self.changed
+
+    def _overlay(self, root: ShaderBounds, dynamic: list[Widget], rects: list[tuple], region: Region, dynamic_shaders: set) -> None:
+        """
+        Shade the static widgets drawn after dynamic widgets onto the dynamic layer, over them
+        """
+        reshades = root.check_reshade(region)
+        order = _draw_order(root)
+        drawn = sorted((order[x.shader.shader_bounds], rect) for (x, rect) in zip(dynamic, rects))
+        for (bounds, regions) in reshades:
+            shader = bounds.parent
+            if not isinstance(shader, ShaderObject) or shader in dynamic_shaders:
+                continue
+            i = order[bounds]
+            if i < drawn[0][0]:
+                continue
+            below = Region([rect for (j, rect) in drawn if j < i]) & region
+            if not below.is_empty():
+                self._shade(shader, self.dynamic_surface, bounds, regions, below)
+                self.overlay_shaded += 1
+
+    def _shade(self, shader: ShaderObject, surf: pygame.Surface, bounds: ShaderBounds, regions: Region, damage: Region) -> None:
+        if regions is not None:
+            regions = regions & damage
+            if not regions.is_empty():
+                shader.shade(regions=regions, surf=surf)
+            return
+
+        # A whole shader draws everything, it is kept to the damaged part so that it does not draw
+        # over what is not reshaded in this frame
+        clip = surf.get_clip()
+        for rect in damage & bounds.get_shadable_rect():
+            surf.set_clip(_pixel_rect(rect))
+            shader.shade(regions=None, surf=surf)
+        surf.set_clip(clip)
+
+    def resize(self, size: tuple[int, int]) -> None:
+        """
+        The layers are recreated, everything has to be damaged again
+        """
+        self.__init__(size, self.background)
+
+
+def _draw_order(root: ShaderBounds) -> dict[ShaderBounds, int]:
+    """
+    Index of every shaderbounds in the order they are drawn in
+    """
+    bvh = root._compiled_bvh()
+    if bvh is not None:
+        return bvh.index  # Up to date, check_reshade rebuilds it
+    order = {}
+    stack = [root]
+    while stack:
+        x = stack.pop()
+        order[x] = len(order)
+        stack.extend(reversed(x.children))
+    return order
+
+
+def _pixel_rect(rect: tuple[float, float, float, float]) -> pygame.Rect:
+    """
+    Smallest pixel rectangle containing the given rectangle
+    """
+    x0 = math.floor(rect[0])
+    y0 = math.floor(rect[1])
+    return pygame.Rect(x0, y0, math.ceil(rect[0] + rect[2]) - x0, math.ceil(rect[1] + rect[3]) - y0)
@@ -0,0 +1,117 @@
+from ..layout_manager.region import Region
+from ..layout_manager.shader_bounds import ShaderBounds
+from ..layout_manager.units import LRect
+from ..animation.result import AnimationResult
+from typing import Any
+import math
+
+class DamageTracker:
+    """
+    Collects all the rectangles that need to be reshaded during a frame, from
+    Widget.queue_reshade and from animations moving widgets around.
+
+    At the end of the frame, flush coalesces them and does a single reshade query
+    for all of them. The rectangles are snapped outwards to a grid of tile_size
+    pixels, so that many small nearby rectangles become a few larger ones. With a
+    tile_size of None, they are only merged into non-overlapping rectangles.
+
+    submitted and merged are the number of rectangles before and after coalescing
+    in the last flushed frame, total_submitted and total_merged are for all frames.
+    """
+    def __init__(self, tile_size: int = 32) -> None:
+        self.tile_size = tile_size
+        self._pending: list[tuple[float, float, float, float]] = []
+        self.damage = Region()  # Damaged region of the last flushed frame
+
+        self.submitted = 0
+        self.merged = 0
+        self.total_submitted = 0
+        self.total_merged = 0
+        self.frames = 0
+
+    def add(self, rect: tuple[float, float, float, float] | LRect) -> None:
+        """
+        Damage the given rectangle
+        """
+        if isinstance(rect, LRect):
+            rect = rect.as_float()
+        if rect[2] > 0 and rect[3] > 0:
+            self._pending.append(rect)
+
+    def add_animation(self, rect: tuple[float, float, float, float] | LRect, previous: AnimationResult, current: AnimationResult, scaling: float = 1) -> None:
+        """
+        A widget with the given rectangle has gone from the previous to the current animation result,
+        both the area it covered and it covers now are damaged
+        """
+        if isinstance(rect, LRect):
+            rect = rect.as_float()
+        for result in (previous, current):
+            self.add(_animated_rect(rect, result, scaling))
+
+    def has_damage(self) -> bool:
+        return bool(self._pending)
+
+    def coalesce(self) -> Region:
+        """
+        The coalesced region of the damage collected so far
+        """
+        if self.tile_size is None:
+            return Region(self._pending)
+
+        t = self.tile_size
+        tiles = []
+        for (x, y, w, h) in self._pending:
+            x0 = math.floor(x/t)*t
+            y0 = math.floor(y/t)*t
+            tiles.append((x0, y0, math.ceil((x+w)/t)*t - x0, math.ceil((y+h)/t)*t - y0))
+        return Region(tiles)
+
+    def flush(self, shader_bounds: ShaderBounds) -> list[tuple[ShaderBounds, Region]]:
+        """
+        End the frame, returns what needs to be reshaded in the same format as
+        ShaderBounds.check_reshade, every shaderbounds is listed only once and
+        the shaders covered by opaque shaders are culled.
+        """
+        self.damage = self.coalesce()
+        self.submitted = len(self._pending)
+        self.merged = len(self.damage)
+        self.total_submitted += self.submitted
+        self.total_merged += self.merged
+        self.frames += 1
+        self._pending.clear()
+
+        if shader_bounds is None or self.damage.is_empty():
+            return []
+        return shader_bounds.check_reshade(self.damage, cull_occluded=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "total_submitted": self.total_submitted,
+            "total_merged": self.total_merged,
+        }
+
+
+def _animated_rect(rect: tuple[float, float, float, float], result: AnimationResult, scaling: float) -> tuple[float, float, float, float]:
+    """
+    Bounding rectangle of where a widget is drawn with the given animation result
+    """
+    x, y, w, h = rect
+    if result is None:
+        return rect
+
+    cx = x + w/2
+    cy = y + h/2
+    if result.scale is not None:
+        w *= result.scale[0]
+        h *= result.scale[1]
+    if result.rotate:
+        cos = abs(math.cos(result.rotate))
+        sin = abs(math.sin(result.rotate))
+        w, h = w*cos + h*sin, w*sin + h*cos
+    if result.translate is not None:
+        cx += result.translate[0]*scaling
+        cy += result.translate[1]*scaling
+    return (cx - w/2, cy - h/2, w, h)
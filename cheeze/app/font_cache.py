@@ -0,0 +1,57 @@
+from typing import Any, Callable, Hashable
+import collections
+
+class FontCache:
+    """
+    A least recently used cache of loaded fonts, bounded by the number of fonts.
+
+    Font loaders key it by what decides the loaded font, the resolved font file,
+    the pixel size after scaling and the bold and italic styles to apply, so that
+    themes and loaders asking for the same font share it. shared_font_cache is
+    the one used by default by all the font loaders of the process.
+    """
+    def __init__(self, max_fonts: int = 64) -> None:
+        self.max_fonts = max_fonts
+        self._fonts: collections.OrderedDict[Hashable, Any] = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        The cached font for key, otherwise load is called and the font it returns cached
+        """
+        font = self._fonts.get(key)
+        if font is not None:
+            self._fonts.move_to_end(key)
+            self.hits += 1
+            return font
+
+        self.misses += 1
+        font = self._fonts[key] = load()
+        while len(self._fonts) > self.max_fonts:
+            self._fonts.popitem(last=False)
+            self.evictions += 1
+        return font
+
+    def clear(self) -> None:
+        self._fonts.clear()
+
+    def __len__(self) -> int:
+        return len(self._fonts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._fonts
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "fonts": len(self._fonts),
+            "max_fonts": self.max_fonts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+shared_font_cache = FontCache()
@@ -0,0 +1,153 @@
+from typing import Callable
+from pathlib import Path
+import json
+import os
+import sys
+import pygame.sysfont
+
+def _default_cache_path() -> Path:
+    cache = os.environ.get("XDG_CACHE_HOME")
+    return (Path(cache) if cache else Path.home()/".cache")/"cheeze"/"system_fonts.json"
+
+def _font_directories() -> list[str]:
+    """
+    Directories the system fonts are installed in, for the platform
+    """
+    home = Path.home()
+    if sys.platform == "win32":
+        directories = [Path(os.environ.get("WINDIR", "C:\\Windows"))/"Fonts"]
+        if "LOCALAPPDATA" in os.environ:
+            directories.append(Path(os.environ["LOCALAPPDATA"])/"Microsoft"/"Windows"/"Fonts")
+    elif sys.platform == "darwin":
+        directories = [Path("/System/Library/Fonts"), Path("/Library/Fonts"), home/"Library"/"Fonts"]
+    else:
+        data = os.environ.get("XDG_DATA_HOME")
+        directories = [
+            Path("/usr/share/fonts"), Path("/usr/local/share/fonts"),
+            home/".fonts", (Path(data) if data else home/".local"/"share")/"fonts"
+        ]
+    return [str(x) for x in directories]
+
+def _scan_system_fonts() -> dict[str, dict[tuple[bool, bool], str]]:
+    """
+    All the installed fonts, found the same way pygame.font.SysFont finds them
+    """
+    if sys.platform == "win32":
+        return pygame.sysfont.initsysfonts_win32()
+    if sys.platform == "darwin":
+        return pygame.sysfont.initsysfonts_darwin()
+    return pygame.sysfont.initsysfonts_unix()
+
+def _simplename(name: str) -> str:
+    return "".join(c.lower() for c in name if c.isalnum())
+
+
+class SystemFontIndex:
+    """
+    Maps the names of the installed fonts to their files.
+
+    Scanning the system fonts takes seconds on machines with many fonts, so the
+    index is built once and saved to cache_path. The saved index is used for as
+    long as the modification times of the font directories, and the directories
+    in them, stay the same.
+
+    The index is loaded the first time a font is looked up, default_font_index
+    is the one shared by all the font loaders of the process.
+    """
+    version = 1
+
+    def __init__(self, cache_path: Path = None, *, directories: list[str] = None, scan: Callable[[], dict] = _scan_system_fonts) -> None:
+        self.cache_path = Path(cache_path) if cache_path is not None else _default_cache_path()
+        self.directories = directories if directories is not None else _font_directories()
+        self.scan = scan
+        self._fonts: dict[str, dict[tuple[bool, bool], str]] = None
+        self.scanned = False  # If the fonts were scanned instead of loaded from the cache
+
+    def fonts(self) -> dict[str, dict[tuple[bool, bool], str]]:
+        """
+        The installed fonts by their simplified names, with the file of every (bold, italic) style
+        """
+        if self._fonts is None:
+            mtimes = self._mtimes()
+            self._fonts = self._load(mtimes)
+            if self._fonts is None:
+                self.rebuild(mtimes)
+        return self._fonts
+
+    def lookup(self, name: str, bold: bool = False, italic: bool = False) -> tuple[str, bool, bool]:
+        """
+        The file of the font with the given name, and whether bold and italic have to be applied
+        on top of it, the same as pygame.font.SysFont. None if the font is not installed.
+        """
+        styles = self.fonts().get(_simplename(name))
+        if not styles:
+            return None
+        path = styles.get((bold, italic))
+        if path is not None:
+            return path, False, False
+        path = styles.get((False, False))
+        if path is not None:
+            return path, bold, italic
+
+        # Any style, only the missing bold and italic can be applied
+        (style_bold, style_italic), path = next(iter(styles.items()))
+        return path, bold and not style_bold, italic and not style_italic
+
+    def __contains__(self, name: str) -> bool:
+        return _simplename(name) in self.fonts()
+
+    def rebuild(self, mtimes: dict[str, float] = None) -> None:
+        """
+        Scan the installed fonts again and save them to the cache
+        """
+        if mtimes is None:
+            mtimes = self._mtimes()
+        self._fonts = {name: dict(styles) for (name, styles) in self.scan().items()}
+        self.scanned = True
+        data = {
+            "version": self.version,
+            "mtimes": mtimes,
+            "fonts": {name: [[*style, path] for (style, path) in styles.items()] for (name, styles) in self._fonts.items()},
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data))
+            tmp.replace(self.cache_path)
+        except OSError:
+            pass  # The index is rebuilt in the next process as well
+
+    def _load(self, mtimes: dict[str, float]) -> dict[str, dict[tuple[bool, bool], str]]:
+        """
+        The saved index, None if there is none or the fonts have changed since
+        """
+        try:
+            data = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != self.version or data.get("mtimes") != mtimes:
+            return None
+        return {name: {(bool(b), bool(i)): path for (b, i, path) in styles} for (name, styles) in data["fonts"].items()}
+
+    def _mtimes(self) -> dict[str, float]:
+        """
+        Modification times of the font directories and every directory inside of them,
+        a font being added or removed changes the time of the directory it is in
+        """
+        mtimes = {}
+        for directory in self.directories:
+            for (path, _, _) in os.walk(directory):
+                try:
+                    mtimes[path] = os.stat(path).st_mtime
+                except OSError:
+                    pass
+        return mtimes
+
+
+_default_font_index: SystemFontIndex = None
+
+def default_font_index() -> SystemFontIndex:
+    global _default_font_index
+    if _default_font_index is None:
+        _default_font_index = SystemFontIndex()
+    return _default_font_index
@@ -7,6 +7,19 @@ class FontLoader(abc.ABC):
 
     def get_font(self, *, font_name: str, font_size: int, font_bold: bool, font_italic: bool, **kwargs) -> Any:
         raise TypeError(f"class {self.__class__.__name__} does not provide a loading mechanism")
+
+    def measure_text(self, font: Any, text: str):
+        """
+        Measure text with a font returned by get_font without rendering it, returns a TextMetrics
+        """
+        raise TypeError(f"class {self.__class__.__name__} does not provide a measuring mechanism")
+
+    def render_text(self, font: Any, text: str, *, color: tuple, antialias: bool, glyph_atlas: bool = False) -> tuple[Any, int]:
+        """
+        Render text with a font returned by get_font, returns the rendered text and its size in bytes.
+        glyph_atlas asks for the text to be built out of cached glyphs, if the loader supports it.
+        """
+        raise TypeError(f"class {self.__class__.__name__} does not provide a rendering mechanism")
     
     def set_build_context(self, build_context):
         self.build_context = build_context
\ No newline at end of file
@@ -1,13 +1,87 @@
 from .font_loader import FontLoader
+from .font_cache import FontCache, shared_font_cache
+from .font_index_pg import SystemFontIndex, default_font_index
+from .glyph_atlas_pg import GlyphAtlasPygame
+from .text_theme import TextMetrics
 import pygame
 from pathlib import Path
 
 class FontLoaderPygame(FontLoader):
-    def __init__(self, search_directory: Path) -> None:
+    """
+    Loads installed fonts by name, and fonts in search_directory by their file name
+    without the extension. Fonts that are not found fall back to pygame's default font.
+
+    Fonts are shared between the loaders through font_cache, shared_font_cache by default,
+    and the installed fonts are looked up in font_index, default_font_index() by default.
+    The glyph atlases of the last max_glyph_atlases fonts and colors used are kept.
+    """
+    extensions = (".ttf", ".otf")
+
+    def __init__(self, search_directory: Path, *, font_cache: FontCache = None, font_index: SystemFontIndex = None, max_glyph_atlases: int = 16) -> None:
+        super().__init__()
         self.search_directory = Path(search_directory)
+        self.font_cache = font_cache if font_cache is not None else shared_font_cache
+        self.font_index = font_index
+        self.glyph_atlases = FontCache(max_glyph_atlases)  # (font, color, antialias) -> GlyphAtlasPygame
+        self._resolved: dict[tuple[str, bool, bool], tuple[str, bool, bool]] = {}
 
     def get_font(self, *, font_name: str, font_size: int, font_bold: bool, font_italic: bool) -> pygame.font.FontType:
-        if font_name in pygame.font.get_fonts():
-            return pygame.font.SysFont(font_name, int(font_size*self.build_context.scaling), font_bold, font_italic)
-        return pygame.font.Font(self.search_directory/font_name+".ttf", font_size, font_bold, font_italic)
-        
\ No newline at end of file
+        size = max(1, round(font_size*self.build_context.scaling))
+        path, bold, italic = self.resolve(font_name, font_bold, font_italic)
+        return self.font_cache.get((path, size, bold, italic), lambda: self._load(path, size, bold, italic))
+
+    def resolve(self, font_name: str, bold: bool, italic: bool) -> tuple[str, bool, bool]:
+        """
+        The file of the font, None for pygame's default font, and whether bold and italic
+        have to be applied on top of it
+        """
+        key = (font_name, bold, italic)
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            resolved = self._resolved[key] = self._resolve(font_name, bold, italic)
+        return resolved
+
+    def _resolve(self, font_name: str, bold: bool, italic: bool) -> tuple[str, bool, bool]:
+        if self.font_index is None:
+            self.font_index = default_font_index()
+        found = self.font_index.lookup(font_name, bold, italic)
+        if found is not None:
+            return found
+        for extension in self.extensions:
+            path = self.search_directory/(font_name + extension)
+            if path.is_file():
+                return str(path), bold, italic
+        return None, bold, italic
+
+    @staticmethod
+    def _load(path: str, size: int, bold: bool, italic: bool) -> pygame.font.Font:
+        font = pygame.font.Font(path, size)
+        font.set_bold(bold)
+        font.set_italic(italic)
+        return font
+
+    def measure_text(self, font: pygame.font.Font, text: str) -> TextMetrics:
+        lines = text.split("\n")
+        line_height = font.get_linesize()
+        return TextMetrics(
+            width=max(font.size(x)[0] for x in lines),
+            height=line_height*(len(lines) - 1) + font.get_height(),
+            ascent=font.get_ascent(),
+            descent=-font.get_descent(),
+            line_height=line_height,
+            lines=len(lines)
+        )
+
+    def render_text(self, font: pygame.font.Font, text: str, *, color: tuple, antialias: bool, glyph_atlas: bool = False) -> tuple[pygame.Surface, int]:
+        if glyph_atlas:
+            atlas = self.get_glyph_atlas(font, color, antialias)
+            surf = atlas.render(text)
+        else:
+            surf = font.render(text, antialias, color)
+        return surf, surf.get_bytesize() * surf.get_width() * surf.get_height()
+
+    def get_glyph_atlas(self, font: pygame.font.Font, color: tuple, antialias: bool) -> GlyphAtlasPygame:
+        """
+        The glyph atlas of a font in the given color, created on first use
+        """
+        return self.glyph_atlases.get((font, color, antialias), lambda: GlyphAtlasPygame(font, color, antialias))
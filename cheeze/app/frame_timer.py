@@ -0,0 +1,113 @@
+from typing import Any
+import json
+import math
+import time
+
+PHASES = ("events", "animation", "layout", "reshade", "shade", "compose", "hud", "flip")
+
+class FrameTimer:
+    """
+    Times the phases of every frame of an app, the last capacity frames are kept.
+
+    A frame is started with begin_frame, every mark ends the current phase at
+    the time it is called, and end_frame stores the frame. A phase that is marked
+    more than once in a frame adds up. Times are in seconds, the summaries are in
+    milliseconds.
+    """
+    def __init__(self, capacity: int = 240, phases: tuple[str, ...] = PHASES) -> None:
+        self.capacity = capacity
+        self.phases = phases
+        self._phase_index = {x: i for (i, x) in enumerate(phases)}
+
+        # Ring buffer, a row of phase times for every frame plus the total
+        self._frames = [[0.0] * (len(phases) + 1) for _ in range(capacity)]
+        self._next = 0
+        self.count = 0  # Frames stored, including the ones overwritten
+
+        self._current = [0.0] * len(phases)
+        self._start = None
+        self._last = None
+
+    def begin_frame(self) -> None:
+        for i in range(len(self._current)):
+            self._current[i] = 0.0
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """
+        End the given phase, it took the time since the last mark or the start of the frame
+        """
+        if self._start is None:
+            return
+        now = time.perf_counter()
+        self._current[self._phase_index[phase]] += now - self._last
+        self._last = now
+
+    def end_frame(self) -> None:
+        if self._start is None:
+            return
+        row = self._frames[self._next]
+        row[:-1] = self._current
+        row[-1] = self._last - self._start
+        self._next = (self._next + 1) % self.capacity
+        self.count += 1
+        self._start = None
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def frames(self) -> list[dict[str, float]]:
+        """
+        The stored frames from oldest to newest, with the time of every phase and the total
+        """
+        n = len(self)
+        rows = [self._frames[(self._next - n + i) % self.capacity] for i in range(n)]
+        return [{**dict(zip(self.phases, x)), "total": x[-1]} for x in rows]
+
+    def last(self) -> dict[str, float]:
+        if not self.count:
+            return None
+        x = self._frames[(self._next - 1) % self.capacity]
+        return {**dict(zip(self.phases, x)), "total": x[-1]}
+
+    def summary(self, percentiles: tuple[int, ...] = (50, 95, 99)) -> dict[str, dict[str, float]]:
+        """
+        Percentiles, mean and max of every phase and the total in milliseconds
+        """
+        n = len(self)
+        result = {}
+        for (i, phase) in enumerate((*self.phases, "total")):
+            values = sorted(self._frames[j][i]*1000 for j in range(n))
+            stats = {f"p{p}": _percentile(values, p) for p in percentiles}
+            stats["mean"] = sum(values)/n if n else 0.0
+            stats["max"] = values[-1] if n else 0.0
+            result[phase] = stats
+        return result
+
+    def as_json(self) -> dict[str, Any]:
+        return {
+            "frames": len(self),
+            "total_frames": self.count,
+            "summary": self.summary(),
+        }
+
+    def dump(self, path) -> None:
+        """
+        Write the summary as json to the given path
+        """
+        with open(path, "w") as f:
+            json.dump(self.as_json(), f, indent=2)
+
+    def clear(self) -> None:
+        self._next = 0
+        self.count = 0
+        self._start = None
+
+
+def _percentile(values: list[float], p: float) -> float:
+    """
+    Nearest rank percentile of sorted values
+    """
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p/100 * len(values)) - 1)]
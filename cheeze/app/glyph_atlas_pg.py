@@ -0,0 +1,153 @@
+import pygame
+import unicodedata
+
+# Scripts that need shaping, text containing them is rendered as a whole string
+_SHAPED_RANGES = (
+    (0x0590, 0x08FF),  # Hebrew, Arabic, Syriac, Thaana, NKo, Samaritan...
+    (0x0900, 0x0DFF),  # Indic scripts
+    (0x0E00, 0x0FFF),  # Thai, Lao, Tibetan
+    (0x1000, 0x109F),  # Myanmar
+    (0x1780, 0x18AF),  # Khmer, Mongolian
+    (0xFB1D, 0xFDFF),  # Hebrew and Arabic presentation forms
+    (0xFE70, 0xFEFF),  # Arabic presentation forms
+)
+
+def needs_shaping(text: str) -> bool:
+    """
+    If the text can not be drawn glyph by glyph, for combining marks, right to left and complex scripts
+    """
+    for c in text:
+        o = ord(c)
+        if o < 0x0300:
+            continue
+        if unicodedata.combining(c) or unicodedata.category(c) in ("Mn", "Mc", "Me", "Cf"):
+            return True
+        if o > 0xFFFF or any(a <= o <= b for (a, b) in _SHAPED_RANGES):
+            return True
+    return False
+
+
+class GlyphAtlasPygame:
+    """
+    Renders text glyph by glyph out of an atlas, for text that changes often such as
+    clocks and counters.
+
+    Every glyph is rasterized once into the atlas surface, strings are then built by
+    blitting the glyphs at cached advances. The advance of a glyph depends on the
+    glyph after it, so kerning is kept. Text that needs shaping or has glyphs
+    missing from the font is rendered as a whole string by the font.
+
+    Rasterizing is what is saved, so it pays off the most for large and bold or
+    italic text. draw skips the surface of the string altogether.
+    """
+    def __init__(self, font: pygame.font.Font, color: tuple, antialias: bool = True, atlas_width: int = 512) -> None:
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.height = font.get_height()
+
+        self.atlas = pygame.Surface((atlas_width, self.height), pygame.SRCALPHA)
+        self._glyphs: dict[str, pygame.Rect] = {}
+        self._advances: dict[tuple[str, str], int] = {}
+        self._pen = 0  # Where the next glyph goes in the last row of the atlas
+        self._row = 0
+
+        self.rasterized = 0  # Glyphs rasterized so far
+        self.fallbacks = 0  # Strings rendered as a whole
+
+    def render(self, text: str) -> pygame.Surface:
+        """
+        Render the text onto a new surface, the same as font.render
+        """
+        if not self._can_draw(text):
+            self.fallbacks += 1
+            return self.font.render(text, self.antialias, self.color)
+        if not text:
+            return pygame.Surface((0, self.height), pygame.SRCALPHA)
+
+        runs, width = self._runs(text, 0, 0, pygame.BLEND_RGBA_MAX)
+        surf = pygame.Surface((width, self.height), pygame.SRCALPHA)
+        surf.blits(runs, doreturn=False)
+        return surf
+
+    def draw(self, surf: pygame.Surface, pos: tuple[int, int], text: str) -> pygame.Rect:
+        """
+        Draw the text straight onto surf with its top left at pos, without rendering
+        it onto a surface of its own first. Returns the rectangle drawn in.
+        """
+        if not self._can_draw(text):
+            self.fallbacks += 1
+            return surf.blit(self.font.render(text, self.antialias, self.color), pos)
+        if not text:
+            return pygame.Rect(pos, (0, self.height))
+
+        runs, width = self._runs(text, pos[0], pos[1], 0)
+        surf.blits(runs, doreturn=False)
+        return pygame.Rect(pos, (width, self.height))
+
+    def _can_draw(self, text: str) -> bool:
+        return not needs_shaping(text) and all(self._glyph(c) is not None for c in text)
+
+    def _runs(self, text: str, x: int, y: int, flags: int) -> tuple[list, int]:
+        """
+        The blits drawing the text with its top left at (x, y), and the width of the text
+        """
+        glyphs = self._glyphs
+        advances = self._advances
+        atlas = self.atlas
+        start = x
+        runs = []
+        previous = text[0]
+        for c in text[1:]:
+            runs.append((atlas, (x, y), glyphs[previous], flags))
+            advance = advances.get((previous, c))
+            x += advance if advance is not None else self._advance(previous, c)
+            previous = c
+        runs.append((atlas, (x, y), glyphs[previous], flags))
+        return runs, x - start + glyphs[previous].w
+
+    def _advance(self, c: str, after: str) -> int:
+        """
+        Advance of c when it is followed by after, including the kerning between them
+        """
+        pair = (c, after)
+        advance = self._advances.get(pair)
+        if advance is None:
+            advance = self.font.size(c + after)[0] - self.font.size(after)[0]
+            self._advances[pair] = advance
+        return advance
+
+    def _glyph(self, c: str) -> pygame.Rect:
+        """
+        Rectangle of the glyph in the atlas, None if the font does not have it
+        """
+        rect = self._glyphs.get(c)
+        if rect is not None or c in self._glyphs:
+            return rect
+        if self.font.metrics(c)[0] is None:
+            self._glyphs[c] = None
+            return None
+
+        glyph = self.font.render(c, self.antialias, self.color)
+        w, h = glyph.get_size()
+        if self._pen + w > self.atlas.get_width():
+            self._pen = 0
+            self._row += 1
+        y = self._row * self.height
+        if y + h > self.atlas.get_height():
+            self._grow(max(w, self.atlas.get_width()), y + h)
+
+        rect = pygame.Rect(self._pen, y, w, h)
+        if glyph.get_flags() & pygame.SRCALPHA:
+            self.atlas.blit(glyph, rect, special_flags=pygame.BLEND_RGBA_MAX)
+        else:
+            self.atlas.blit(glyph, rect)  # Colorkeyed glyphs without antialiasing
+        self._glyphs[c] = rect
+        self._pen += w
+        self.rasterized += 1
+        return rect
+
+    def _grow(self, width: int, height: int) -> None:
+        atlas = pygame.Surface((width, max(height, self.atlas.get_height()*2)), pygame.SRCALPHA)
+        atlas.blit(self.atlas, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        self.atlas = atlas
@@ -0,0 +1,104 @@
+from typing import Callable
+import collections
+import heapq
+import itertools
+import threading
+import time
+
+class Timer:
+    """
+    A timer registered with a Scheduler, it can be cancelled any time before it runs
+    """
+    __slots__ = ("due", "interval", "callback", "cancelled")
+
+    def __init__(self, due: float, interval: float, callback: Callable[[], None]) -> None:
+        self.due = due
+        self.interval = interval  # None if the timer does not repeat
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Timers and calls from other threads for the main loop of an app.
+
+    The app asks the scheduler how long it can sleep for when there is nothing
+    to draw, and runs whatever is due before every frame. waker is called when
+    another thread schedules something, so that a sleeping main loop wakes up.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic, waker: Callable[[], None] = None) -> None:
+        self.clock = clock
+        self.waker = waker
+        self._timers: list[tuple[float, int, Timer]] = []
+        self._counter = itertools.count()  # Keeps the timers due at the same time in order
+        self._calls = collections.deque()
+        self._lock = threading.Lock()
+
+    def add_timer(self, delay: float, callback: Callable[[], None], *, repeat: bool = False) -> Timer:
+        """
+        Call callback after delay seconds, and every delay seconds after that if repeat is set.
+        Only to be used from the main thread.
+        """
+        timer = Timer(self.clock() + delay, delay if repeat else None, callback)
+        heapq.heappush(self._timers, (timer.due, next(self._counter), timer))
+        return timer
+
+    def call_soon_threadsafe(self, callback: Callable[[], None]) -> None:
+        """
+        Call callback from the main thread before the next frame, can be used from any thread
+        """
+        with self._lock:
+            self._calls.append(callback)
+        self.wakeup()
+
+    def wakeup(self) -> None:
+        """
+        Wake the main loop up, can be used from any thread
+        """
+        if self.waker is not None:
+            self.waker()
+
+    def time_until_next(self) -> float:
+        """
+        Seconds until something is due, None if nothing is scheduled
+        """
+        if self._calls:
+            return 0
+        while self._timers and self._timers[0][2].cancelled:
+            heapq.heappop(self._timers)
+        if not self._timers:
+            return None
+        return max(0, self._timers[0][0] - self.clock())
+
+    def run_due(self) -> int:
+        """
+        Run the calls from other threads and the timers that are due, returns how many were run
+        """
+        with self._lock:
+            calls = list(self._calls)
+            self._calls.clear()
+        for callback in calls:
+            callback()
+        count = len(calls)
+
+        now = self.clock()
+        due = []
+        while self._timers and self._timers[0][0] <= now:
+            due.append(heapq.heappop(self._timers)[2])
+
+        for timer in due:
+            if timer.cancelled:
+                continue
+            if timer.interval is not None:
+                # Repeating timers do not drift, but skip the runs that were missed
+                timer.due = max(timer.due + timer.interval, now)
+                heapq.heappush(self._timers, (timer.due, next(self._counter), timer))
+            timer.callback()
+            count += 1
+        return count
+
+    def __len__(self) -> int:
+        return sum(1 for x in self._timers if not x[2].cancelled) + len(self._calls)
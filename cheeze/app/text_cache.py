@@ -0,0 +1,72 @@
+from typing import Any, Callable, Hashable
+import collections
+
+class TextCache:
+    """
+    A least recently used cache for rendered text, bounded by the total size in bytes
+    of what it holds.
+
+    Keys are whatever decides how the text looks, (style, text, color, scaling, antialias)
+    for TextTheme.render_text, so the same text in the same style is only rendered once
+    for as long as it stays in the cache. Anything larger than max_bytes on its own is
+    rendered but never cached.
+    """
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: collections.OrderedDict[Hashable, tuple[Any, int]] = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, render: Callable[[], tuple[Any, int]]) -> Any:
+        """
+        The cached value for key, otherwise render is called and its result cached.
+        render returns the value along with its size in bytes.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        value, nbytes = render()
+        if nbytes <= self.max_bytes:
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            self._evict()
+        return value
+
+    def _evict(self) -> None:
+        while self.bytes > self.max_bytes:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.bytes -= nbytes
+            self.evictions += 1
+
+    def resize(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits/lookups if lookups else 0.0,
+        }
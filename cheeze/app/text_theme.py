@@ -1,16 +1,22 @@
 from .font_loader import FontLoader
+from .text_cache import TextCache
+from typing import Any
 import dataclasses
 
 @dataclasses.dataclass(kw_only=True, frozen=True, unsafe_hash=True)
 class TextStyle:
     """
     A text style object
+
+    glyph_atlas builds the text out of cached glyphs instead of rendering every
+    string, for text that changes often such as counters.
     """
     font: str
     size: int
     bold: bool = False
     italic: bool = False
     color: str
+    glyph_atlas: bool = False
 
     def with_changes(self, **kwargs):
         args = {
@@ -18,18 +24,41 @@ class TextStyle:
             "size": self.size,
             "bold": self.bold,
             "italic": self.italic,
+            "color": self.color,
+            "glyph_atlas": self.glyph_atlas,
         }
 
         args.update(kwargs)
         return TextStyle(**args)
 
+@dataclasses.dataclass(kw_only=True, frozen=True)
+class TextMetrics:
+    """
+    Size of a text in pixels, measured from the font metrics without rendering it.
+    Every line of the text is line_height apart.
+    """
+    width: float
+    height: float
+    ascent: float
+    descent: float
+    line_height: float
+    lines: int = 1
+
+    @property
+    def size(self) -> tuple[float, float]:
+        return (self.width, self.height)
+
 class TextTheme:
     """
     Text theme for the app. Requires a font loader object
+
+    Rendered text is kept in text_cache and measured text in measure_cache, they are shared
+    with the themes made by with_changes. Fonts are cached by the font loader.
     """
-    def __init__(self, *, font_loader: FontLoader, **kwargs: dict[str, TextStyle]) -> None:
+    def __init__(self, *, font_loader: FontLoader, text_cache: TextCache = None, measure_cache: TextCache = None, **kwargs: dict[str, TextStyle]) -> None:
         self.font_loader = font_loader
-        self.font_cache = {}
+        self.text_cache = text_cache if text_cache is not None else TextCache()
+        self.measure_cache = measure_cache if measure_cache is not None else TextCache(max_bytes=1024 * 1024)
         self.styles: dict[str, TextStyle] = kwargs
         self.build_context = None
 
@@ -38,27 +67,53 @@ class TextTheme:
     
     def get_style_font(self, style: str):
         styleobj = self.styles[style]
-
-        # Return the cached font
-        if style in self.font_cache:
-            return self.font_cache[style]
-        
-        # Load the font from disk
-        font = self.font_loader.get_font(
+        return self.font_loader.get_font(
             font_name=styleobj.font,
             font_size=styleobj.size,
             font_bold=styleobj.bold,
             font_italic=styleobj.italic
         )
 
-        self.font_cache[style] = font
-        return font
+    def get_style_color(self, style: str) -> tuple:
+        """
+        Color of the style, names are looked up in the color theme
+        """
+        color = self.styles[style].color
+        if isinstance(color, str):
+            return self.build_context.color_theme[color]
+        return color
+
+    def measure_text(self, style: str, text: str) -> TextMetrics:
+        """
+        Size of the text in the given style, without rendering it. Memoized per style and text.
+        """
+        styleobj = self.styles[style]
+        key = (styleobj, text, self.build_context.scaling)
+        return self.measure_cache.get(key, lambda: (self.font_loader.measure_text(self.get_style_font(style), text), len(text) + 128))
+
+    def render_text(self, style: str, text: str, *, color: tuple = None, antialias: bool = True) -> Any:
+        """
+        Render text in the given style, in the color of the style unless another color is given.
+        The same text in the same style is only rendered once while it stays in the text cache.
+
+        Styles using a glyph atlas skip the text cache, their text changes too often to be
+        worth keeping and is cheap to build again.
+        """
+        if color is None:
+            color = self.get_style_color(style)
+        color = tuple(color)
+        styleobj = self.styles[style]
+        if styleobj.glyph_atlas:
+            return self.font_loader.render_text(self.get_style_font(style), text, color=color, antialias=antialias, glyph_atlas=True)[0]
+
+        key = (styleobj, text, color, self.build_context.scaling, antialias)
+        return self.text_cache.get(key, lambda: self.font_loader.render_text(self.get_style_font(style), text, color=color, antialias=antialias))
     
     def with_changes(self, **kwargs: dict[str, TextStyle]):
         new_styles = self.styles.copy()
         new_styles.update(kwargs)
 
-        return TextTheme(font_loader=self.font_loader, **new_styles)
+        return TextTheme(font_loader=self.font_loader, text_cache=self.text_cache, measure_cache=self.measure_cache, **new_styles)
     
     def set_build_context(self, build_context):
         self.font_loader.set_build_context(build_context)
@@ -1,25 +1,84 @@
 from ..shader.shader_pg import ShaderPygame
 from ..shader import *
+from ..layout_manager.region import Region
+from ..layout_manager.layout_paragraph import LayoutParagraph
 import pygame as pg
 
 
 class LabelShader(ShaderPygame):
+    """
+    Draws a single line of text. The text is only rendered once the label is shaded,
+    labels that are never drawn are never rendered.
+    """
+    shadername = "label"
+
     def __init__(self, *, text: str, style: str = "normal") -> None:
-        super().__init__("label")
+        super().__init__()
         self.style = style
         self.text = text
-    
-    def set_build_context(self, buildcontext):
-        super().set_build_context(buildcontext)
-        self.set_text(self.text)
-    
+        self._label_surface: pg.Surface = None
+
     def set_text(self, text):
         self.text = text
-        self.label_surface = self.build_context.text_theme.get_style_font(self.style).render(self.text, True, self.build_context.text_theme.get_style().color)
-        
+        self._label_surface = None
+        if self.shader_bounds is not None and self.build_context.damage_tracker is not None:
+            self.build_context.damage_tracker.add(self.shader_bounds.get_shadable_rect())
+
+    @property
+    def label_surface(self) -> pg.Surface:
+        if self._label_surface is None:
+            self._label_surface = self.build_context.text_theme.render_text(self.style, self.text)
+        return self._label_surface
+
+    def shade(self, *, regions: Region = None, surf: pg.Surface, **kwargs):
+        rect = self.shader_bounds.get_shadable_rect().as_float()
+        clip = surf.get_clip()
+        if regions is None:
+            regions = [rect]
+        for x in regions:
+            surf.set_clip(pg.Rect(x).clip(clip))
+            surf.blit(self.label_surface, rect[:2])
+        surf.set_clip(clip)
+
+
+class ParagraphShader(ShaderPygame):
+    """
+    Draws the wrapped lines of a LayoutParagraph, a line at a time. Lines are rendered
+    through the text cache, so the lines that stay the same after a resize or an edit
+    are not rendered again. Only the lines inside of the reshaded regions are drawn.
+    """
+    shadername = "paragraph"
+
+    def __init__(self, *, style: str = "normal") -> None:
+        super().__init__(partial_shader=True)
+        self.style = style
+        self.layout_object: LayoutParagraph = None
+
+    def calculate_shader_boundary(self, layout_object: LayoutParagraph):
+        self.layout_object = layout_object
+        super().calculate_shader_boundary(layout_object)
+
+    def shade(self, *, regions: Region = None, surf: pg.Surface, **kwargs):
+        x, y, w, h = self.shader_bounds.get_shadable_rect().as_float()
+        if regions is None:
+            regions = Region((x, y, w, h))
+        theme = self.build_context.text_theme
+        line_height = self.layout_object.line_height
+
+        clip = surf.get_clip()
+        for (rx, ry, rw, rh) in regions:
+            surf.set_clip(pg.Rect(rx, ry, rw, rh).clip(clip))
+            first = max(0, int((ry - y) // line_height))
+            last = int((ry + rh - y) // line_height) + 1
+            for (i, line) in enumerate(self.layout_object.lines(first=first, last=last), first):
+                if line:
+                    surf.blit(theme.render_text(self.style, line), (x, y + i*line_height))
+        surf.set_clip(clip)
+
 
 def get_default_shaderpack():
     return ShaderPack(
         "default",
-        LabelShader
+        LabelShader,
+        ParagraphShader
     )
@@ -0,0 +1,76 @@
+from ..widget.widget import Widget
+from ..layout_manager.layout_simple import LayoutSimple
+from ..layout_manager.layout_paragraph import LayoutParagraph
+from ..layout_manager.units import LUnit2
+
+class Label(Widget):
+    """
+    A single line of text, drawn by the "label" shader.
+
+    The preferred size of its layout object is the measured size of the text, so the
+    text is not rendered to lay it out. Without a size, the label is exactly as large
+    as its text.
+    """
+    def __init__(self, text: str, *, style: str = "normal", size: LUnit2 = None) -> None:
+        super().__init__("label")
+        self.text = text
+        self.style = style
+        self.size = size
+
+    def init(self):
+        if self.shader is None:
+            self.shader = self.shader_cls(text=self.text, style=self.style)
+            self.shader.set_build_context(self.build_context)
+            self.layout_object = LayoutSimple(self.size if self.size is not None else LUnit2(0, 0))
+            self.update_preferred()
+        super().init()
+
+    def set_text(self, text: str):
+        """
+        Change the text, the label is laid out again if the size of the text changes
+        """
+        self.text = text
+        self.shader.set_text(text)
+        self.update_preferred()
+
+    def update_preferred(self):
+        size = self.build_context.text_theme.measure_text(self.style, self.text).size
+        if self.size is None and self.layout_object.dim.as_float() != size:
+            self.layout_object.dim = LUnit2(*size)
+        if self.layout_object.preferred != size:
+            self.layout_object.preferred = size
+
+
+class Paragraph(Widget):
+    """
+    Multi-line text wrapped to the width it is given, drawn by the "paragraph" shader.
+    Its height follows from its width, see LayoutParagraph.
+    """
+    def __init__(self, text: str, *, style: str = "normal", size: LUnit2 = ("1 f", "0 px"), wrap: str = "greedy") -> None:
+        super().__init__("paragraph")
+        self.text = text
+        self.style = style
+        self.size = size
+        self.wrap = wrap
+
+    def init(self):
+        if self.shader is None:
+            theme = self.build_context.text_theme
+            self.shader = self.shader_cls(style=self.style)
+            self.shader.set_build_context(self.build_context)
+            self.layout_object = LayoutParagraph(
+                self.text,
+                measure=lambda x: theme.measure_text(self.style, x).width,
+                line_height=theme.measure_text(self.style, "").line_height,
+                size=self.size,
+                wrap=self.wrap
+            )
+        super().init()
+
+    def set_text(self, text: str):
+        """
+        Change the text, it is wrapped again from the first changed line
+        """
+        self.text = text
+        self.layout_object.set_text(text)
+        self.queue_reshade()
@@ -1,16 +1,25 @@
 from .layout_simple import LayoutSimple
 from .layout_sequence import LayoutSequence
+from .layout_virtual import LayoutVirtualSequence
+from .layout_paragraph import LayoutParagraph
 from .layout_object import LayoutObject
 from .alignment import MainAxisAlignment, CrossAxisAlignment
 from .units import UNIT, LUnit2, LUnit, LRect
-from .shader_bounds import ShaderBounds
+from .shader_bounds import ShaderBounds, ShaderBoundsBVH
+from .region import Region
+from .hit_index import LayoutHitIndex
 
 # All items to be rexported
 __all__ = [
     "LayoutSimple",
     "LayoutSequence",
+    "LayoutVirtualSequence",
+    "LayoutParagraph",
     "LayoutObject",
     "ShaderBounds",
+    "ShaderBoundsBVH",
+    "Region",
+    "LayoutHitIndex",
     "MainAxisAlignment",
     "CrossAxisAlignment",
     "UNIT",
@@ -73,8 +73,9 @@ def align_space_between(space: float, spaces: list[float]):
     in case that there is only a single object, the object is centered
     [            (1)             ]
     """
-    if len(spaces) < 1:
-        return align_center(space, spaces)
+    if len(spaces) <= 1:
+        yield from align_center(space, spaces)
+        return
     free_space = space - sum(spaces)
     free_spacer = free_space / (len(spaces)-1)
     pos = 0
@@ -0,0 +1,152 @@
+from .layout_object import LayoutObject
+from .units import LRect
+from .utils import _collides_rect
+import math
+
+class _Entry:
+    """
+    What the index knows about a layout object
+    """
+    __slots__ = ("current", "pos", "size", "path", "cells", "children")
+
+    def __init__(self, current, pos, size, path, cells, children) -> None:
+        self.current = current
+        self.pos = pos
+        self.size = size
+        self.path = path
+        self.cells = cells
+        self.children = children
+
+
+class LayoutHitIndex:
+    """
+    A uniform grid spatial index over the rendered rectangles of a layout tree, used
+    for hit-testing without testing every layout object.
+
+    Layout objects are drawn in tree order (a parent below its children, later
+    children above earlier ones), so the topmost layout object at a point is
+    the last one in that order.
+
+    After a layout tree has been recalculated, update only revisits the
+    subtrees that were relaid out or moved.
+    """
+    def __init__(self, root: LayoutObject, cell_size: float = 64) -> None:
+        self.root = root
+        self.cell_size = cell_size
+        self._entries: dict[LayoutObject, _Entry] = {}
+        self._cells: dict[tuple[int, int], set[LayoutObject]] = {}
+        self.update()
+
+    def update(self) -> None:
+        """
+        Bring the index up to date with the layout tree
+        """
+        self._update(self.root, ())
+
+    def _update(self, node: LayoutObject, path: tuple[int, ...]) -> None:
+        entry = self._entries.get(node)
+        pos = node.pos.as_float()
+        size = node.rendered.as_float()
+
+        # The layout of a subtree only changes when its root is relaid out, moved or constrained
+        if entry is not None and entry.current is node._current and entry.pos == pos and entry.size == size and entry.path == path:
+            return
+
+        children = list(getattr(node, "children", ()))
+
+        if entry is None:
+            entry = _Entry(None, None, None, None, (), ())
+            self._entries[node] = entry
+
+        if entry.pos != pos or entry.size != size:
+            self._unbin(node, entry.cells)
+            entry.cells = self._cells_of(pos, size)
+            self._bin(node, entry.cells)
+
+        # Forget about the children that are not there anymore
+        if entry.children:
+            current_children = set(children)
+            for x in entry.children:
+                if x not in current_children:
+                    self._remove(x)
+
+        entry.current = node._current
+        entry.pos = pos
+        entry.size = size
+        entry.path = path
+        entry.children = children
+
+        for i, x in enumerate(children):
+            self._update(x, path + (i, ))
+
+    def _remove(self, node: LayoutObject) -> None:
+        entry = self._entries.pop(node, None)
+        if entry is None:
+            return
+        self._unbin(node, entry.cells)
+        for x in entry.children:
+            self._remove(x)
+
+    def _cells_of(self, pos: tuple[float, float], size: tuple[float, float]) -> list[tuple[int, int]]:
+        if size[0] <= 0 or size[1] <= 0:
+            return []
+        x0 = math.floor(pos[0]/self.cell_size)
+        y0 = math.floor(pos[1]/self.cell_size)
+        x1 = math.floor((pos[0]+size[0])/self.cell_size)
+        y1 = math.floor((pos[1]+size[1])/self.cell_size)
+        return [(x, y) for x in range(x0, x1+1) for y in range(y0, y1+1)]
+
+    def _bin(self, node: LayoutObject, cells) -> None:
+        for c in cells:
+            self._cells.setdefault(c, set()).add(node)
+
+    def _unbin(self, node: LayoutObject, cells) -> None:
+        for c in cells:
+            bucket = self._cells[c]
+            bucket.discard(node)
+            if not bucket:
+                del self._cells[c]
+
+    def nodes_at(self, point: tuple[float, float]) -> list[LayoutObject]:
+        """
+        All the layout objects at the given point, bottommost first
+        """
+        cell = (math.floor(point[0]/self.cell_size), math.floor(point[1]/self.cell_size))
+        hits = []
+        for x in self._cells.get(cell, ()):
+            entry = self._entries[x]
+            if _collides_rect(point, entry.pos, entry.size):
+                hits.append(x)
+        hits.sort(key=lambda x: self._entries[x].path)
+        return hits
+
+    def node_at(self, point: tuple[float, float]) -> LayoutObject:
+        """
+        The topmost layout object at the given point, None if there isn't any
+        """
+        cell = (math.floor(point[0]/self.cell_size), math.floor(point[1]/self.cell_size))
+        top = None
+        top_path = None
+        for x in self._cells.get(cell, ()):
+            entry = self._entries[x]
+            if _collides_rect(point, entry.pos, entry.size) and (top_path is None or entry.path > top_path):
+                top = x
+                top_path = entry.path
+        return top
+
+    def nodes_in_rect(self, rect: tuple[float, float, float, float]) -> list[LayoutObject]:
+        """
+        All the layout objects intersecting the given (x, y, w, h) rectangle, bottommost first
+        """
+        r = LRect(rect[:2], rect[2:])
+        found = set()
+        for c in self._cells_of(r.pos, r.size):
+            for x in self._cells.get(c, ()):
+                if x not in found:
+                    entry = self._entries[x]
+                    if r.collides_withr(LRect(entry.pos, entry.size)):
+                        found.add(x)
+        return sorted(found, key=lambda x: self._entries[x].path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,223 @@
+"""
+Vectorized layout engine for LayoutSequence, used when numpy is available.
+
+The children of a sequence are packed into unit code, value and preferred
+size arrays. Unit resolution, flex distribution and alignment are then done
+using array operations. The floating point operations are done in the same
+order as the python engine (LayoutSequence.render_children) so that the
+results are identical.
+
+Children that are plain layout objects (that do not override render) are
+rendered directly from the arrays, other children are still relayouted
+one by one.
+"""
+from .layout_object import LayoutObject
+from .alignment import MainAxisAlignment, CrossAxisAlignment
+from .units import UNIT, LUnit2, _lunit, _lunit2
+from .utils import _float0
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+available = np is not None
+
+_ZERO = LUnit2(0, 0)
+
+def _abs(codes, vals, space, viewport: tuple[float, float]):
+    """
+    Vectorized version of LUnit.abs, space can either be a float or an array
+    """
+    space = np.broadcast_to(np.asarray(space, dtype=np.float64), vals.shape)
+    return np.select(
+        [
+            codes == UNIT.px.value,
+            codes == UNIT.percent.value,
+            codes == UNIT.vh.value,
+            codes == UNIT.vw.value,
+        ],
+        [
+            np.minimum(space, vals),
+            np.minimum(space, vals*space/100),
+            np.minimum(space, np.minimum(vals, 100)*viewport[1]/100),
+            np.minimum(space, np.minimum(vals, 100)*viewport[0]/100),
+        ],
+        space  # Flex units occupy all the space
+    )
+
+def _accumulate(start: float, steps):
+    """
+    Sequentially accumulate the steps from the start value, returns all the partial
+    values including start and excluding the final one
+    """
+    return np.add.accumulate(np.concatenate(((start, ), steps[:-1])))
+
+def _align_main(space: float, sizes, alignment: MainAxisAlignment):
+    """
+    Vectorized version of alignment.align
+    """
+    n = len(sizes)
+    if alignment == MainAxisAlignment.start:
+        return _accumulate(0.0, sizes)
+
+    # The builtin sum is used, as the python engine does
+    total = sum(sizes.tolist())
+    if alignment == MainAxisAlignment.end:
+        return _accumulate(space - total, sizes)
+    elif alignment == MainAxisAlignment.center or (alignment == MainAxisAlignment.space_between and n <= 1):
+        return _accumulate((space - total)/2, sizes)
+    elif alignment == MainAxisAlignment.space_around:
+        free_spacer = (space - total) / (n+1)
+        return _accumulate(free_spacer, sizes + free_spacer)
+    elif alignment == MainAxisAlignment.space_between:
+        free_spacer = (space - total) / (n-1)
+        return _accumulate(0.0, sizes + free_spacer)
+    raise TypeError(f"Unknown alignment: {alignment}")
+
+def _align_cross(space: float, sizes, alignment: CrossAxisAlignment):
+    """
+    Vectorized alignment of every child individually along the cross axis
+    """
+    if alignment == CrossAxisAlignment.start:
+        return np.zeros(len(sizes))
+    elif alignment == CrossAxisAlignment.center:
+        return (space - sizes)/2
+    elif alignment == CrossAxisAlignment.end:
+        return space - sizes
+    raise TypeError(f"Unknown alignment: {alignment}")
+
+def render_children(sequence, space: LUnit2, viewport: LUnit2) -> None:
+    """
+    Same as LayoutSequence.render_children but solved using numpy
+    """
+    children = sequence.children
+    n = len(children)
+    if n == 0:
+        return
+
+    main_axis = sequence.main_axis
+    main_x = main_axis == "x"
+    main_axis_size = getattr(space, main_axis).val
+    cross_axis_size = getattr(space, sequence.cross_axis).val
+    viewport_f = viewport.as_float()
+
+    # Pack the children into arrays
+    main_units = [getattr(x.dim, main_axis) for x in children]
+    cross_units = [getattr(x.dim, sequence.cross_axis) for x in children]
+    main_codes = np.fromiter((x.unit._value_ for x in main_units), np.int8, n)
+    main_vals = np.fromiter((x.val for x in main_units), np.float64, n)
+    cross_codes = np.fromiter((x.unit._value_ for x in cross_units), np.int8, n)
+    cross_vals = np.fromiter((x.val for x in cross_units), np.float64, n)
+    leaf = np.fromiter((type(x).render is LayoutObject.render for x in children), bool, n)
+
+    # The main axis space given to every child, nan if the child was not rendered
+    main_space = np.full(n, np.nan)
+    rendered_main = np.fromiter((getattr(x.rendered, main_axis).val for x in children), np.float64, n)
+
+    # Absolute and percentage sized children get the whole space
+    fixed = main_codes != UNIT.f.value
+    fixed_idx = np.nonzero(fixed)[0]
+    main_space[fixed_idx] = main_axis_size
+    rendered_main[fixed & leaf] = _abs(main_codes[fixed & leaf], main_vals[fixed & leaf], main_axis_size, viewport_f)
+    for i in np.nonzero(fixed & ~leaf)[0].tolist():
+        x = children[i]
+        x.relayout(space, viewport, _ZERO)
+        rendered_main[i] = getattr(x.rendered, main_axis).val
+
+    natural_main = rendered_main.copy()
+
+    # Constrain the children that do not fit, everything before the first child exceeding
+    # the space is unaffected. The rest is done in python to keep the floating point operations same.
+    fixed_main = rendered_main[fixed_idx]
+    total_size = 0
+    if len(fixed_idx):
+        cumulative = np.cumsum(fixed_main)
+        exceeding = np.nonzero(cumulative > main_axis_size)[0]
+        if len(exceeding) == 0:
+            total_size = cumulative[-1].item()
+        else:
+            k = exceeding[0].item()
+            total_size = 0 if k == 0 else cumulative[k-1].item()
+            for j in range(k, len(fixed_idx)):
+                val = fixed_main[j].item()
+                if total_size + val > main_axis_size:
+                    val = main_axis_size-total_size
+                total_size = min(total_size + val, main_axis_size)
+                fixed_main[j] = val
+            rendered_main[fixed_idx] = fixed_main
+
+    # Flex children
+    flex_idx = np.nonzero(~fixed)[0]
+    flex_vals = main_vals[flex_idx]
+    flex_count = np.cumsum(flex_vals)[-1].item() if len(flex_idx) else 0
+    flex_space_left = main_axis_size-total_size
+    extensible_idx = flex_idx[:0]
+
+    if flex_count != 0:
+        # FIRST PASS, children whose minimum size is not satisfied get their minimum size
+        flex_unit_val = flex_space_left/flex_count
+        preferred = np.fromiter((_float0(children[i].preferred[sequence.main_axis_num]) for i in flex_idx.tolist()), np.float64, len(flex_idx))
+        minimum = preferred > flex_unit_val*flex_vals
+        main_space[flex_idx[minimum]] = preferred[minimum]
+        flex_count = np.subtract.accumulate(np.concatenate(((flex_count, ), flex_vals[minimum])))[-1].item()
+        flex_space_left = np.subtract.accumulate(np.concatenate(((flex_space_left, ), preferred[minimum])))[-1].item()
+        extensible_idx = flex_idx[~minimum]
+
+    # SECOND PASS, distribute the space left
+    if flex_count > 0:
+        flex_unit_val = flex_space_left/flex_count
+        main_space[extensible_idx] = flex_unit_val*main_vals[extensible_idx]
+
+    flex_rendered = flex_idx[~np.isnan(main_space[flex_idx])]
+    rendered_main[flex_rendered[leaf[flex_rendered]]] = main_space[flex_rendered[leaf[flex_rendered]]]
+    natural_main[flex_rendered[leaf[flex_rendered]]] = main_space[flex_rendered[leaf[flex_rendered]]]
+    for i in flex_rendered[~leaf[flex_rendered]].tolist():
+        x = children[i]
+        x.relayout(getattr(space, "with_"+main_axis)(main_space[i].item()), viewport, _ZERO)
+        rendered_main[i] = getattr(x.rendered, main_axis).val
+
+    # Cross axis sizes
+    rendered_cross = _abs(cross_codes, cross_vals, cross_axis_size, viewport_f)
+
+    # Write back the results
+    main_space_l = main_space.tolist()
+    natural_main_l = natural_main.tolist()
+    rendered_main_l = rendered_main.tolist()
+    rendered_cross_l = rendered_cross.tolist()
+    fixed_l = fixed.tolist()
+    for i, (x, is_leaf) in enumerate(zip(children, leaf.tolist())):
+        if is_leaf:
+            if main_space_l[i] != main_space_l[i]:  # nan, this child was not rendered
+                rendered_cross_l[i] = getattr(x.rendered, sequence.cross_axis).val
+                continue
+
+            m = _lunit(natural_main_l[i], UNIT.px)
+            c = _lunit(rendered_cross_l[i], UNIT.px)
+            if main_x:
+                natural = _lunit2(m, c)
+                key = x.layout_key((main_space_l[i], cross_axis_size), viewport_f)
+            else:
+                natural = _lunit2(c, m)
+                key = x.layout_key((cross_axis_size, main_space_l[i]), viewport_f)
+
+            # Same as what LayoutObject.relayout would have done
+            x._layout_cache.pop(key, None)
+            x._store_layout(key, (natural, None))
+
+            if natural_main_l[i] != rendered_main_l[i]:  # Constrained
+                natural = getattr(natural, "with_"+main_axis)(rendered_main_l[i])
+            x.rendered = natural
+        else:
+            if fixed_l[i] and getattr(x.rendered, main_axis).val != rendered_main_l[i]:  # Constrained
+                x.rendered = getattr(x.rendered, "with_"+main_axis)(rendered_main_l[i])
+            rendered_cross_l[i] = getattr(x.rendered, sequence.cross_axis).val
+
+    # Alignment
+    main_align = _align_main(main_axis_size, rendered_main, sequence.main_axis_align).tolist()
+    cross_align = _align_cross(cross_axis_size, np.array(rendered_cross_l), sequence.cross_axis_align).tolist()
+    for x, m, c in zip(children, main_align, cross_align):
+        if main_x:
+            x.offset = _lunit2(_lunit(m, UNIT.px), _lunit(c, UNIT.px))
+        else:
+            x.offset = _lunit2(_lunit(c, UNIT.px), _lunit(m, UNIT.px))
@@ -1,4 +1,4 @@
-from .units import LUnit, LUnit2
+from .units import LUnit, LUnit2, UNIT
 import abc
 from .utils import _collides_rect
 
@@ -6,46 +6,253 @@ class LayoutObject(abc.ABC):
     """
     Abstract class for LayoutObjects
 
-    Contains 4 instance variables:
+    Contains 5 instance variables:
     1. dim: Wanted Dimensions
-    2. pos: Rendered Position
-    3. rendered: Rendered Dimensions
-    4. preferred: Preferred Minimum Absolute Dimensions
+    2. offset: Rendered Position relative to the parent layout object
+    3. pos: Rendered Absolute Position (resolved lazily from offsets)
+    4. rendered: Rendered Dimensions
+    5. preferred: Preferred Minimum Absolute Dimensions
 
     Components of preferred dimensions can have either a float value
     indicating a minimum size wanted in pixels or None indicating
     that their is no preference
+
+    Changing dim or preferred marks the layout object and all of its
+    ancestors dirty. Only dirty layout objects (or the ones given a
+    different space) are re-preferred and re-rendered on the next calculate.
+
+    Positions are stored relative to the parent, so moving a layout object
+    moves its whole subtree in O(1). Absolute positions are cached, every
+    layout object has a position version that changes with its absolute
+    position, and a cached position is used for as long as the version of
+    the parent is the one it was calculated from.
+
+    The last few layout results of every layout object are memoized, keyed on
+    the given space, viewport and a version number that changes whenever the
+    layout object (or any of its descendants) changes. The viewport is only a
+    part of the key for layout objects that depend on it (vw/vh units), so
+    resizing the viewport does not recalculate fixed size parts of the tree. Layout objects with
+    children should implement save_layout and restore_layout so that their
+    children can be restored from the memoized results too.
     """
+    layout_cache_size = 4  # Number of layout results memoized per layout object
+
     def __init__(self) -> None:
+        self.parent: LayoutObject = None
+        self._dirty = True
+        self._version = 0
+        self._layout_cache = {}  # key -> (rendered, saved layout), oldest first
+        self._current = None  # (key, rendered) of the layout currently applied
+        self._viewport_dependent = True  # Until prefer has been run, assume the worst
+
         self.dim = LUnit2(0, 0)
 
-        self.pos = LUnit2(0, 0)
+        self._pos_cache = None  # None until the absolute position is calculated again
+        self._pos_version = 0  # Changes whenever the absolute position may have changed
+        self._pos_parent = None  # Parent and its version the cached position was calculated from
+        self._pos_parent_version = -1
+        self._offset = None
+        self.offset = LUnit2(0, 0)
         self.rendered = LUnit2(0, 0)
         
         self.preferred: tuple[float, float] = (None, None)
 
+    @property
+    def dim(self) -> LUnit2:
+        return self._dim
+
+    @dim.setter
+    def dim(self, dim: LUnit2):
+        if isinstance(dim, tuple):  # Allow for ("1 f", "10 px") like dimensions
+            dim = LUnit2(*dim)
+        self._dim = dim
+        self.mark_dirty()
+
+    @property
+    def offset(self) -> LUnit2:
+        return self._offset
+
+    @offset.setter
+    def offset(self, offset: LUnit2):
+        if offset == self._offset:
+            return  # Placed where it already is, the cached positions below stay valid
+        self._offset = offset
+        self._pos_cache = None
+        self._pos_version += 1
+
+    @property
+    def pos(self) -> LUnit2:
+        """
+        Absolute position of the layout object
+        """
+        parent = self.parent
+        if parent is None:
+            return self._offset
+        parent_pos = parent.pos  # Brings the versions of the ancestors up to date
+        if self._pos_cache is None or self._pos_parent_version != parent._pos_version or self._pos_parent is not parent:
+            self._pos_cache = parent_pos + self._offset
+            self._pos_parent = parent
+            self._pos_parent_version = parent._pos_version
+            self._pos_version += 1
+        return self._pos_cache
+
+    @pos.setter
+    def pos(self, position: LUnit2):
+        if self.parent is None:
+            self.offset = position
+        else:
+            self.offset = position - self.parent.pos
+
+    @property
+    def preferred(self) -> tuple[float, float]:
+        return self._preferred
+
+    @preferred.setter
+    def preferred(self, preferred: tuple[float, float]):
+        self._preferred = preferred
+        self.mark_dirty()
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def mark_dirty(self) -> None:
+        """
+        Mark this layout object and all of its ancestors to be recalculated.
+
+        Stops at the first ancestor that is already dirty, since its own
+        ancestors are then dirty too.
+        """
+        x = self
+        while x is not None and not x._dirty:
+            x._dirty = True
+            x._version += 1
+            x._layout_cache.clear()  # Results of the older versions can never be reused
+            x = x.parent
+
     def render(self, space: LUnit2, viewport: LUnit2, offset: LUnit2) -> None:
         """
         Given the amount of space available for the said layoutobject, and viewport
         dimensions, calculate the layout object's absolute rendered dimensions
-        and position in pixels
+        and position in pixels. offset is relative to the parent layout object.
         """
         self.rendered = self.dim.abs(space.x.val, space.y.val, viewport)
-        self.pos = offset
+        self.offset = offset
 
     def prefer(self) -> None:
         """
         Set the layout object's preferred minimum dimensions.
         """
         pass
+
+    def update_preferred(self) -> None:
+        """
+        Run prefer only if the layout object has changed since it was last rendered
+        """
+        if self._dirty:
+            self.prefer()
+            self._viewport_dependent = self.depends_on_viewport()
+
+    def depends_on_viewport(self) -> bool:
+        """
+        If the layout of this layout object or any of its descendants uses the
+        viewport dimensions. Called after prefer.
+        """
+        return self.dim.x.unit in _VIEWPORT_UNITS or self.dim.y.unit in _VIEWPORT_UNITS
+
+    def save_layout(self):
+        """
+        Return the state needed to restore the current layout of the children
+        using restore_layout. Layout objects without children don't need this.
+        """
+        return None
+
+    def restore_layout(self, state, viewport: LUnit2) -> None:
+        """
+        Restore the layout of the children from a state returned by save_layout
+        """
+        pass
+
+    def layout_key(self, space: tuple[float, float], viewport: tuple[float, float]):
+        """
+        The key used to memoize the layout results, it must capture everything
+        the render method depends on.
+
+        The space along pixel sized axes only matters up to the size itself
+        and the viewport is only used by viewport dependent layout objects.
+        """
+        dim = self._dim
+        if dim.x.unit is UNIT.px and dim.x.val < space[0]:
+            space = (dim.x.val, space[1])
+        if dim.y.unit is UNIT.px and dim.y.val < space[1]:
+            space = (space[0], dim.y.val)
+        return (space, viewport if self._viewport_dependent else None, self._version)
+
+    def relayout(self, space: LUnit2, viewport: LUnit2, offset: LUnit2) -> None:
+        """
+        Same as render, but a layout object that was already rendered with the same
+        space, viewport and version reuses the memoized result and is
+        only moved to the given offset.
+        """
+        key = self.layout_key(space.as_float(), viewport.as_float())
+        if self._current is not None and self._current[0] == key:
+            # Nothing has changed since, parents may constrain our rendered size, so restore the one we rendered with
+            self.rendered = self._current[1]
+        else:
+            result = self._layout_cache.pop(key, None)
+            if result is None:
+                self.render(space, viewport, offset)
+                result = (self.rendered, self.save_layout())
+            else:
+                self.rendered = result[0]
+                self.restore_layout(result[1], viewport)
+            self._store_layout(key, result)
+        self.offset = offset
+
+    def _store_layout(self, key, result) -> None:
+        """
+        Memoize the layout result and mark it as the current layout
+        """
+        self._layout_cache[key] = result
+        if len(self._layout_cache) > self.layout_cache_size:
+            del self._layout_cache[next(iter(self._layout_cache))]  # Evict the least recently used
+        self._current = (key, result[0])
+        self._dirty = False
+
+    def clear_layout_cache(self) -> None:
+        """
+        Forget all the memoized layout results
+        """
+        self._layout_cache.clear()
     
     def calculate(self, space: LUnit2, viewport: LUnit2, offset: LUnit2 = LUnit2(0, 0)) -> None:
         """
         Simply run prefer methods of all children items
         and then render them based on calculated preferences!
+
+        Only the dirty parts of the layout tree are recalculated.
+        """
+        dirty = self._dirty_subtree()
+        self.update_preferred()
+        self.relayout(space, viewport, offset)
+
+        # Children a parent did not render (such as "0 f" ones) are clean as well,
+        # otherwise mark_dirty would stop at them and never reach their ancestors
+        for x in dirty:
+            x._dirty = False
+
+    def _dirty_subtree(self) -> list["LayoutObject"]:
+        """
+        The dirty layout objects in the tree, dirty ones only have dirty ancestors
         """
-        self.prefer()
-        self.render(space, viewport, offset)
+        dirty = []
+        stack = [self]
+        while stack:
+            x = stack.pop()
+            if x._dirty:
+                dirty.append(x)
+                stack.extend(getattr(x, "children", ()))
+        return dirty
 
     def __repr__(self):
         """
@@ -60,4 +267,6 @@ class LayoutObject(abc.ABC):
         """
         If the layout object collides with the given point, return true
         """
-        return _collides_rect(point, self.pos.as_float(), self.rendered.as_float())
\ No newline at end of file
+        return _collides_rect(point, self.pos.as_float(), self.rendered.as_float())
+
+_VIEWPORT_UNITS = (UNIT.vw, UNIT.vh)
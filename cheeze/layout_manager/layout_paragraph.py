@@ -0,0 +1,245 @@
+from .layout_object import LayoutObject
+from .units import LUnit2, UNIT
+from typing import Callable
+import bisect
+import collections
+
+WRAP_MODES = ("greedy", "optimal")
+
+class _Block:
+    """
+    A run of text between two hard line breaks, split into words
+    """
+    __slots__ = ("text", "words", "widths")
+
+    def __init__(self, text: str, words: list[str], widths: list[float]) -> None:
+        self.text = text
+        self.words = words
+        self.widths = widths
+
+
+class LayoutParagraph(LayoutObject):
+    """
+    Multi-line text, wrapped to the width it is given. Its height follows from its width,
+    the number of lines times line_height.
+
+    measure gives the width of a piece of text in pixels, the words are measured once.
+    wrap is "greedy" to fill every line as much as possible or "optimal" to keep the
+    lines about the same length, by minimizing the squared space left at the end of
+    every line but the last one.
+
+    The line breaks are cached for the last break_cache_size widths, so resizing back
+    and forth does not wrap the text again. After set_text, the text is only wrapped
+    again from the first changed line, and greedy wrapping stops as soon as the lines
+    are the same as before the edit.
+    """
+    def __init__(self, text: str, *, measure: Callable[[str], float], line_height: float, size: LUnit2 = ("1 f", "0 px"), wrap: str = "greedy", break_cache_size: int = 8) -> None:
+        super().__init__()
+        if wrap not in WRAP_MODES:
+            raise ValueError(f"unknown wrap mode {wrap!r}, expected one of {WRAP_MODES}")
+        self.dim = size
+        self.measure = measure
+        self.line_height = line_height
+        self.wrap = wrap
+        self.break_cache_size = break_cache_size
+        self.wrapped_words = 0  # Words placed by the last wrap, to see how much was wrapped again
+
+        self._word_widths: dict[str, float] = {}
+        self._space = measure(" ")
+        self._breaks: collections.OrderedDict[float, list[list[int]]] = collections.OrderedDict()  # width -> line starts of every block
+        self.text = ""
+        self._blocks: list[_Block] = []
+        self.set_text(text)
+
+    def set_text(self, text: str) -> None:
+        """
+        Change the text, only the cached breaks of the current width are kept and
+        updated from the first changed line
+        """
+        old_blocks = self._blocks
+        self.text = text
+        self._blocks = [self._block(x) for x in text.split("\n")]
+        self._word_widths = {x: self._word_widths[x] for block in self._blocks for x in block.words}  # Only the words still in the text
+
+        width = self.rendered.x.val if self._current is not None else None
+        breaks = self._breaks.get(width)
+        self._breaks.clear()
+        if breaks is not None:
+            self._breaks[width] = self._rewrap(old_blocks, breaks, width)
+        self.mark_dirty()
+
+    def _block(self, text: str) -> _Block:
+        words = text.split()
+        widths = []
+        for x in words:
+            w = self._word_widths.get(x)
+            if w is None:
+                w = self._word_widths[x] = self.measure(x)
+            widths.append(w)
+        return _Block(text, words, widths)
+
+    def prefer(self) -> None:
+        # Narrowest without breaking a word, one line per block
+        widest = max((max(x.widths, default=0) for x in self._blocks), default=0)
+        self.preferred = (widest, self.line_height * len(self._blocks))
+
+    def render(self, space: LUnit2, viewport: LUnit2, offset: LUnit2) -> None:
+        width = self.dim.abs(space.x.val, space.y.val, viewport).x.val
+        lines = sum(len(x) for x in self.breaks(width))
+        self.rendered = LUnit2(width, lines * self.line_height)
+        self.offset = offset
+
+    def depends_on_viewport(self) -> bool:
+        return self.dim.x.unit in (UNIT.vw, UNIT.vh)
+
+    def breaks(self, width: float) -> list[list[int]]:
+        """
+        Index of the first word of every line of every block, wrapped to width
+        """
+        breaks = self._breaks.get(width)
+        if breaks is not None:
+            self._breaks.move_to_end(width)
+            return breaks
+
+        self.wrapped_words = 0
+        breaks = self._breaks[width] = [self._wrap(x.widths, width) for x in self._blocks]
+        if len(self._breaks) > self.break_cache_size:
+            del self._breaks[next(iter(self._breaks))]
+        return breaks
+
+    def lines(self, width: float = None, first: int = 0, last: int = None) -> list[str]:
+        """
+        The wrapped lines from first up to last, all of them by default, for the rendered
+        width by default. Only the lines asked for are joined.
+        """
+        if width is None:
+            width = self.rendered.x.val
+        lines = []
+        n = 0  # Index of the first line of the block
+        for (block, starts) in zip(self._blocks, self.breaks(width)):
+            if last is not None and n >= last:
+                break
+            count = len(starts)
+            if n + count > first:
+                a = max(0, first - n)
+                b = count if last is None else min(count, last - n)
+                ends = starts[1:] + [len(block.words)]
+                lines.extend(" ".join(block.words[s:e]) for (s, e) in zip(starts[a:b], ends[a:b]))
+            n += count
+        return lines
+
+    def _wrap(self, widths: list[float], width: float) -> list[int]:
+        self.wrapped_words += len(widths)
+        if self.wrap == "optimal":
+            return _wrap_optimal(widths, self._space, width)
+        return _wrap_greedy(widths, self._space, width)
+
+    def _rewrap(self, old_blocks: list[_Block], old_breaks: list[list[int]], width: float) -> list[list[int]]:
+        """
+        Breaks of the new blocks, reusing the breaks of the blocks that did not change
+        """
+        self.wrapped_words = 0
+        new = self._blocks
+
+        # Blocks that are the same at the start and the end keep their breaks
+        start = 0
+        while start < min(len(new), len(old_blocks)) and new[start].text == old_blocks[start].text:
+            start += 1
+        end = 0
+        while end < min(len(new), len(old_blocks)) - start and new[-1 - end].text == old_blocks[-1 - end].text:
+            end += 1
+
+        # With as many blocks as before, the edit was made inside of the blocks
+        changed = []
+        for i in range(start, len(new) - end):
+            if self.wrap == "greedy" and len(new) == len(old_blocks):
+                changed.append(self._rewrap_greedy(old_blocks[i], old_breaks[i], new[i], width))
+            else:
+                changed.append(self._wrap(new[i].widths, width))
+        return old_breaks[:start] + changed + (old_breaks[len(old_breaks) - end:] if end else [])
+
+    def _rewrap_greedy(self, old: _Block, old_starts: list[int], new: _Block, width: float) -> list[int]:
+        """
+        Wrap a block again from the line before its first changed word, and stop as soon
+        as a line starts at the same word as before, past the changed words
+        """
+        prefix = 0
+        while prefix < min(len(old.words), len(new.words)) and old.words[prefix] == new.words[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < min(len(old.words), len(new.words)) - prefix and old.words[-1 - suffix] == new.words[-1 - suffix]:
+            suffix += 1
+        delta = len(new.words) - len(old.words)
+
+        # A shorter first word may now fit at the end of the line before
+        line = max(0, bisect.bisect_right(old_starts, prefix) - 2)
+        starts = old_starts[:line]
+        first = old_starts[line] if old_starts else 0
+
+        old_after = {x + delta: i for (i, x) in enumerate(old_starts)}
+        unchanged = len(new.words) - suffix  # Words from here on are the same as before
+        widths = new.widths
+        if not widths:
+            return [0]
+
+        starts.append(first)
+        x = widths[first]
+        for i in range(first + 1, len(widths)):
+            self.wrapped_words += 1
+            if x + self._space + widths[i] <= width:
+                x += self._space + widths[i]
+                continue
+            if i >= unchanged and i in old_after:
+                # From here on, the lines are the same as before the edit
+                return starts + [s + delta for s in old_starts[old_after[i]:]]
+            starts.append(i)
+            x = widths[i]
+        return starts
+
+
+def _wrap_greedy(widths: list[float], space: float, width: float) -> list[int]:
+    """
+    Index of the first word of every line, filling every line as much as possible
+    """
+    if not widths:
+        return [0]
+    starts = [0]
+    x = widths[0]
+    for i in range(1, len(widths)):
+        if x + space + widths[i] <= width:
+            x += space + widths[i]
+        else:
+            starts.append(i)
+            x = widths[i]
+    return starts
+
+def _wrap_optimal(widths: list[float], space: float, width: float) -> list[int]:
+    """
+    Index of the first word of every line, minimizing the sum of the squared space left
+    at the end of every line but the last one. Words wider than the line are on their own.
+    """
+    n = len(widths)
+    if not n:
+        return [0]
+
+    # cost[j] is the lowest cost of the words before j, starting a line at j
+    cost = [0.0] + [float("inf")] * n
+    previous = [0] * (n + 1)
+    for j in range(1, n + 1):
+        line = -space
+        for i in range(j - 1, -1, -1):
+            line += widths[i] + space
+            if line > width and i < j - 1:
+                break
+            slack = 0 if j == n else max(0, width - line)
+            c = cost[i] + slack * slack
+            if c < cost[j]:
+                cost[j] = c
+                previous[j] = i
+
+    starts = []
+    j = n
+    while j > 0:
+        j = previous[j]
+        starts.append(j)
+    return starts[::-1]
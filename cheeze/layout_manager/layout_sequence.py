@@ -3,6 +3,7 @@ from .units import LUnit2, LUnit, UNIT
 from .alignment import MainAxisAlignment, CrossAxisAlignment
 from . import alignment
 from .utils import _float0
+from . import layout_numpy
 import textwrap
 
 from functools import partial
@@ -12,26 +13,34 @@ class LayoutSequence(LayoutObject):
     LayoutSequence is used for widgets that have items in a sequence
     such as Row, Column, etc...
     This layout object also allows for alignment within it. 
+
+    Sequences with many children are solved with the numpy layout engine
+    if numpy is installed. vectorized can be set to True or False to
+    force or disable the numpy layout engine.
     """
+    vectorize_threshold = 64  # Minimum number of children to use the numpy layout engine
+
     def __init__(
             self, 
-            size: LUnit2 = ("1f", "1f"), *,
+            size: LUnit2 = ("1 f", "1 f"), *,
             main_axis = "x",
             cross_axis = "y",
             main_axis_align: MainAxisAlignment = MainAxisAlignment.start,
             cross_axis_align: CrossAxisAlignment = CrossAxisAlignment.start,
-            children: list[LayoutObject] = None
+            children: list[LayoutObject] = None,
+            vectorized: bool = None
         ) -> None:
         
-        # This gets called before init, because the init methods directly accesses the property pos.
         if children is None:
             self.children = []
         else:
             self.children = children
-        self._pos = LUnit2(0, 0)
 
 
         super().__init__()
+
+        for x in self.children:
+            x.parent = self
     
         self.dim = size
         self.main_axis = main_axis
@@ -40,6 +49,7 @@ class LayoutSequence(LayoutObject):
         self.cross_axis_num = 0 if cross_axis == "x" else 1  # and cross axis respectively
         self.main_axis_align = main_axis_align
         self.cross_axis_align = cross_axis_align
+        self.vectorized = vectorized
 
 
         assert (main_axis, cross_axis) in (('x', 'y'), ('y', 'x')), "Both main axis and cross axis have to be opposite"
@@ -55,7 +65,7 @@ class LayoutSequence(LayoutObject):
         
         # Calculate the minimum preffered size based on the children!
         for x in self.children:
-            x.prefer()
+            x.update_preferred()  # Clean children keep their previous preferred size
 
             # Get the minimal dimensions of the said items!
             total_size_main += _float0(x.preferred[self.main_axis_num])
@@ -81,10 +91,53 @@ class LayoutSequence(LayoutObject):
             else:
                 self.preferred = (self.preferred[0], self.dim.y.val)
 
+    def add_child(self, child: LayoutObject):
+        self.children.append(child)
+        child.parent = self
+        self.mark_dirty()
+
+    def remove_child(self, child: LayoutObject):
+        self.children.remove(child)
+        child.parent = None
+        self.mark_dirty()
+
+    def depends_on_viewport(self) -> bool:
+        return super().depends_on_viewport() or any(x._viewport_dependent for x in self.children)
+
+    def save_layout(self):
+        return [
+            (None if x._current is None else x._current[0][0], x.rendered, x.offset)
+            for x in self.children
+        ]
+
+    def restore_layout(self, state, viewport: LUnit2) -> None:
+        for x, (space, rendered, offset) in zip(self.children, state):
+            if space is not None:
+                x.relayout(LUnit2(*space), viewport, offset)
+            x.rendered = rendered
+            x.offset = offset
+
     def render(self, space: LUnit2, viewport: LUnit2, offset: LUnit2) -> None:
         self.rendered = self.dim.abs(space.x.val, space.y.val, viewport)
-        space = self.rendered
+        self.offset = offset
+
+        if self.use_vectorized():
+            layout_numpy.render_children(self, self.rendered, viewport)
+        else:
+            self.render_children(self.rendered, viewport)
 
+    def use_vectorized(self) -> bool:
+        """
+        Should the children be solved using the numpy layout engine
+        """
+        if self.vectorized is None:
+            return layout_numpy.available and len(self.children) >= self.vectorize_threshold
+        return self.vectorized
+
+    def render_children(self, space: LUnit2, viewport: LUnit2) -> None:
+        """
+        Allocate space to the children and align them within the given space
+        """
         # Distribute absolute and percentage spacing across main axis
         main_axis_size = getattr(space, self.main_axis).val
         total_size = 0
@@ -94,7 +147,7 @@ class LayoutSequence(LayoutObject):
             x_main = getattr(x.dim, self.main_axis)  # Get the LUnit for the child's axis that is main axis for this sequence
             if x_main.unit in (UNIT.px, UNIT.percent, UNIT.vh, UNIT.vw):  # If the unit in question works based on total size
                 
-                x.render(space, viewport, offset)
+                x.relayout(space, viewport, LUnit2(0, 0))
 
                 # If the child decides to take more space than that we have
                 if total_size + getattr(x.rendered, self.main_axis).val > main_axis_size:
@@ -124,10 +177,11 @@ class LayoutSequence(LayoutObject):
                 if x_main.unit in (UNIT.f, ):
                     # If the minimum size is not satisfied, take the minimum size preference as the
                     # object's assigned size
-                    if _float0(x.preferred[self.main_axis_num]) > flex_unit_val*x_main.val:
-                        x.render(getattr(space, "with_"+self.main_axis)(x.preferred[self.main_axis_num]), viewport, offset)
+                    x_preferred = _float0(x.preferred[self.main_axis_num])
+                    if x_preferred > flex_unit_val*x_main.val:
+                        x.relayout(getattr(space, "with_"+self.main_axis)(x_preferred), viewport, LUnit2(0, 0))
                         flex_count -= x_main.val  # Remove it from actively assignable flex object count
-                        flex_space_left -= x.preferred[self.main_axis_num]  # Remove the assigend space to this object from the rest
+                        flex_space_left -= x_preferred  # Remove the assigend space to this object from the rest
                     else:  # The object can be extended
                         extensible_objects.append(x)
 
@@ -139,7 +193,7 @@ class LayoutSequence(LayoutObject):
             # Render each child with given flex object also providing the size for the said flex object
             for x in extensible_objects:  # Extensible objects is the objects that haven't been assigned a size after minimum size filtering
                 x_main = getattr(x.dim, self.main_axis)
-                x.render(getattr(space, "with_"+self.main_axis)(flex_unit_val*x_main.val), viewport, offset)
+                x.relayout(getattr(space, "with_"+self.main_axis)(flex_unit_val*x_main.val), viewport, LUnit2(0, 0))
 
 
         # All of the above was to allocate space! now, to align items with position!
@@ -151,30 +205,19 @@ class LayoutSequence(LayoutObject):
             self.main_axis_align
         )
 
-        # Apply the alignment to the positions along with proper offset too
+        # Apply the alignment to the positions, children offsets are relative to this sequence
         for align, x in zip(main_align, self.children):
             if self.main_axis == "x":
-                x.pos = LUnit2(
-                    x.pos.x + offset.x + align,
-                    x.pos.y + offset.y + next(alignment.align(space.y.val, (x.rendered.y.val,), self.cross_axis_align)),
+                x.offset = LUnit2(
+                    align,
+                    next(alignment.align(space.y.val, (x.rendered.y.val,), self.cross_axis_align)),
                 )
             elif self.main_axis == "y":
-                x.pos = LUnit2(
-                    x.pos.x + offset.x + next(alignment.align(space.x.val, (x.rendered.x.val,), self.cross_axis_align)),
-                    x.pos.y + offset.y + align,
+                x.offset = LUnit2(
+                    next(alignment.align(space.x.val, (x.rendered.x.val,), self.cross_axis_align)),
+                    align,
                 )
 
-    @property
-    def pos(self):
-        return self._pos
-
-    @pos.setter
-    def pos(self, position: LUnit2):
-        for x in self.children:
-            x.pos = position + (x.pos - self._pos)  #  Offset the children element positions in a way to work with the new position
-
-        self._pos = position
-
     def __repr__(self):
         r = ("Row" if self.main_axis == "x" else "Column") + super().__repr__()[:-1] + "\n"
         for x in self.children:
@@ -0,0 +1,243 @@
+from .layout_object import LayoutObject
+from .layout_sequence import LayoutSequence
+from .units import LUnit2, UNIT
+from .alignment import CrossAxisAlignment
+from . import alignment
+from typing import Callable, Union
+
+class ExtentIndex:
+    """
+    A prefix sum index (fenwick tree) over the extents of the items of a
+    LayoutVirtualSequence. Updating an extent, getting the offset of an item
+    and finding the item at an offset are all O(log n)
+    """
+    def __init__(self, extents: list[float]) -> None:
+        self.extents = list(extents)
+        self._tree = [0.0] + self.extents
+
+        # O(n) construction of the fenwick tree
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def __len__(self) -> int:
+        return len(self.extents)
+
+    def update(self, index: int, extent: float) -> None:
+        """
+        Change the extent of the item at index
+        """
+        delta = extent - self.extents[index]
+        self.extents[index] = extent
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index: int) -> float:
+        """
+        Offset of the item at index, the sum of extents of all the items before it
+        """
+        total = 0.0
+        i = index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def total(self) -> float:
+        return self.prefix(len(self.extents))
+
+    def find(self, offset: float) -> int:
+        """
+        Index of the item at the given offset, clamped to the valid indices
+        """
+        index = 0
+        bit = 1 << len(self._tree).bit_length()
+        while bit:
+            i = index + bit
+            if i < len(self._tree) and self._tree[i] <= offset:
+                index = i
+                offset -= self._tree[i]
+            bit >>= 1
+        return max(0, min(index, len(self.extents)-1))
+
+
+class LayoutVirtualSequence(LayoutSequence):
+    """
+    A LayoutSequence for very long lists. Instead of being given children, it is given
+    an item count and an item builder which builds the layout object of an item given its index.
+
+    Only the items that intersect the scroll window (plus overscan pixels on both sides)
+    are built and laid out, they are the only children of this layout object.
+
+    item_extent is either the fixed main axis size of every item or a function
+    that estimates the main axis size of an item given its index. Estimates are
+    replaced by the rendered size once an item is laid out. Items that are flex
+    sized along the main axis are given their extent as space.
+    """
+    def __init__(
+            self,
+            size: LUnit2 = ("1 f", "1 f"), *,
+            item_count: int,
+            item_builder: Callable[[int], LayoutObject],
+            item_extent: Union[float, Callable[[int], float]],
+            main_axis = "y",
+            cross_axis = "x",
+            cross_axis_align: CrossAxisAlignment = CrossAxisAlignment.start,
+            scroll_offset: float = 0,
+            overscan: float = 100
+        ) -> None:
+        super().__init__(size, main_axis=main_axis, cross_axis=cross_axis, cross_axis_align=cross_axis_align, vectorized=False)
+        self.item_builder = item_builder
+        self.item_extent = item_extent
+        self.scroll_offset = scroll_offset
+        self.overscan = overscan
+        self.visible_range = (0, 0)  # Range of the item indices that are currently laid out
+
+        self._items: dict[int, LayoutObject] = {}
+        self.extents = ExtentIndex([])
+        self.set_item_count(item_count)
+
+    def _estimate(self, index: int) -> float:
+        if callable(self.item_extent):
+            return float(self.item_extent(index))
+        return float(self.item_extent)
+
+    def set_item_count(self, item_count: int) -> None:
+        """
+        Change the number of items, the existing measured extents are kept
+        """
+        n = min(item_count, len(self.extents))
+        extents = self.extents.extents[:n] + [self._estimate(i) for i in range(n, item_count)]
+        self.item_count = item_count
+        self.extents = ExtentIndex(extents)
+        self._items = {k: v for k, v in self._items.items() if k < item_count}
+        self.mark_dirty()
+
+    def invalidate_item(self, index: int) -> None:
+        """
+        Rebuild the item at the given index on the next layout
+        """
+        if index in self._items:
+            del self._items[index]
+            self.mark_dirty()
+
+    @property
+    def content_extent(self) -> float:
+        """
+        Total main axis size of all the items
+        """
+        return self.extents.total()
+
+    def index_at(self, offset: float) -> int:
+        """
+        Index of the item at the given main axis offset from the start of the content
+        """
+        return self.extents.find(offset)
+
+    def item_offset(self, index: int) -> float:
+        """
+        Main axis offset of the item from the start of the content
+        """
+        return self.extents.prefix(index)
+
+    def scroll_to(self, offset: float) -> None:
+        """
+        Scroll so that the given content offset is at the start of this layout object
+        """
+        main_size = getattr(self.rendered, self.main_axis).val
+        offset = max(0, min(offset, self.content_extent - main_size))
+        if offset != self.scroll_offset:
+            self.scroll_offset = offset
+            self.mark_dirty()
+
+    def scroll_to_index(self, index: int) -> None:
+        self.scroll_to(self.item_offset(index))
+
+    def add_child(self, child: LayoutObject):
+        raise TypeError("Children of a LayoutVirtualSequence are built using its item_builder")
+
+    def remove_child(self, child: LayoutObject):
+        raise TypeError("Children of a LayoutVirtualSequence are built using its item_builder")
+
+    def prefer(self) -> None:
+        """
+        The preferred size only comes from pixel dimensions, the items are scrolled anyway
+        """
+        for x in self.children:
+            x.update_preferred()
+
+        self.preferred = (
+            self.dim.x.val if self.dim.x.unit == UNIT.px else None,
+            self.dim.y.val if self.dim.y.unit == UNIT.px else None
+        )
+
+    def save_layout(self):
+        return (list(self.children), dict(self._items), self.visible_range, super().save_layout())
+
+    def restore_layout(self, state, viewport: LUnit2) -> None:
+        children, items, self.visible_range, children_state = state
+        for k, x in self._items.items():
+            if k not in items:
+                x.parent = None
+        for x in children:
+            x.parent = self
+        self.children = list(children)
+        self._items = dict(items)
+        super().restore_layout(children_state, viewport)
+
+    def render_children(self, space: LUnit2, viewport: LUnit2) -> None:
+        main_size = getattr(space, self.main_axis).val
+        cross_size = getattr(space, self.cross_axis).val
+
+        start = max(0, self.scroll_offset - self.overscan)
+        end = self.scroll_offset + main_size + self.overscan
+
+        first = self.extents.find(start) if self.item_count else 0
+        pos = self.extents.prefix(first)
+        children = []
+        items = {}
+
+        i = first
+        while i < self.item_count and pos < end:
+            x = self._items.get(i)
+            if x is None:
+                x = self.item_builder(i)
+            x.parent = self
+            x.update_preferred()
+
+            extent = self.extents.extents[i]
+            if getattr(x.dim, self.main_axis).unit == UNIT.f:
+                x.relayout(getattr(space, "with_"+self.main_axis)(extent), viewport, LUnit2(0, 0))
+            else:
+                x.relayout(space, viewport, LUnit2(0, 0))
+
+            # Replace the estimate with the actual extent
+            measured = getattr(x.rendered, self.main_axis).val
+            if measured != extent:
+                self.extents.update(i, measured)
+
+            cross = next(alignment.align(cross_size, (getattr(x.rendered, self.cross_axis).val,), self.cross_axis_align))
+            if self.main_axis == "x":
+                x.offset = LUnit2(pos - self.scroll_offset, cross)
+            else:
+                x.offset = LUnit2(cross, pos - self.scroll_offset)
+
+            children.append(x)
+            items[i] = x
+            pos += measured
+            i += 1
+
+        # Items that are scrolled out are forgotten
+        for k, x in self._items.items():
+            if k not in items:
+                x.parent = None
+
+        self.children = children
+        self._items = items
+        self.visible_range = (first, i)
+
+    def __repr__(self):
+        return f"Virtual[{self.visible_range[0]}:{self.visible_range[1]} of {self.item_count}]" + super().__repr__()
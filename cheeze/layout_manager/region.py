@@ -0,0 +1,248 @@
+from .units import LRect
+from typing import Iterable, Iterator, Union
+
+RectLike = Union["Region", LRect, tuple[float, float, float, float]]
+
+class Region:
+    """
+    An area made up of rectangles, with exact union, intersection and subtraction.
+
+    The area is kept as horizontal bands, each band being a list of non-overlapping
+    x intervals. Vertically adjacent bands with the same intervals are merged, so a
+    region is always coalesced into the same set of non-overlapping rectangles no
+    matter how it was built. Iterating over a region gives those rectangles in
+    (x, y, w, h) format.
+    """
+    __slots__ = ("_bands", )
+
+    def __init__(self, rects: Iterable[RectLike] = (), *, clip: RectLike = None) -> None:
+        """
+        The union of the given rectangles and regions. If clip is given, only the part
+        inside of it, which is a lot faster than intersecting afterwards.
+        """
+        if isinstance(rects, Region) and clip is None:
+            self._bands = rects._bands
+            return
+        if _is_rect(rects):
+            rects = (rects, )  # A single rectangle
+
+        edges = []
+        for r in rects:
+            if isinstance(r, Region):
+                edges.extend(r._edges())
+                continue
+            if isinstance(r, LRect):
+                r = r.as_float()
+            x, y, w, h = r
+            if w > 0 and h > 0:
+                edges.append((x, y, x+w, y+h))
+
+        if clip is not None:
+            if isinstance(clip, Region):
+                self._bands = _combine_bands(_bands_from_edges(edges), clip._bands, _AND)
+                return
+            if isinstance(clip, LRect):
+                clip = clip.as_float()
+            clip = (clip[0], clip[1], clip[0]+clip[2], clip[1]+clip[3])
+            edges = [x for x in (_clip_edges(x, clip) for x in edges) if x is not None]
+
+        self._bands = _bands_from_edges(edges)
+
+    @classmethod
+    def _from_bands(cls, bands: tuple) -> "Region":
+        region = object.__new__(cls)
+        region._bands = bands
+        return region
+
+    @classmethod
+    def _from_edges(cls, edges: list[tuple[float, float, float, float]]) -> "Region":
+        """
+        Region of non-empty (left, top, right, bottom) rectangles
+        """
+        return cls._from_bands(_bands_from_edges(edges))
+
+    def _edges(self) -> Iterator[tuple[float, float, float, float]]:
+        for (y0, y1, intervals) in self._bands:
+            for (x0, x1) in intervals:
+                yield (x0, y0, x1, y1)
+
+    def union(self, other: RectLike) -> "Region":
+        return Region._from_bands(_combine_bands(self._bands, _as_region(other)._bands, _OR))
+
+    def intersection(self, other: RectLike) -> "Region":
+        return Region._from_bands(_combine_bands(self._bands, _as_region(other)._bands, _AND))
+
+    def subtract(self, other: RectLike) -> "Region":
+        return Region._from_bands(_combine_bands(self._bands, _as_region(other)._bands, _SUB))
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = subtract
+
+    @property
+    def area(self) -> float:
+        """
+        Exact area covered by the region, overlaps are only counted once
+        """
+        return sum((y1-y0) * sum(x1-x0 for (x0, x1) in intervals) for (y0, y1, intervals) in self._bands)
+
+    @property
+    def bounds(self) -> LRect:
+        """
+        The smallest rectangle containing the whole region
+        """
+        if not self._bands:
+            return LRect((0, 0), (0, 0))
+        left = min(intervals[0][0] for (_, _, intervals) in self._bands)
+        right = max(intervals[-1][1] for (_, _, intervals) in self._bands)
+        top = self._bands[0][0]
+        bottom = self._bands[-1][1]
+        return LRect((left, top), (right-left, bottom-top))
+
+    def is_empty(self) -> bool:
+        return not self._bands
+
+    def contains(self, other: RectLike) -> bool:
+        """
+        If the given rectangle or region is completely inside this region
+        """
+        return _as_region(other).subtract(self).is_empty()
+
+    def rects(self) -> list[tuple[float, float, float, float]]:
+        """
+        The coalesced non-overlapping rectangles of the region in (x, y, w, h) format
+        """
+        return list(self)
+
+    def __iter__(self) -> Iterator[tuple[float, float, float, float]]:
+        for (y0, y1, intervals) in self._bands:
+            for (x0, x1) in intervals:
+                yield (x0, y0, x1-x0, y1-y0)
+
+    def __len__(self) -> int:
+        return sum(len(intervals) for (_, _, intervals) in self._bands)
+
+    def __bool__(self) -> bool:
+        return bool(self._bands)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Region):
+            return NotImplemented
+        return self._bands == other._bands
+
+    def __hash__(self) -> int:
+        return hash(self._bands)
+
+    def __repr__(self) -> str:
+        return f"Region({self.rects()})"
+
+
+def _clip_edges(edges: tuple[float, float, float, float], clip: tuple[float, float, float, float]) -> tuple[float, float, float, float]:
+    """
+    Intersection of two (left, top, right, bottom) rectangles, None if they do not intersect
+    """
+    x0 = edges[0] if edges[0] > clip[0] else clip[0]
+    y0 = edges[1] if edges[1] > clip[1] else clip[1]
+    x1 = edges[2] if edges[2] < clip[2] else clip[2]
+    y1 = edges[3] if edges[3] < clip[3] else clip[3]
+    if x0 < x1 and y0 < y1:
+        return (x0, y0, x1, y1)
+    return None
+
+def _is_rect(r) -> bool:
+    return isinstance(r, LRect) or (isinstance(r, tuple) and len(r) == 4 and isinstance(r[0], (int, float)))
+
+def _as_region(r: RectLike) -> Region:
+    if isinstance(r, Region):
+        return r
+    return Region((r, ))
+
+# Boolean operations on the (inside first region, inside second region) flags
+_OR = lambda a, b: a or b
+_AND = lambda a, b: a and b
+_SUB = lambda a, b: a and not b
+
+def _append_band(bands: list, y0: float, y1: float, intervals: tuple) -> None:
+    """
+    Append a band, merging it into the previous band if they touch and are the same
+    """
+    if not intervals:
+        return
+    if bands and bands[-1][1] == y0 and bands[-1][2] == intervals:
+        bands[-1] = (bands[-1][0], y1, intervals)
+    else:
+        bands.append((y0, y1, intervals))
+
+def _merge_intervals(intervals: list[tuple[float, float]]) -> tuple:
+    """
+    Merge sorted, possibly overlapping x intervals
+    """
+    merged = []
+    for (x0, x1) in intervals:
+        if merged and x0 <= merged[-1][1]:
+            if x1 > merged[-1][1]:
+                merged[-1] = (merged[-1][0], x1)
+        else:
+            merged.append((x0, x1))
+    return tuple(merged)
+
+def _bands_from_edges(edges: list[tuple[float, float, float, float]]) -> tuple:
+    """
+    Bands of the union of the given (left, top, right, bottom) rectangles
+    """
+    ys = sorted({r[1] for r in edges} | {r[3] for r in edges})
+    edges = sorted(edges, key=lambda r: r[1])
+    bands = []
+    active = []
+    n = 0
+    for k in range(len(ys)-1):
+        y0 = ys[k]
+        while n < len(edges) and edges[n][1] <= y0:
+            active.append(edges[n])
+            n += 1
+        active = [r for r in active if r[3] > y0]
+        _append_band(bands, y0, ys[k+1], _merge_intervals(sorted((r[0], r[2]) for r in active)))
+    return tuple(bands)
+
+def _combine_intervals(a: tuple, b: tuple, op) -> tuple:
+    """
+    Combine two sets of non-overlapping sorted x intervals
+    """
+    if not b:
+        return a if op(True, False) else ()
+    if not a:
+        return b if op(False, True) else ()
+
+    edges = sorted({x for interval in a for x in interval} | {x for interval in b for x in interval})
+    out = []
+    i = j = 0
+    for k in range(len(edges)-1):
+        x0 = edges[k]
+        while i < len(a) and a[i][1] <= x0:
+            i += 1
+        while j < len(b) and b[j][1] <= x0:
+            j += 1
+        if op(i < len(a) and a[i][0] <= x0, j < len(b) and b[j][0] <= x0):
+            if out and out[-1][1] == x0:
+                out[-1] = (out[-1][0], edges[k+1])
+            else:
+                out.append((x0, edges[k+1]))
+    return tuple(out)
+
+def _combine_bands(a: tuple, b: tuple, op) -> tuple:
+    """
+    Combine the bands of two regions
+    """
+    ys = sorted({y for band in a for y in band[:2]} | {y for band in b for y in band[:2]})
+    bands = []
+    i = j = 0
+    for k in range(len(ys)-1):
+        y0 = ys[k]
+        while i < len(a) and a[i][1] <= y0:
+            i += 1
+        while j < len(b) and b[j][1] <= y0:
+            j += 1
+        intervals_a = a[i][2] if i < len(a) and a[i][0] <= y0 else ()
+        intervals_b = b[j][2] if j < len(b) and b[j][0] <= y0 else ()
+        _append_band(bands, y0, ys[k+1], _combine_intervals(intervals_a, intervals_b, op))
+    return tuple(bands)
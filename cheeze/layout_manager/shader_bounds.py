@@ -1,6 +1,8 @@
 from .utils import _collides_rect
 from .units import LRect
+from .region import Region, _clip_edges
 from typing import Any, Self
+from array import array
 import textwrap
 
 class ShaderBounds():
@@ -10,12 +12,17 @@ class ShaderBounds():
     this object returns all the drawable children that need to be redrawn.
 
     an optional parent parameter may be provided that links the shaderbounds to its parent shader!
+    The parent shaderbounds is parent_bounds.
 
     A shader may contain a tree of these ShaderBound objects to make for a more comprehensive draw area checking!
 
     A ShaderBounds object tree should be maintained at the root by the App
+
+    opaque tells what the shader completely covers when it draws, either True for its whole shading
+    region or a Region. Anything drawn below it there is not visible and is not reshaded when
+    occluded shaders are culled.
     """
-    def __init__(self, pos: tuple[float, float], size: tuple[float, float], *, children: list["ShaderBounds"] = None, drawable: bool, partial_shader: bool, parent) -> None:
+    def __init__(self, pos: tuple[float, float], size: tuple[float, float], *, children: list["ShaderBounds"] = None, drawable: bool, partial_shader: bool, parent, opaque: bool | Region = False) -> None:
         self.pos = pos
         self.size = size
 
@@ -23,26 +30,62 @@ class ShaderBounds():
 
         self.drawable = drawable
         self.partial_shader = partial_shader
+        self.opaque = opaque
         self.parent = parent
-        self.root_shaderbounds = None
+        self.parent_bounds = None
+        self._bvh = None  # Compiled ShaderBoundsBVH, if this is a compiled root
 
         if children is None:
             self.children = []
         else:
             self.children = children
+        for x in self.children:
+            x.parent_bounds = self
+
+    @property
+    def opaque_region(self) -> Region:
+        """
+        The region that this shader covers completely
+        """
+        if self.opaque is True:
+            return Region(self.get_shadable_rect())
+        elif not self.opaque:
+            return Region()
+        return self.opaque & self.get_shadable_rect()
+
+    @property
+    def root_shaderbounds(self) -> "ShaderBounds":
+        """
+        The topmost shaderbounds of the tree this shaderbounds is in
+        """
+        root = self
+        while root.parent_bounds is not None:
+            root = root.parent_bounds
+        return root
 
-    def check_reshade(self, rect: tuple[float, float, float, float]) -> list[tuple[Any, list[tuple[float, float, float, float]]]]:
+    def check_reshade(self, rect: tuple[float, float, float, float] | LRect | Region, *, cull_occluded: bool = False) -> list[tuple[Any, Region]]:
         """
-        Check what shaderbound objects are to be reshaded.
+        Check what shaderbound objects are to be reshaded. rect may also be a Region,
+        to check for many rectangles at once. The reshades are listed in the order they
+        are drawn in.
+
+        If cull_occluded is True, the areas covered by opaque shaders drawn later are taken out,
+        shaderbounds that are completely covered are not listed and partial shaders only
+        get the visible part of their regions.
 
         If the said shaderbound object is a partial shader, it will be listed as follows
-        [ShaderBound, [(x, y, w, h), ...]]
+        [ShaderBound, Region]
 
         if the said shaderbound object is not a partial shader, it will be listed as follows
         [ShaderBound, None]
 
-        this function is recursive in nature and will try to visit all shaderbound objects
+        this function is recursive in nature and will try to visit all shaderbound objects,
+        unless this tree was compiled using compile.
         """
+        if self._bvh is not None:
+            return self._bvh.check_reshade(rect, cull_occluded=cull_occluded)
+        if cull_occluded:
+            return _cull_occluded(self.check_reshade(rect))
 
         if isinstance(rect, tuple):
             assert len(rect) == 4, "Collidable rectangle can only be a 4 float tuple!"
@@ -60,7 +103,7 @@ class ShaderBounds():
         if self.drawable and not self.partial_shader:  # If its a whole shader
             
             # If the point collides with our whole shader, append itself to reshade queue and also append all drawable children
-            if self.rendered.collides_withr(rect):
+            if _collides(self.rendered, rect):
                 reshade.append((self, None))
                 reshade.extend((x, None) for x in self.get_drawable_children())
 
@@ -68,46 +111,16 @@ class ShaderBounds():
 
         # If we are a partial shader or we are not drawble
         elif self.partial_shader or not self.drawable:
-            if self.rendered.collides_withr(rect):
-                reshadable_regions = set()  # All reshadable regions for this current partial shader
-
+            if _collides(self.rendered, rect):
                 reshade_temp = []
+                for x in self.children:
+                    reshade_temp.extend(x.check_reshade(rect))
 
-                # If we are a partial shader and drawable, then extend the area of the rectangle clipped to our render region
+                # If we are a partial shader and drawable, we need to get the partial reshade regions
                 if self.drawable:
-                    self_reshade_region = rect.clip(LRect(self.pos, self.size))
-                    if not self_reshade_region.is_zero():
-                        reshadable_regions.add(self_reshade_region.as_float())
-
-                for x in self.children:
-                    child_reshades = x.check_reshade(rect)
-
-                    # If we are a partial shader and drawble, we need to get the partial reshade regions
-                    if len(child_reshades) != 0 and self.drawable:
-                        for (x, regions) in child_reshades:
-                            if regions is None:  # If the said reshade item is not partial in nature
-                                reshadable_regions.add(x.rendered.clip(shadable_area_rect).as_float())
-                            else:
-                                for y in reshadable_regions:
-                                    reshadable_regions.add(shadable_area_rect.clip(LRect(y[:2], y[2:])).as_float())
-                    
-                    reshade_temp.extend(child_reshades)
-
-                # If we are a partial shader and drawable with partial regions pending
-                if self.drawable and len(reshadable_regions) > 0: 
-                    # Optimization: Check if the reshadable region is more or equal to self!
-                    # In case the area covered by reshadables is more, we are doing extra work and we should instead
-                    # just do the whole shading region!
-                    total_reshadable_regions_size = 0
-                    for x in reshadable_regions:
-                        total_reshadable_regions_size += x[2] * x[3]
-
-                    # if the total reshadable is more than 98% of the self size. 98% was choosen to account for floating point
-                    # inaccuracies.
-                    if total_reshadable_regions_size >= 0.98 * shadable_area_rect.size[0] * shadable_area_rect.size[1]:
-                        reshade.append((self, None))
-                    else:
-                        reshade.append((self, list(reshadable_regions)))
+                    self_reshade = _partial_reshade(self, rect, reshade_temp)
+                    if self_reshade is not None:
+                        reshade.append(self_reshade)
 
                 reshade.extend(reshade_temp)
         
@@ -135,29 +148,97 @@ class ShaderBounds():
         return children
 
     def add_child(self, child: Self):
+        """
+        Add a child, only the child's subtree and the rendered rectangles up to the root are calculated
+        """
         self.children.append(child)
-        self.calculate_child_bounds()
-        child.set_root_shader_bounds(self.root_shaderbounds)
+        child.parent_bounds = self
+        child._calculate_child_bounds()
+        self._invalidate_bvh()
+        self._refit(child.rendered)
 
     def remove_child(self, child: Self):
+        """
+        Remove a child, only the rendered rectangles up to the root that it contributed to are recalculated
+        """
         self.children.remove(child)
-        self.calculate_child_bounds()
-        child.set_root_shader_bounds(self.root_shaderbounds)
+        child.parent_bounds = None
+        self._invalidate_bvh()
+        self._refit()
+
+    def refit(self):
+        """
+        The position or size of this shaderbounds has changed, recalculate its rendered rectangle
+        and those of its ancestors. The children are expected to be up to date.
+        """
+        self._refit()
+
+    def _refit(self, grown: LRect = None):
+        """
+        Update the rendered rectangles along the path to the root, stopping at the first one that
+        does not change. If only grown was added to this shaderbounds, the rendered rectangles are
+        only extended, otherwise they are recalculated from the direct children.
+        """
+        changed = []
+        node = self
+        while node is not None:
+            if grown is not None:
+                rendered = node.rendered + grown
+            else:
+                rendered = LRect(node.pos, node.size)
+                for x in node.children:
+                    rendered += x.rendered
+
+            if rendered.as_float() == node.rendered.as_float():
+                break
+            node.rendered = rendered
+            changed.append(node)
+            node = node.parent_bounds
+
+        bvh = self._compiled_bvh()
+        if bvh is not None:
+            bvh.update_nodes(changed)
 
     def calculate_child_bounds(self):
         """
         Get the minimum size bounding box that encompasses all children recursively and self
         """
+        self._calculate_child_bounds()
+        bvh = self._compiled_bvh()
+        if bvh is not None:
+            bvh.update(self)
+
+    def _calculate_child_bounds(self):
         for x in self.children:
-            x.calculate_child_bounds()
+            x._calculate_child_bounds()
         self.rendered = LRect(self.pos, self.size)
         for x in self.children:
             self.rendered += x.rendered
 
-    def set_root_shader_bounds(self, root):
-        self.root_shaderbounds = root
-        for x in self.children:
-            x.set_root_shader_bounds(root)
+    def compile(self) -> "ShaderBoundsBVH":
+        """
+        Compile this shaderbounds tree into a ShaderBoundsBVH, check_reshade on this object will
+        use it from now on. It is rebuilt by itself when children are added or removed anywhere
+        in its subtree.
+        """
+        self._bvh = ShaderBoundsBVH(self)
+        return self._bvh
+
+    def _compiled_bvh(self) -> "ShaderBoundsBVH":
+        """
+        The nearest compiled tree this shaderbounds is in
+        """
+        node = self
+        while node is not None:
+            if node._bvh is not None:
+                return node._bvh
+            node = node.parent_bounds
+        return None
+
+    def _invalidate_bvh(self):
+        bvh = self._compiled_bvh()
+        if bvh is not None:
+            bvh.invalidate()
 
     def __repr__(self) -> str:
         if self.children:
@@ -173,4 +254,306 @@ class ShaderBounds():
         """
         return the shadable region as a rect
         """
-        return LRect(self.pos, self.size)
\ No newline at end of file
+        return LRect(self.pos, self.size)
+
+def _cull_occluded(reshades: list[tuple[ShaderBounds, Region]]) -> list[tuple[ShaderBounds, Region]]:
+    """
+    Go through the reshades front to back, taking out whatever is covered by
+    the opaque shaders that are drawn after
+    """
+    covered = Region()
+    culled = []
+    for (bounds, regions) in reversed(reshades):
+        shadable_area_rect = bounds.get_shadable_rect()
+        if regions is None:
+            # A whole shader is drawn completely even if it is only partly visible
+            if covered and (Region(shadable_area_rect) - covered).is_empty():
+                continue
+            drawn = shadable_area_rect
+        else:
+            if covered:
+                regions = regions - covered
+                if regions.is_empty():
+                    continue
+            drawn = regions
+
+        if bounds.opaque:
+            covered = covered | (bounds.opaque_region & drawn)
+        culled.append((bounds, regions))
+
+    culled.reverse()
+    return culled
+
+def _collides(rendered: LRect, rect: LRect | Region) -> bool:
+    if isinstance(rect, Region):
+        return any(rendered.collides_withr(LRect(r[:2], r[2:])) for r in rect)
+    return rendered.collides_withr(rect)
+
+def _partial_reshade(bounds: ShaderBounds, rect: LRect | Region, child_reshades: list, clipped: dict = None) -> tuple[ShaderBounds, Region]:
+    """
+    Given the reshades of all the children of a drawable partial shader, return its own
+    reshade entry. None if nothing of it needs to be reshaded
+
+    clipped is an optional cache of the rendered rectangles of the children clipped to the
+    shadable region of bounds, they do not depend on the reshaded rectangle.
+    """
+    shadable_area_rect = bounds.get_shadable_rect()
+    if shadable_area_rect.is_zero():
+        return None
+    x, y, w, h = shadable_area_rect.as_float()
+    shadable = (x, y, x+w, y+h)
+
+    # The rectangle itself and everything the children reshade as they are drawn over us,
+    # as (left, top, right, bottom) clipped to our shading region
+    if isinstance(rect, Region):
+        edges = [_clip_edges(e, shadable) for e in rect._edges()]
+    else:
+        x, y, w, h = rect.as_float()
+        edges = [_clip_edges((x, y, x+w, y+h), shadable)]
+
+    for (child, regions) in child_reshades:
+        if regions is None:  # If the said reshade item is not partial in nature
+            if clipped is None or child not in clipped:
+                x, y, w, h = child.rendered.as_float()
+                e = _clip_edges((x, y, x+w, y+h), shadable) if w > 0 and h > 0 else None
+                if clipped is not None:
+                    clipped[child] = e
+            else:
+                e = clipped[child]
+            if e == shadable:  # Everything is to be reshaded anyway
+                return (bounds, None)
+            edges.append(e)
+        else:
+            edges.extend(_clip_edges(e, shadable) for e in regions._edges())
+
+    reshadable_region = Region._from_edges([e for e in edges if e is not None])
+    if reshadable_region.is_empty():
+        return None
+
+    # If everything is to be reshaded, do the whole shading region instead
+    if reshadable_region == Region(shadable_area_rect):
+        return (bounds, None)
+    return (bounds, reshadable_region)
+
+
+# Kinds of nodes in a ShaderBoundsBVH
+_WHOLE = 0  # Drawable and not a partial shader
+_PARTIAL = 1  # Drawable partial shader
+_GROUP = 2  # Not drawable
+
+class ShaderBoundsBVH:
+    """
+    A ShaderBounds tree flattened into arrays, the rendered rectangles of the shaderbounds
+    form the bounding volume hierarchy. Nodes are stored in preorder, so a subtree is a
+    contiguous range of indices which ends at skip[index].
+
+    check_reshade gives the same results as ShaderBounds.check_reshade without recursing
+    or calling get_drawable_children, the drawable children of every node are a precomputed
+    range of a single preorder list.
+    """
+    def __init__(self, root: ShaderBounds) -> None:
+        self.root = root
+        self.build()
+
+    def build(self) -> None:
+        """
+        (Re)build the arrays from the shaderbounds tree
+        """
+        self.nodes: list[ShaderBounds] = []
+        self.index: dict[ShaderBounds, int] = {}
+        self.skip = array("l")
+        self.kinds = array("b")
+        self.xs = array("d")
+        self.ys = array("d")
+        self.ws = array("d")
+        self.hs = array("d")
+
+        # (node, None) reshade entries of every node and of the drawable nodes in preorder,
+        # the drawable children of a node are drawable_entries[drawable_start[i]:drawable_end[i]]
+        self.entries = []
+        self.drawable_entries = []
+        self.drawable_start = array("l")
+        self.drawable_end = array("l")
+
+        # Rendered rectangles of the descendants of partial shaders clipped to their shadable region
+        self._clipped: dict[int, dict[ShaderBounds, tuple]] = {}
+
+        stack = [(self.root, -1, False)]
+        while stack:
+            node, parent, done = stack.pop()
+            if done:
+                i = self.index[node]
+                self.skip[i] = len(self.nodes)
+                self.drawable_end[i] = len(self.drawable_entries)
+                continue
+
+            i = len(self.nodes)
+            self.nodes.append(node)
+            self.index[node] = i
+            self.skip.append(0)
+            if node.drawable and not node.partial_shader:
+                self.kinds.append(_WHOLE)
+            elif node.drawable:
+                self.kinds.append(_PARTIAL)
+            else:
+                self.kinds.append(_GROUP)
+            self.xs.append(0)
+            self.ys.append(0)
+            self.ws.append(0)
+            self.hs.append(0)
+            self._store(i)
+
+            entry = (node, None)
+            self.entries.append(entry)
+            if node.drawable and parent != -1:
+                self.drawable_entries.append(entry)
+            self.drawable_start.append(len(self.drawable_entries))
+            self.drawable_end.append(0)
+
+            stack.append((node, parent, True))
+            for x in reversed(node.children):
+                stack.append((x, i, False))
+
+        self._stale = False
+
+    def invalidate(self) -> None:
+        """
+        The structure of the tree has changed, rebuild on the next query
+        """
+        self._stale = True
+
+    def _store(self, i: int) -> None:
+        rendered = self.nodes[i].rendered
+        self.xs[i], self.ys[i] = rendered.pos
+        self.ws[i], self.hs[i] = rendered.size
+
+    def update(self, bounds: ShaderBounds) -> None:
+        """
+        The rendered rectangles of the subtree of the given shaderbounds have been recalculated
+        """
+        if self._stale:
+            return
+        i = self.index[bounds]
+        for j in range(i, self.skip[i]):
+            self._store(j)
+        self._clipped.clear()
+
+    def update_nodes(self, nodes: list[ShaderBounds]) -> None:
+        """
+        The rendered rectangles of the given shaderbounds have been changed
+        """
+        if self._stale or not nodes:
+            return
+        for x in nodes:
+            i = self.index.get(x)
+            if i is not None:
+                self._store(i)
+        self._clipped.clear()
+
+    def refit(self, bounds: ShaderBounds) -> None:
+        """
+        The position or size of the given shaderbounds has changed, same as ShaderBounds.refit
+        """
+        bounds.refit()
+
+    def check_reshade(self, rect: tuple[float, float, float, float] | LRect | Region, *, cull_occluded: bool = False) -> list[tuple[Any, Region]]:
+        """
+        Same as ShaderBounds.check_reshade
+        """
+        if self._stale:
+            self.build()
+        if cull_occluded:
+            return _cull_occluded(self.check_reshade(rect))
+
+        if isinstance(rect, tuple):
+            assert len(rect) == 4, "Collidable rectangle can only be a 4 float tuple!"
+            rect = LRect(rect[:2], rect[2:])
+        reshade = []
+
+        # The rectangles of a region with more than one, bounds are checked first
+        region_edges = None
+        if isinstance(rect, Region):
+            if rect.is_empty():
+                return reshade
+            if len(rect) > 1:
+                region_edges = list(rect._edges())
+            bounds = rect.bounds
+        else:
+            if rect.is_zero():  # Nothing collides with it
+                return reshade
+            bounds = rect
+
+        left, top = bounds.pos
+        right = left + bounds.size[0]
+        bottom = top + bounds.size[1]
+
+        xs, ys, ws, hs = self.xs, self.ys, self.ws, self.hs
+        skip = self.skip
+        kinds = self.kinds
+        entries = self.entries
+        drawable_entries = self.drawable_entries
+
+        # Drawable partial shaders whose subtree is being visited, as (index, reshade slot)
+        # Their entry is only known after their subtree is visited
+        partials = []
+        dropped = False
+
+        i = 0
+        n = len(self.nodes)
+        while i < n:
+            while partials and i >= skip[partials[-1][0]]:
+                dropped |= self._finish_partial(partials.pop(), rect, reshade)
+
+            w = ws[i]
+            h = hs[i]
+            x = xs[i]
+            y = ys[i]
+            if w <= 0 or h <= 0 or x > right or left > x + w or y > bottom or top > y + h:
+                i = skip[i]
+                continue
+            if region_edges is not None and not _collides_edges(x, y, w, h, region_edges):
+                i = skip[i]
+                continue
+
+            kind = kinds[i]
+            if kind == _WHOLE:
+                reshade.append(entries[i])
+                reshade.extend(drawable_entries[self.drawable_start[i]:self.drawable_end[i]])
+                i = skip[i]
+                continue
+            elif kind == _PARTIAL:
+                partials.append((i, len(reshade)))
+                reshade.append(None)
+            i += 1
+
+        while partials:
+            dropped |= self._finish_partial(partials.pop(), rect, reshade)
+
+        if dropped:
+            reshade = [x for x in reshade if x is not None]
+        return reshade
+
+    def _finish_partial(self, partial: tuple[int, int], rect: LRect, reshade: list) -> bool:
+        """
+        Fill in the reshade entry of a partial shader, returns True if it had none
+        """
+        i, slot = partial
+        child_reshades = [x for x in reshade[slot+1:] if x is not None]
+        clipped = self._clipped.get(i)
+        if clipped is None:
+            clipped = self._clipped[i] = {}
+        reshade[slot] = _partial_reshade(self.nodes[i], rect, child_reshades, clipped)
+        return reshade[slot] is None
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+
+def _collides_edges(x: float, y: float, w: float, h: float, edges: list[tuple[float, float, float, float]]) -> bool:
+    """
+    Same as LRect.collides_withr against any of the (left, top, right, bottom) rectangles
+    """
+    for (left, top, right, bottom) in edges:
+        if not (x > right or left > x + w or y > bottom or top > y + h):
+            return True
+    return False
@@ -1,4 +1,5 @@
 import enum
+import functools
 from .utils import _collides_rect
 
 class UNIT(enum.Enum):
@@ -32,59 +33,72 @@ class LUnit:
     * flex (f)
     * viewport width % (vw)
     * viewport height % (vh)
+
+    LUnit objects are immutable, string specifications are parsed only once
+    and common values are interned, so constructing them is cheap.
     """
+    __slots__ = ("val", "unit")
 
-    def __init__(self, *args) -> None:
+    def __new__(cls, *args) -> "LUnit":
 
         # If the arguement is provided as a single string "4 px"
         # The string must be space separated
         if isinstance(args[0], str):
-            val, unit = args[0].split(' ', 1)
-            self.val = float(val)
-            self.unit = _UNITS[unit]
+            return _parse_lunit(args[0])
 
         # if the argument is provided as 2-argument pair of (value: int, unit: str/Unit Enum)
         elif isinstance(args[0], (float, int)):
-            self.val = args[0]
-
             if len(args) <= 1:
-                self.unit = UNIT.px
+                return _lunit(float(args[0]), UNIT.px)
 
             # Check the second argument
-            elif isinstance(args[1], (UNIT, int)):
-                self.unit = args[1]
+            elif isinstance(args[1], UNIT):
+                return _lunit(float(args[0]), args[1])
             else:
-                self.unit = _UNITS[1]  # Else just convert the string to proper unit...
+                return _lunit(float(args[0]), _UNITS[args[1]])  # Else just convert the string to proper unit...
         
         elif isinstance(args[0], LUnit):  # If the said instance already a LUnit
-            self.unit = args[0].unit
-            self.val = args[0].val
+            return args[0]
         else:
             raise TypeError(f"Unknown LUnit constructor args: {args}")
 
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} objects are immutable")
+
+    def __reduce__(self):
+        return (LUnit, (self.val, self.unit))
+
     # Make sure that the units match for any maths operation
     def _check_math(self, other: "LUnit") -> None:
         if isinstance(other, (float, int)):  # Given regular arithmetic, auto convert to LUnit
-            other = LUnit(other, self.unit)
+            return _lunit(float(other), self.unit)
         assert self.unit == other.unit, "Different Units cannot be added"
         return other
         
     # Below are the classic addition, subtraction, multiplication and division functions
     def __add__(self, other: "LUnit") -> "LUnit":
         other = self._check_math(other)
-        return LUnit(self.val + other.val, self.unit)
+        return _lunit(self.val + other.val, self.unit)
     
     def __sub__(self, other: "LUnit") -> "LUnit":
         other = self._check_math(other)
-        return LUnit(self.val - other.val, self.unit)
+        return _lunit(self.val - other.val, self.unit)
 
     def __mul__(self, other: "LUnit") -> "LUnit":
         other = self._check_math(other)
-        return LUnit(self.val * other.val, self.unit)
+        return _lunit(self.val * other.val, self.unit)
 
     def __truediv__(self, other: "LUnit") -> "LUnit":
         other = self._check_math(other)
-        return LUnit(self.val / other.val, self.unit)
+        return _lunit(self.val / other.val, self.unit)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, LUnit):
+            return NotImplemented
+        return self.val == other.val and self.unit == other.unit
+
+    def __hash__(self) -> int:
+        return hash((self.val, self.unit))
     
     def abs(self, space: float, viewport_space: "LUnit2"):
         """
@@ -98,15 +112,17 @@ class LUnit:
         """
         match self.unit:
             case UNIT.px:
-                return LUnit(min(space, self.val), UNIT.px)
+                if self.val <= space:  # Already absolute, no need for a new object
+                    return self
+                return _lunit(float(space), UNIT.px)
             case UNIT.percent:
-                return LUnit(min(space, self.val*space/100), UNIT.px)
+                return _lunit(float(min(space, self.val*space/100)), UNIT.px)
             case UNIT.vh:
-                return LUnit(min(space, min(self.val, 100)*viewport_space.y.val/100), UNIT.px)
+                return _lunit(float(min(space, min(self.val, 100)*viewport_space.y.val/100)), UNIT.px)
             case UNIT.vw:
-                return LUnit(min(space, min(self.val, 100)*viewport_space.x.val/100), UNIT.px)
+                return _lunit(float(min(space, min(self.val, 100)*viewport_space.x.val/100)), UNIT.px)
             case UNIT.f:
-                return LUnit(space, UNIT.px)
+                return _lunit(float(space), UNIT.px)
             case _:
                 raise TypeError(f"Unknown Unit Type: {self.unit}")
     
@@ -119,74 +135,146 @@ class LUnit:
     def as_float(self) -> float:
         return self.val
 
+# Slot descriptors, used to initialize the immutable objects
+_set_val = LUnit.val.__set__
+_set_unit = LUnit.unit.__set__
+
+# Commonly used values, these are always returned instead of creating new objects
+_INTERNED_VALS = (0.0, 1.0, 50.0, 100.0)
+_INTERNED = {}
+
+def _lunit(val: float, unit: UNIT) -> LUnit:
+    """
+    Internal LUnit constructor, does no argument checking
+    """
+    if val in _INTERNED_VALS:  # Quick check to avoid the (slower) dictionary lookup for most values
+        interned = _INTERNED.get((val, unit))
+        if interned is not None:
+            return interned
+    obj = object.__new__(LUnit)
+    _set_val(obj, val)
+    _set_unit(obj, unit)
+    return obj
+
+for _unit in UNIT:
+    for _val in _INTERNED_VALS:
+        _INTERNED[(_val, _unit)] = _lunit(_val, _unit)
+
+@functools.lru_cache(maxsize=1024)
+def _parse_lunit(spec: str) -> LUnit:
+    """
+    Parse a "4 px" like LUnit specification. The results are cached
+    """
+    val, unit = spec.split(' ', 1)
+    return _lunit(float(val), _UNITS[unit])
+
 class LUnit2:
     """
-    2 Dimensional Unit
+    2 Dimensional Unit, immutable just like LUnit
     """
-    def __init__(self, x: LUnit, y: LUnit) -> None:
-        if isinstance(x, str):
-            self.x = LUnit(x)
-        elif isinstance(x, tuple):
-            self.x = LUnit(*x)
-        elif isinstance(x, (float, int)):
-            self.x = LUnit(x, UNIT.px)
-        else:
-            self.x = x
-        
-        if isinstance(y, str):
-            self.y = LUnit(y)
-        elif isinstance(y, tuple):
-            self.y = LUnit(*y)
-        elif isinstance(y, (float, int)):
-            self.y = LUnit(y, UNIT.px)
-        else:
-            self.y = y
+    __slots__ = ("x", "y")
+
+    def __new__(cls, x: LUnit, y: LUnit) -> "LUnit2":
+        if x.__class__ is not LUnit:
+            x = _as_lunit(x)
+        if y.__class__ is not LUnit:
+            y = _as_lunit(y)
+        return _lunit2(x, y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} objects are immutable")
+
+    def __reduce__(self):
+        return (LUnit2, (self.x, self.y))
 
     def __add__(self, others: "LUnit2") -> "LUnit2":
         if isinstance(others, tuple):  # If the other unit is a tuple(int, int)
-            return LUnit2(self.x + others[0], self.y + others[1])
-        return LUnit2(self.x + others.x, self.y + others.y)
+            return _lunit2(self.x + others[0], self.y + others[1])
+        return _lunit2(self.x + others.x, self.y + others.y)
     
     def __sub__(self, others: "LUnit2") -> "LUnit2":
         if isinstance(others, tuple):
-            return LUnit2(self.x - others[0], self.y - others[1])
-        return LUnit2(self.x - others.x, self.y - others.y)
+            return _lunit2(self.x - others[0], self.y - others[1])
+        return _lunit2(self.x - others.x, self.y - others.y)
     
     def __mul__(self, others: "LUnit2") -> "LUnit2":
         if isinstance(others, tuple):
-            return LUnit2(self.x * others[0], self.y * others[1])
-        return LUnit2(self.x * others.x, self.y * others.y)
+            return _lunit2(self.x * others[0], self.y * others[1])
+        return _lunit2(self.x * others.x, self.y * others.y)
     
     def __truediv__(self, others: "LUnit2") -> "LUnit2":
         if isinstance(others, tuple):
-            return LUnit2(self.x / others[0], self.y / others[1])
-        return LUnit2(self.x / others.x, self.y / others.y)
+            return _lunit2(self.x / others[0], self.y / others[1])
+        return _lunit2(self.x / others.x, self.y / others.y)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, LUnit2):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
     
     def abs_x(self, *args) -> "LUnit2":
         """Abs function for the x axis"""
-        return LUnit2(self.x.abs(*args), self.y)
+        return _lunit2(self.x.abs(*args), self.y)
 
     def abs_y(self, *args) -> "LUnit2":
         """Abs function for the y axis"""
-        return LUnit2(self.x, self.y.abs(*args))
+        return _lunit2(self.x, self.y.abs(*args))
     
     def abs(self, x_space, y_space, *args) -> "LUnit2":
         """Abs function for both the axis"""
-        return LUnit2(self.x.abs(x_space, *args), self.y.abs(y_space, *args))
+        return _lunit2(self.x.abs(x_space, *args), self.y.abs(y_space, *args))
     
     def with_x(self, arg: LUnit) -> "LUnit2":
         """Change the x component of the LUnit object and return a new object"""
-        return LUnit2(LUnit(arg), self.y)
+        return _lunit2(_as_lunit(arg), self.y)
     
     def with_y(self, arg: LUnit) -> "LUnit2":
         """Change the y component of the LUnit object and return a new object"""
-        return LUnit2(self.x, LUnit(arg))
+        return _lunit2(self.x, _as_lunit(arg))
     
     def __repr__(self) -> str:
         return f"({self.x}, {self.y})"
     
     def as_float(self) -> tuple[float, float]:
         return (self.x.val, self.y.val)
+
+_set_x = LUnit2.x.__set__
+_set_y = LUnit2.y.__set__
+
+def _as_lunit(x) -> LUnit:
+    """
+    Convert any of the accepted LUnit2 component forms to a LUnit
+    """
+    if x.__class__ is LUnit:
+        return x
+    elif x.__class__ is float:  # The most common case in the layout code
+        return _lunit(x, UNIT.px)
+    elif isinstance(x, str):
+        return _parse_lunit(x)
+    elif isinstance(x, tuple):
+        return LUnit(*x)
+    elif isinstance(x, (float, int)):
+        return _lunit(float(x), UNIT.px)
+    return LUnit(x)
+
+_ZERO_PX = _INTERNED[(0.0, UNIT.px)]
+_ZERO2 = None
+
+def _lunit2(x: LUnit, y: LUnit) -> LUnit2:
+    """
+    Internal LUnit2 constructor, does no argument checking
+    """
+    if x is _ZERO_PX and y is _ZERO_PX and _ZERO2 is not None:
+        return _ZERO2
+    obj = object.__new__(LUnit2)
+    _set_x(obj, x)
+    _set_y(obj, y)
+    return obj
+
+_ZERO2 = _lunit2(_ZERO_PX, _ZERO_PX)
     
 class LRect:
     """
@@ -1,6 +1,7 @@
 import abc
 from ..layout_manager.shader_bounds import ShaderBounds
 from ..layout_manager.layout_object import LayoutObject
+from ..layout_manager.region import Region
 
 class ShaderObject(abc.ABC):
     """
@@ -12,21 +13,27 @@ class ShaderObject(abc.ABC):
 
     Widgets are required to add children shader boundaries to their own shader's boundary or else
     a reshade won't occur!
+
+    Shader classes are registered in a ShaderPack using their shadername class attribute.
     """
-    def __init__(self, shadername: str, *, partial_shader: bool) -> None:
+    shadername: str = None
+
+    def __init__(self, shadername: str, *, partial_shader: bool, opaque: bool | Region = False) -> None:
         self.shadername = shadername
         self.partial_shader = partial_shader  # Determines if the shader allows partial redraws
+        self.opaque = opaque  # What the shader covers completely, True for everything it shades
         self.shader_bounds = None
         self.build_context = None
 
     def set_build_context(self, buildcontext):
         self.build_context = buildcontext
 
-    def shade(self, *, regions: list[tuple[float, float, float, float]] = None, **kwargs) -> None:
+    def shade(self, *, regions: Region = None, **kwargs) -> None:
         """
         Shade on the given surface with the given keyword arguments
         
-        if the shader is a partial shader, it is also provided with regions to shade in (x, y, w, h) format!
+        if the shader is a partial shader, it is also provided with a Region to shade in, iterating
+        over it gives non-overlapping rectangles in (x, y, w, h) format!
 
         No shader must exceed their shading boundaries. If they do, it will lead to
         graphical glitches that are hard to track!
@@ -37,4 +44,4 @@ class ShaderObject(abc.ABC):
         """
         Calculate the shader boundary object for this shader
         """
-        self.shader_bounds = ShaderBounds(layout_object.pos.as_float(), layout_object.rendered.as_float(), drawable=False, partial_shader=False, parent=self)
+        self.shader_bounds = ShaderBounds(layout_object.pos.as_float(), layout_object.rendered.as_float(), drawable=False, partial_shader=False, parent=self, opaque=self.opaque)
@@ -2,16 +2,17 @@ from .shader_object import ShaderObject
 
 class ShaderPack:
     """
-    A collection of shaders. Has a shaderpack_name
+    A collection of shader classes, by their shadername. Has a shaderpack_name
     """
-    def __init__(self, shaderpack_name: str, *args: list[ShaderObject]) -> None:
+    def __init__(self, shaderpack_name: str, *args: list[type[ShaderObject]]) -> None:
         self.name = shaderpack_name
-        self.shaders = {}
+        self.shaders: dict[str, type[ShaderObject]] = {}
         for x in args:
-            self.shaders[x.name] = x
+            self.shaders[x.shadername] = x
         self.build_context = None
 
     def set_build_context(self, build_context):
-        self.build_context = build_context
-        for x in self.shaders.items():
-            x.set_build_context(build_context)
\ No newline at end of file
+        """
+        The shader objects made from these classes are given the build context by their widgets
+        """
+        self.build_context = build_context
\ No newline at end of file
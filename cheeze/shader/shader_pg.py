@@ -2,21 +2,22 @@ import pygame as pg
 
 from ..layout_manager.layout_object import LayoutObject
 from ..layout_manager.shader_bounds import ShaderBounds
+from ..layout_manager.region import Region
 from .shader_object import ShaderObject
 
 class ShaderPygame(ShaderObject):
-    def __init__(self, shadername: str) -> None:
-        super().__init__(shadername)
+    def __init__(self, shadername: str = None, *, partial_shader: bool = False, opaque: bool | Region = False) -> None:
+        super().__init__(shadername or self.shadername, partial_shader=partial_shader, opaque=opaque)
 
-    def shade(self, *, regions: list[tuple[float, float, float, float]] = None, surf: pg.Surface, **kwargs):
+    def shade(self, *, regions: Region = None, surf: pg.Surface, **kwargs):
         """
         This is the default shader method for ShaderPygame, please implement it!
         """
         if regions is None:
-            regions = [self.shader_bounds.rendered.as_float()]
+            regions = [self.shader_bounds.get_shadable_rect().as_float()]
         for x in regions:
             surf.fill((255, 255, 255), pg.Rect(x))
 
     def calculate_shader_boundary(self, layout_object: LayoutObject):
-        self.shader_bounds = ShaderBounds(layout_object.pos.as_float(), layout_object.rendered.as_float(), drawable=False, partial_shader=False, parent=self)
+        self.shader_bounds = ShaderBounds(layout_object.pos.as_float(), layout_object.rendered.as_float(), drawable=True, partial_shader=self.partial_shader, parent=self, opaque=self.opaque)
         self.shader_bounds.calculate_child_bounds()
\ No newline at end of file
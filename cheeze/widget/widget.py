@@ -4,6 +4,7 @@ from ..shader.shader_object import ShaderObject
 from ..event.event_object import Event
 from ..animation.animation_object import AnimationObject, AnimationResult
 from ..layout_manager.layout_object import LayoutObject
+from ..layout_manager.units import LRect
 from typing import Union, Self
 import enum
 
@@ -17,6 +18,7 @@ class Widget(abc.ABC):
     """
     def __init__(self, shader: str) -> None:
         self._shader_name = shader
+        self.build_context: BuildContext = None
         self.shader: ShaderObject = None
         self.layout_object: LayoutObject = None
         self.reshade_: bool = False
@@ -71,6 +73,22 @@ class Widget(abc.ABC):
         elif isinstance(self.child, Widget):
             self.child.init()
 
+    def get_children(self) -> list[Self]:
+        """
+        The direct children of this widget as a list
+        """
+        if self.child is None:
+            return []
+        elif isinstance(self.child, list):
+            return self.child
+        return [self.child]
+
+    def is_dynamic(self) -> bool:
+        """
+        If the widget is drawn again every frame, because it is dynamic or animating
+        """
+        return self.state_ == WidgetState.DYNAMIC or self.animation_result_ is not None or len(self.animation) > 0
+
     def event(self, evt: Event):
         """
         Handle events given to this object!
@@ -93,6 +111,13 @@ class Widget(abc.ABC):
             else:
                 break
         
+        # The area the widget moved out of and into has to be reshaded
+        if animationresult != self.animation_result_:
+            tracker = self._damage_tracker()
+            rect = self.reshade_rect()
+            if tracker is not None and rect is not None:
+                tracker.add_animation(rect, self.animation_result_, animationresult, self.build_context.scaling)
+
         self.animation_result_ = animationresult
 
         # Do children animations
@@ -109,6 +134,26 @@ class Widget(abc.ABC):
         animation.set_build_context(self.build_context)
 
     def queue_reshade(self):
+        """
+        Reshade this widget in the next frame
+        """
         self.reshade_ = True
+        tracker = self._damage_tracker()
+        rect = self.reshade_rect()
+        if tracker is not None and rect is not None:
+            tracker.add(rect)
+
+    def reshade_rect(self) -> LRect:
+        """
+        The area the shader of this widget shades in, None if it does not have one yet
+        """
+        if self.shader is None or self.shader.shader_bounds is None:
+            return None
+        return self.shader.shader_bounds.get_shadable_rect()
+
+    def _damage_tracker(self):
+        if self.build_context is None:
+            return None
+        return self.build_context.damage_tracker
 
     
\ No newline at end of file
@@ -0,0 +1,827 @@
+import unittest
+import unittest.mock
+import os
+import threading
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame as pg
+from cheeze import *
+from cheeze.animation import AnimationObject, AnimationResult
+from cheeze.app.app_pg import AppPygame
+from cheeze.app.app_headless_pg import AppHeadlessPygame
+from cheeze.app import batch_render
+import tempfile
+import json
+import io
+from pathlib import Path
+from cheeze.app.font_loader_pg import FontLoaderPygame
+from cheeze.shader.shader_pg import ShaderPygame
+from cheeze.default.shaders import LabelShader, ParagraphShader
+from cheeze.default.widgets import Label, Paragraph
+from cheeze.app.glyph_atlas_pg import GlyphAtlasPygame, needs_shaping
+from cheeze.app.font_index_pg import SystemFontIndex
+import shutil
+from cheeze.widget.widget import WidgetState
+
+class TestDamageTracker(unittest.TestCase):
+    def test_coalescing(self):
+        tracker = DamageTracker(tile_size=10)
+        tracker.add((1, 1, 2, 2))
+        tracker.add((5, 5, 3, 3))
+        tracker.add(LRect((12, 2), (5, 5)))
+        tracker.add((50, 50, 0, 10))  # Empty rectangles are ignored
+
+        # All of them are inside the first two tiles
+        self.assertEqual(tracker.coalesce().rects(), [(0, 0, 20, 10)])
+
+        tracker.tile_size = None
+        self.assertEqual(tracker.coalesce().area, 4 + 9 + 25)
+
+    def test_flush(self):
+        a = ShaderBounds((0, 0), (20, 20), partial_shader=False, drawable=True, parent="A")
+        b = ShaderBounds((50, 0), (20, 20), partial_shader=False, drawable=True, parent="B")
+        c = ShaderBounds((100, 100), (20, 20), partial_shader=False, drawable=True, parent="C")
+        root = ShaderBounds((0, 0), (200, 200), partial_shader=True, drawable=True, parent="root", children=[a, b, c])
+        root.calculate_child_bounds()
+
+        tracker = DamageTracker(tile_size=8)
+        for _ in range(3):
+            tracker.add((2, 2, 4, 4))
+            tracker.add((52, 2, 4, 4))
+        reshades = tracker.flush(root)
+
+        # Every shaderbounds is only reshaded once, in one query
+        self.assertEqual([x for x, _ in reshades], [root, a, b])
+        self.assertEqual(reshades[0][1], Region([(0, 0, 20, 20), (50, 0, 20, 20), (48, 0, 8, 8)]))
+        self.assertEqual((tracker.submitted, tracker.merged), (6, 2))
+        self.assertFalse(tracker.has_damage())
+
+        self.assertEqual(tracker.flush(root), [])
+        self.assertEqual(tracker.stats()["total_submitted"], 6)
+        self.assertEqual(tracker.frames, 2)
+
+    def test_animation(self):
+        tracker = DamageTracker(tile_size=None)
+        tracker.add_animation((0, 0, 10, 10), None, AnimationResult(translate=(5, 0)), scaling=2)
+        self.assertEqual(tracker.coalesce().rects(), [(0, 0, 20, 10)])
+
+
+class TestScheduler(unittest.TestCase):
+    def test_timers(self):
+        now = [0.0]
+        scheduler = Scheduler(clock=lambda: now[0])
+        calls = []
+        self.assertIsNone(scheduler.time_until_next())
+
+        scheduler.add_timer(2, lambda: calls.append("b"))
+        scheduler.add_timer(1, lambda: calls.append("a"))
+        repeat = scheduler.add_timer(1.5, lambda: calls.append("r"), repeat=True)
+        cancelled = scheduler.add_timer(0.5, lambda: calls.append("c"))
+        cancelled.cancel()
+        self.assertEqual(len(scheduler), 3)
+        self.assertEqual(scheduler.time_until_next(), 1)
+
+        now[0] = 1.6
+        self.assertEqual(scheduler.run_due(), 2)
+        self.assertEqual(calls, ["a", "r"])
+        self.assertAlmostEqual(scheduler.time_until_next(), 0.4)
+
+        # Missed runs of a repeating timer are skipped
+        now[0] = 10
+        self.assertEqual(scheduler.run_due(), 2)
+        self.assertEqual(calls, ["a", "r", "b", "r"])
+        self.assertEqual(scheduler.time_until_next(), 0)
+        repeat.cancel()
+        self.assertIsNone(scheduler.time_until_next())
+
+    def test_threadsafe(self):
+        wakeups = []
+        scheduler = Scheduler(waker=lambda: wakeups.append(True))
+        calls = []
+        thread = threading.Thread(target=scheduler.call_soon_threadsafe, args=(lambda: calls.append(1),))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(wakeups, [True])
+        self.assertEqual(scheduler.time_until_next(), 0)
+        self.assertEqual(scheduler.run_due(), 1)
+        self.assertEqual(calls, [1])
+
+
+class ColorShader(ShaderPygame):
+    """
+    Fills its area with a color, counts how many times it was shaded
+    """
+    shadername = "color"
+
+    def __init__(self, color: tuple, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.color = color
+        self.shade_count = 0
+
+    def shade(self, *, regions=None, surf, **kwargs):
+        self.shade_count += 1
+        if regions is None:
+            regions = [self.shader_bounds.get_shadable_rect().as_float()]
+        result = kwargs.get("animation_result")
+        translate = result.translate if result is not None and result.translate is not None else (0, 0)
+        for x in regions:
+            surf.fill(self.color, pg.Rect(x).move(translate))
+
+
+class Slide(AnimationObject):
+    """
+    Keeps a widget moved by translate
+    """
+    def __init__(self, translate: tuple) -> None:
+        super().__init__()
+        self.translate = translate
+
+    def next_frame(self, dt: float) -> AnimationResult:
+        return AnimationResult(translate=self.translate)
+
+
+class BoxWidget(Widget):
+    def __init__(self, size: tuple, color: tuple, children: list = None, **shader_kwargs) -> None:
+        super().__init__("color")
+        self.size = size
+        self.color = color
+        self.child = children
+        self.shader_kwargs = shader_kwargs
+
+    def init(self):
+        if self.shader is None:
+            self.shader = self.shader_cls(self.color, **self.shader_kwargs)
+            children = [x.layout_object for x in self.get_children()]
+            self.layout_object = LayoutSequence(LUnit2(*self.size), children=children) if children else LayoutSimple(LUnit2(*self.size))
+        super().init()
+
+
+def make_app(child: Widget, size: tuple = (100, 100)) -> AppPygame:
+    build_context = BuildContext(
+        shader_pack=ShaderPack("test", ColorShader),
+        text_theme=TextTheme(font_loader=FontLoaderPygame(".")),
+        color_theme=ColorTheme(background=(0, 0, 0)),
+        scaling=1
+    )
+    app = AppPygame(size, build_context=build_context, child=child, damage_tile_size=10)
+    app.surf = pg.Surface(size)
+    app.init_compositor()
+    return app
+
+
+class TestCompositor(unittest.TestCase):
+    def test_static_layer(self):
+        a = BoxWidget((30, 30), (255, 0, 0))
+        b = BoxWidget((30, 30), (0, 255, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [a, b], partial_shader=True)
+        app = make_app(root)
+
+        app.render_frame(0.016)
+        self.assertEqual(tuple(app.surf.get_at((5, 5)))[:3], (255, 0, 0))
+        self.assertEqual(tuple(app.surf.get_at((35, 5)))[:3], (0, 255, 0))
+        self.assertEqual(tuple(app.surf.get_at((5, 50)))[:3], (0, 0, 255))
+        counts = (a.shader.shade_count, b.shader.shade_count, root.shader.shade_count)
+
+        # Nothing changes, nothing is shaded or composed
+        self.assertTrue(app.render_frame(0.016).is_empty())
+        self.assertEqual((a.shader.shade_count, b.shader.shade_count, root.shader.shade_count), counts)
+
+        # Only the damaged widget and the partial shader below it are shaded again
+        b.shader.color = (255, 255, 0)
+        b.queue_reshade()
+        changed = app.render_frame(0.016)
+        self.assertEqual(changed, Region((30, 0, 30, 30)))
+        self.assertEqual((a.shader.shade_count, b.shader.shade_count), (counts[0], counts[1]+1))
+        self.assertEqual(tuple(app.surf.get_at((35, 5)))[:3], (255, 255, 0))
+        self.assertEqual(tuple(app.surf.get_at((5, 5)))[:3], (255, 0, 0))
+
+    def test_dynamic_layer(self):
+        a = BoxWidget((30, 30), (255, 0, 0))
+        spinner = BoxWidget((10, 10), (0, 255, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [a, spinner], partial_shader=True)
+        app = make_app(root)
+        app.render_frame(0.016)
+
+        spinner.state_ = WidgetState.DYNAMIC
+        app.render_frame(0.016)
+        counts = (a.shader.shade_count, root.shader.shade_count)
+
+        # Only the dynamic widget is drawn every frame
+        for _ in range(3):
+            changed = app.render_frame(0.016)
+            self.assertEqual(changed, Region((30, 0, 10, 10)))
+            self.assertEqual(app.compositor.static_shaded, 0)
+            self.assertEqual(app.compositor.dynamic_shaded, 1)
+        self.assertEqual((a.shader.shade_count, root.shader.shade_count), counts)
+        self.assertEqual(tuple(app.surf.get_at((32, 2)))[:3], (0, 255, 0))
+
+        # Back to static, it is shaded onto the static layer again
+        spinner.state_ = WidgetState.STATIC
+        spinner.shader.color = (255, 255, 255)
+        app.render_frame(0.016)
+        self.assertEqual(app.compositor.dynamic_shaded, 0)
+        self.assertEqual(tuple(app.surf.get_at((32, 2)))[:3], (255, 255, 255))
+
+    def test_dynamic_overlap(self):
+        spinner = BoxWidget((10, 10), (0, 255, 0))
+        c = BoxWidget((10, 10), (255, 0, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [spinner, c], partial_shader=True)
+        app = make_app(root)
+        app.render_frame(0.016)
+
+        # The spinner slides under c, which is drawn after it
+        spinner.add_animation(Slide((5, 0)))
+        for _ in range(2):
+            app.render_frame(0.016)
+            self.assertEqual(tuple(app.surf.get_at((7, 2)))[:3], (0, 255, 0))
+            self.assertEqual(tuple(app.surf.get_at((12, 2)))[:3], (255, 0, 0))
+            self.assertEqual(tuple(app.surf.get_at((2, 2)))[:3], (0, 0, 255))
+        self.assertEqual(app.compositor.overlay_shaded, 1)
+
+    def test_incremental_shader_bounds(self):
+        a = BoxWidget((30, 30), (255, 0, 0))
+        b = BoxWidget((20, 20), (0, 255, 0))
+        c = BoxWidget((10, 10), (255, 255, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [a, b, c], partial_shader=True)
+        app = make_app(root)
+        app.render_frame(0.016)
+        root_bounds = app.shader_bounds_root
+
+        def snapshot():
+            nodes = []
+            stack = [app.shader_bounds_root]
+            while stack:
+                x = stack.pop()
+                nodes.append((x.parent, x.pos, x.size, x.rendered.as_float()))
+                stack.extend(reversed(x.children))
+            return nodes
+
+        def check():
+            # The same as building the tree again
+            self.assertIs(app.shader_bounds_root, root_bounds)
+            incremental = snapshot()
+            app.build_shader_bounds()
+            self.assertEqual(incremental, snapshot())
+
+        # Resizing a widget moves the ones after it
+        b_bounds = b.shader.shader_bounds
+        a.layout_object.dim = LUnit2(40, 30)
+        app.render_frame(0.016)
+        self.assertIs(b.shader.shader_bounds, b_bounds)
+        self.assertEqual(b_bounds.pos, (40, 0))
+        self.assertEqual(app.damage_tracker.damage.bounds.as_float(), (0, 0, 70, 30))  # Not the whole window
+        self.assertEqual(tuple(app.surf.get_at((65, 5)))[:3], (255, 255, 0))
+        check()
+
+        # Removing and adding widgets
+        root_bounds = app.shader_bounds_root
+        root.child.remove(b)
+        root.layout_object.remove_child(b.layout_object)
+        d = BoxWidget((5, 5), (255, 255, 255))
+        d.set_build_context(app.build_context)
+        root.child.insert(0, d)
+        root.layout_object.children.insert(0, d.layout_object)
+        d.layout_object.parent = root.layout_object
+        root.layout_object.mark_dirty()
+        app.render_frame(0.016)
+        self.assertEqual(tuple(app.surf.get_at((2, 2)))[:3], (255, 255, 255))
+        self.assertEqual(tuple(app.surf.get_at((50, 5)))[:3], (255, 255, 0))
+        self.assertEqual(tuple(app.surf.get_at((60, 5)))[:3], (0, 0, 255))
+        check()
+
+    def test_present(self):
+        a = BoxWidget((30, 30), (255, 0, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [a], partial_shader=True)
+        app = make_app(root)
+        app.surf = pg.display.set_mode((100, 100))
+        bytesize = app.surf.get_bytesize()
+
+        # The first frame is everything
+        app.present(app.render_frame(0.016))
+        self.assertEqual((app.full_updates, app.partial_updates), (1, 0))
+        self.assertEqual(app.bytes_pushed, 100*100*bytesize)
+
+        app.present(app.render_frame(0.016))
+        self.assertEqual(app.bytes_pushed, 0)
+
+        a.queue_reshade()
+        app.present(app.render_frame(0.016))
+        self.assertEqual((app.full_updates, app.partial_updates), (1, 1))
+        self.assertEqual(app.bytes_pushed, 30*30*bytesize)
+        self.assertEqual(app.total_bytes_pushed, (100*100 + 30*30)*bytesize)
+
+
+class TestMainLoop(unittest.TestCase):
+    def make_app(self) -> AppPygame:
+        a = BoxWidget((30, 30), (255, 0, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [a], partial_shader=True)
+        return make_app(root)
+
+    def stop(self, app: AppPygame):
+        app.running = False
+
+    def test_idle(self):
+        app = self.make_app()
+        app.add_timer(0.2, lambda: self.stop(app))
+        app.run()
+
+        # Nothing changes after the first frame, so the app sleeps until the timer
+        self.assertLess(app.frames, 4)
+        self.assertFalse(app.is_active())
+
+    def test_wakeup(self):
+        app = self.make_app()
+        thread = threading.Timer(0.1, app.call_soon_threadsafe, args=(lambda: self.stop(app),))
+        thread.start()
+        app.run()
+        thread.join()
+        self.assertLess(app.frames, 4)
+
+
+def make_headless_app(child: Widget, size: tuple = (100, 100)) -> AppHeadlessPygame:
+    build_context = BuildContext(
+        shader_pack=ShaderPack("test", ColorShader),
+        text_theme=TextTheme(font_loader=FontLoaderPygame(".")),
+        color_theme=ColorTheme(background=(0, 0, 0)),
+        scaling=1
+    )
+    return AppHeadlessPygame(size, build_context=build_context, child=child, fps=10, damage_tile_size=10)
+
+
+class TestHeadless(unittest.TestCase):
+
+    def test_step(self):
+        a = BoxWidget((30, 30), (255, 0, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [a], partial_shader=True)
+        app = make_headless_app(root)
+
+        self.assertEqual(app.step(), Region((0, 0, 100, 100)))
+        self.assertEqual(app.get_at((5, 5)), (255, 0, 0))
+        self.assertEqual(app.get_at((50, 50)), (0, 0, 255))
+        self.assertTrue(app.step().is_empty())
+
+        pixels = app.pixels()
+        self.assertEqual(pixels.shape, (100, 100, 3))
+        self.assertEqual(tuple(pixels[5, 50]), (0, 0, 255))
+        self.assertEqual(tuple(pixels[5, 5]), (255, 0, 0))
+
+        app.resize((50, 60))
+        app.step()
+        self.assertEqual(app.pixels().shape, (60, 50, 3))
+
+    def test_timers(self):
+        a = BoxWidget((30, 30), (255, 0, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [a], partial_shader=True)
+        app = make_headless_app(root)
+
+        def recolor():
+            a.shader.color = (0, 255, 0)
+            a.queue_reshade()
+        app.add_timer(0.45, recolor)
+
+        # The timers run on the time of the app, 0.1 seconds every step
+        app.run(4)
+        self.assertAlmostEqual(app.time, 0.4)
+        self.assertEqual(app.get_at((5, 5)), (255, 0, 0))
+        self.assertEqual(app.step(), Region((0, 0, 30, 30)))
+        self.assertEqual(app.get_at((5, 5)), (0, 255, 0))
+
+    def test_idle_dt(self):
+        a = BoxWidget((30, 30), (255, 0, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [a], partial_shader=True)
+        app = make_headless_app(root)
+        app.step()
+        self.assertFalse(app.is_active())
+
+        # The time slept for is not handed to the frame after waking up
+        with unittest.mock.patch.object(app.scheduler, "time_until_next", return_value=0.2):
+            dt = app.next_frame()
+        self.assertEqual(dt, 1/app.fps)
+
+        a.queue_reshade()
+        self.assertTrue(app.is_active())
+
+
+def make_build_context() -> BuildContext:
+    return BuildContext(
+        shader_pack=ShaderPack("test", ColorShader),
+        text_theme=TextTheme(font_loader=FontLoaderPygame(".")),
+        color_theme=ColorTheme(background=(0, 0, 0)),
+        scaling=1
+    )
+
+
+def make_scene(color: list) -> Widget:
+    return BoxWidget((100, 100), (0, 0, 255), [BoxWidget((10, 10), tuple(color))], partial_shader=True)
+
+
+class TestBatchRender(unittest.TestCase):
+    def jobs(self, n: int, **kwargs):
+        return [batch_render.RenderJob(factory=make_scene, args=([i, 0, 0], ), size=(20, 20), id=i, **kwargs) for i in range(n)]
+
+    def test_in_process(self):
+        results = list(batch_render.render_batch(self.jobs(3, format="rgba"), build_context_factory=make_build_context, workers=0))
+        self.assertEqual([x.id for x in results], [0, 1, 2])
+        for x in results:
+            self.assertIsNone(x.error)
+            self.assertEqual(len(x.data), 20*20*4)
+            self.assertEqual(tuple(x.data[:4]), (x.id, 0, 0, 255))
+            self.assertEqual(tuple(x.data[-4:]), (0, 0, 255, 255))
+
+        result = batch_render.render_job(batch_render.RenderJob(factory="cheeze:NotAWidget", id="bad"), make_build_context())
+        self.assertEqual(result.id, "bad")
+        self.assertIn("AttributeError", result.error)
+
+    def test_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            jobs = self.jobs(8)
+            for x in jobs:
+                x.output = str(Path(tmp) / f"{x.id}.png")
+            results = list(batch_render.render_batch(jobs, build_context_factory=make_build_context, workers=2, max_pending=3))
+            self.assertEqual(sorted(x.id for x in results), list(range(8)))
+            for x in results:
+                self.assertIsNone(x.error)
+                image = pg.image.load(x.output)
+                self.assertEqual(image.get_size(), (20, 20))
+                self.assertEqual(tuple(image.get_at((0, 0)))[:3], (x.id, 0, 0))
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            jobs = Path(tmp) / "jobs.jsonl"
+            jobs.write_text("\n".join(json.dumps({"factory": "test_app:make_scene", "args": [[i, 0, 0]], "size": [20, 20]}) for i in range(3)))
+            stdout = io.StringIO()
+            with unittest.mock.patch("sys.stdout", stdout):
+                code = batch_render.main([str(jobs), "--build-context", "test_app:make_build_context", "--workers", "0", "--output-dir", tmp])
+            self.assertEqual(code, 0)
+            results = [json.loads(x) for x in stdout.getvalue().splitlines()]
+            self.assertEqual([x["id"] for x in results], [0, 1, 2])
+            self.assertTrue(all((Path(tmp) / f"{i}.png").exists() for i in range(3)))
+
+            # Jobs read from stdin, which stays open
+            stdin = io.StringIO(jobs.read_text())
+            with unittest.mock.patch("sys.stdin", stdin), unittest.mock.patch("sys.stdout", io.StringIO()):
+                code = batch_render.main(["-", "--build-context", "test_app:make_build_context", "--workers", "0", "--output-dir", tmp])
+            self.assertEqual(code, 0)
+            self.assertFalse(stdin.closed)
+
+
+class TestFrameTimer(unittest.TestCase):
+    def test_ring_buffer(self):
+        timer = FrameTimer(capacity=4, phases=("a", "b"))
+        self.assertIsNone(timer.last())
+        self.assertEqual(timer.summary()["total"]["p50"], 0)
+
+        for _ in range(6):
+            timer.begin_frame()
+            timer.mark("a")
+            timer.mark("b")
+            timer.mark("a")
+            timer.end_frame()
+        self.assertEqual((len(timer), timer.count), (4, 6))
+        frames = timer.frames()
+        self.assertEqual(len(frames), 4)
+        for x in frames:
+            self.assertAlmostEqual(x["a"] + x["b"], x["total"])
+        self.assertEqual(timer.last(), frames[-1])
+
+        # Marks outside of a frame are ignored
+        timer.mark("a")
+        timer.end_frame()
+        self.assertEqual(timer.count, 6)
+
+        summary = timer.summary()
+        self.assertEqual(set(summary), {"a", "b", "total"})
+        total = summary["total"]
+        self.assertLessEqual(total["p50"], total["p95"])
+        self.assertLessEqual(total["p99"], total["max"])
+        self.assertEqual(timer.as_json()["total_frames"], 6)
+
+    def test_app(self):
+        a = BoxWidget((30, 30), (255, 0, 0))
+        root = BoxWidget((100, 100), (0, 0, 255), [a], partial_shader=True)
+        app = make_headless_app(root)
+        app.run(3)
+        self.assertEqual(len(app.frame_timer), 3)
+        self.assertEqual(set(app.frame_timer.summary()), {*app.frame_timer.phases, "total"})
+        self.assertGreater(app.frame_timer.frames()[0]["shade"], 0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            app.frame_timer.dump(Path(tmp) / "timings.json")
+            self.assertEqual(json.loads((Path(tmp) / "timings.json").read_text())["frames"], 3)
+
+        # The hud is drawn over the frame, and what is under it is shown again once it is hidden
+        app.show_hud = True
+        changed = app.step()
+        rect = app._hud_rect
+        self.assertTrue(changed.contains(tuple(rect)))
+        self.assertGreater(app.frame_timer.last()["hud"], 0)  # Not counted in the other phases
+        self.assertEqual(app.frame_timer.frames()[0]["hud"], 0)
+        self.assertEqual(app.get_at((1, 1)), (0, 0, 0))
+        app.show_hud = False
+        self.assertTrue(app.step().contains(tuple(rect)))
+        self.assertEqual(app.get_at((1, 1)), (255, 0, 0))
+
+
+class DefaultFontLoader(FontLoaderPygame):
+    """
+    Loads pygame's default font for every style, so that the tests do not depend on the installed fonts
+    """
+    def __init__(self) -> None:
+        super().__init__(".", font_cache=FontCache())
+        self.loaded = 0
+
+    def get_font(self, *, font_name: str, font_size: int, font_bold: bool, font_italic: bool) -> pg.font.Font:
+        size = round(font_size*self.build_context.scaling)
+        return self.font_cache.get((None, size), lambda: self._load_default(size))
+
+    def _load_default(self, size: int) -> pg.font.Font:
+        self.loaded += 1
+        return pg.font.Font(None, size)
+
+
+def make_text_context(**kwargs) -> BuildContext:
+    return BuildContext(
+        shader_pack=ShaderPack("test", LabelShader, ParagraphShader, ColorShader),
+        text_theme=TextTheme(
+            font_loader=DefaultFontLoader(),
+            normal=TextStyle(font="default", size=16, color="text"),
+            heading=TextStyle(font="default", size=24, color=(255, 0, 0)),
+            **kwargs
+        ),
+        color_theme=ColorTheme(background=(0, 0, 0), text=(0, 255, 0)),
+        scaling=1
+    )
+
+
+class TestTextCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = TextCache(max_bytes=10)
+        renders = []
+
+        def render(key, nbytes):
+            def inner():
+                renders.append(key)
+                return key.upper(), nbytes
+            return cache.get(key, inner)
+
+        self.assertEqual(render("a", 4), "A")
+        self.assertEqual(render("a", 4), "A")
+        render("b", 4)
+        render("a", 4)  # a is now used more recently than b
+        render("c", 4)
+        self.assertEqual(renders, ["a", "b", "c"])
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.bytes, 8)
+
+        # Too large to be cached at all
+        render("d", 11)
+        render("d", 11)
+        self.assertEqual(renders[-2:], ["d", "d"])
+        self.assertEqual(len(cache), 2)
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 5, 1))
+        cache.resize(4)
+        self.assertEqual((len(cache), cache.bytes), (1, 4))
+
+    def test_render_text(self):
+        build_context = make_text_context()
+        theme = build_context.text_theme
+
+        surf = theme.render_text("normal", "status")
+        self.assertIs(theme.render_text("normal", "status"), surf)
+        self.assertIsNot(theme.render_text("heading", "status"), surf)
+        self.assertIsNot(theme.render_text("normal", "status", color=(1, 2, 3)), surf)
+        self.assertEqual(theme.get_style_color("normal"), (0, 255, 0))
+        self.assertEqual(theme.get_style_color("heading"), (255, 0, 0))
+        self.assertEqual(theme.text_cache.bytes, sum(x.get_bytesize()*x.get_width()*x.get_height() for x in [surf, theme.render_text("heading", "status"), theme.render_text("normal", "status", color=(1, 2, 3))]))
+
+        # Labels cycling through a few values are only rendered once per value
+        label = LabelShader(text="idle")
+        label.set_build_context(build_context)
+        misses = theme.text_cache.misses
+        for _ in range(5):
+            for text in ("idle", "busy", "done"):
+                label.set_text(text)
+                label.label_surface
+        self.assertEqual(theme.text_cache.misses, misses + 3)
+
+        # The label is drawn in the color of its style, only inside the regions
+        label.shader_bounds = ShaderBounds((0, 0), (100, 30), partial_shader=True, drawable=True, parent=label)
+        surf = pg.Surface((100, 30))
+        label.shade(regions=Region((0, 0, 5, 30)), surf=surf)
+        colors = {tuple(surf.get_at((x, y)))[:3] for x in range(100) for y in range(30)}
+        self.assertIn((0, 255, 0), colors)
+        self.assertEqual({tuple(surf.get_at((x, y)))[:3] for x in range(5, 100) for y in range(30)}, {(0, 0, 0)})
+
+
+class TestGlyphAtlas(unittest.TestCase):
+    def test_render(self):
+        font = pg.font.Font(None, 24)
+        atlas = GlyphAtlasPygame(font, (255, 255, 255))
+
+        # Without kerning between the glyphs, the text is the same as the font renders it
+        surf = atlas.render("12:34")
+        expected = font.render("12:34", True, (255, 255, 255))
+        self.assertEqual(surf.get_size(), expected.get_size())
+        self.assertEqual(pg.image.tobytes(surf, "RGBA"), pg.image.tobytes(expected, "RGBA"))
+
+        # Glyphs are only rasterized once
+        rasterized = atlas.rasterized
+        for i in range(100):
+            atlas.render(f"{i:02}:{i*7 % 60:02}")
+        self.assertEqual(atlas.rasterized, rasterized + 6)
+        self.assertEqual(atlas.fallbacks, 0)
+
+        target = pg.Surface((100, 30))
+        rect = atlas.draw(target, (10, 5), "12:34")
+        self.assertEqual(rect, pg.Rect((10, 5), expected.get_size()))
+        blitted = pg.Surface((100, 30))
+        blitted.blit(expected, (10, 5))
+        self.assertEqual(pg.image.tobytes(target, "RGB"), pg.image.tobytes(blitted, "RGB"))
+        self.assertEqual(atlas.render("").get_size(), (0, font.get_height()))
+
+    def test_fallback(self):
+        self.assertFalse(needs_shaping("Total: 1,234.50"))
+        self.assertTrue(needs_shaping("\u0645\u0631\u062d\u0628\u0627"))  # Arabic
+        self.assertTrue(needs_shaping("e\u0301"))  # Combining accent
+        self.assertTrue(needs_shaping("\u0928\u092e\u0938\u094d\u0924\u0947"))  # Devanagari
+
+        atlas = GlyphAtlasPygame(pg.font.Font(None, 24), (255, 255, 255))
+        atlas.render("e\u0301")
+        self.assertEqual((atlas.fallbacks, atlas.rasterized), (1, 0))
+
+    def test_text_theme(self):
+        build_context = make_text_context(counter=TextStyle(font="default", size=24, color="text", glyph_atlas=True))
+        theme = build_context.text_theme
+        misses = theme.text_cache.misses
+        for i in range(20):
+            surf = theme.render_text("counter", str(i))
+        self.assertEqual(surf.get_size(), theme.get_style_font("counter").size("19"))
+
+        # Text drawn from the atlas is not kept in the text cache
+        self.assertEqual(theme.text_cache.misses, misses)
+        atlas = theme.font_loader.get_glyph_atlas(theme.get_style_font("counter"), (0, 255, 0), True)
+        self.assertEqual(atlas.rasterized, 10)
+        self.assertTrue(theme.get_style("counter").with_changes(size=12, color="text").glyph_atlas)
+
+        # Only the atlases of the last colors used are kept
+        loader = theme.font_loader
+        for i in range(loader.glyph_atlases.max_fonts + 10):
+            loader.get_glyph_atlas(theme.get_style_font("counter"), (i, 0, 0), True)
+        self.assertEqual(len(loader.glyph_atlases), loader.glyph_atlases.max_fonts)
+        self.assertEqual(loader.glyph_atlases.evictions, 11)
+
+
+class TestFonts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.fonts = self.dir / "fonts"
+        (self.fonts / "sans").mkdir(parents=True)
+        self.scans = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def scan(self):
+        self.scans += 1
+        return {"sans": {(False, False): str(self.fonts / "sans" / "Sans.ttf"), (True, False): str(self.fonts / "sans" / "SansBold.ttf")}}
+
+    def make_index(self) -> SystemFontIndex:
+        return SystemFontIndex(self.dir / "cache" / "fonts.json", directories=[str(self.fonts)], scan=self.scan)
+
+    def test_index(self):
+        index = self.make_index()
+        self.assertIn("Sans", index)
+        self.assertEqual(index.lookup("Sans", True, False), (str(self.fonts / "sans" / "SansBold.ttf"), False, False))
+        self.assertEqual(index.lookup("sans", True, True), (str(self.fonts / "sans" / "Sans.ttf"), True, True))
+        self.assertIsNone(index.lookup("Serif"))
+        self.assertTrue(index.scanned)
+
+        # Other processes load the saved index
+        index = self.make_index()
+        self.assertEqual(index.lookup("Sans")[0], str(self.fonts / "sans" / "Sans.ttf"))
+        self.assertFalse(index.scanned)
+        self.assertEqual(self.scans, 1)
+
+        # Installing a font changes the time of its directory
+        os.utime(self.fonts / "sans", (0, 0))
+        index = self.make_index()
+        index.fonts()
+        self.assertTrue(index.scanned)
+        self.assertEqual(self.scans, 2)
+
+    def test_loader(self):
+        shutil.copy(Path(pg.font.__file__).parent / pg.font.get_default_font(), self.dir / "Bundled.ttf")
+        index = self.make_index()
+        font_cache = FontCache(max_fonts=3)
+        loaders = [FontLoaderPygame(self.dir, font_cache=font_cache, font_index=index) for _ in range(2)]
+        for x in loaders:
+            x.set_build_context(make_text_context())
+
+        a = loaders[0].get_font(font_name="Bundled", font_size=12, font_bold=False, font_italic=False)
+        self.assertIs(loaders[1].get_font(font_name="Bundled", font_size=12, font_bold=False, font_italic=False), a)
+        self.assertEqual(loaders[0].resolve("Bundled", True, False), (str(self.dir / "Bundled.ttf"), True, False))
+        self.assertTrue(loaders[0].get_font(font_name="Bundled", font_size=12, font_bold=True, font_italic=False).get_bold())
+        self.assertEqual(loaders[0].resolve("Missing", False, False), (None, False, False))
+
+        # The pixel size after scaling is what matters
+        loaders[1].build_context.scaling = 2
+        b = loaders[1].get_font(font_name="Bundled", font_size=6, font_bold=False, font_italic=False)
+        self.assertIs(b, a)
+        self.assertGreater(loaders[1].get_font(font_name="Bundled", font_size=12, font_bold=False, font_italic=False).get_height(), a.get_height())
+        self.assertEqual(len(font_cache), 3)
+        loaders[0].get_font(font_name="Missing", font_size=12, font_bold=False, font_italic=False)
+        self.assertEqual((len(font_cache), font_cache.evictions), (3, 1))
+
+    def test_theme(self):
+        style = TextStyle(font="default", size=16, color="text")
+        self.assertEqual(style.with_changes(size=20), TextStyle(font="default", size=20, color="text"))
+
+        # Derived themes share the fonts of the styles they did not change
+        build_context = make_text_context()
+        theme = build_context.text_theme
+        font = theme.get_style_font("normal")
+        loaded = theme.font_loader.loaded
+        derived = theme.with_changes(heading=style.with_changes(size=30))
+        derived.set_build_context(build_context)
+        self.assertIs(derived.get_style_font("normal"), font)
+        self.assertEqual(theme.font_loader.loaded, loaded)
+        self.assertIs(derived.text_cache, theme.text_cache)
+
+        # Fonts are only kept by the font cache of the loader
+        theme.font_loader.font_cache.clear()
+        self.assertIsNot(theme.get_style_font("normal"), font)
+        self.assertEqual(theme.font_loader.loaded, loaded + 1)
+
+
+class TestTextMeasurement(unittest.TestCase):
+    def test_measure(self):
+        build_context = make_text_context()
+        theme = build_context.text_theme
+        font = theme.get_style_font("normal")
+
+        metrics = theme.measure_text("normal", "Hello")
+        self.assertEqual(metrics.size, font.size("Hello"))
+        self.assertEqual((metrics.ascent, metrics.descent, metrics.line_height), (font.get_ascent(), -font.get_descent(), font.get_linesize()))
+        self.assertIs(theme.measure_text("normal", "Hello"), metrics)
+        self.assertEqual(theme.measure_cache.hits, 1)
+
+        lines = theme.measure_text("normal", "Hello\nwide world")
+        self.assertEqual(lines.lines, 2)
+        self.assertEqual(lines.width, font.size("wide world")[0])
+        self.assertEqual(lines.height, font.get_linesize() + font.get_height())
+
+        # Scaling changes the size of the text
+        build_context.scaling = 2
+        self.assertGreater(theme.measure_text("normal", "Hello").width, metrics.width)
+        self.assertEqual(theme.text_cache.misses, 0)
+
+    def test_label_layout(self):
+        build_context = make_text_context()
+        theme = build_context.text_theme
+        labels = [Label(f"label {i}") for i in range(50)]
+        root = BoxWidget((400, 400), (0, 0, 0), labels, partial_shader=True)
+        app = AppHeadlessPygame((400, 400), build_context=build_context, child=root)
+        app.update_layout()
+
+        # Labels are laid out at the size of their text, without rendering any of them
+        self.assertEqual(theme.text_cache.misses, 0)
+        self.assertEqual(labels[3].layout_object.rendered.as_float(), theme.measure_text("normal", "label 3").size)
+
+        app.step()
+        drawn = theme.text_cache.misses
+        self.assertGreater(drawn, 0)
+        self.assertLess(drawn, len(labels))  # Only the labels in the window are drawn
+
+        labels[0].set_text("a much longer label")
+        self.assertTrue(root.layout_object.dirty)
+        app.step()
+        self.assertEqual(labels[0].layout_object.rendered.as_float(), theme.measure_text("normal", "a much longer label").size)
+
+    def test_paragraph(self):
+        build_context = make_text_context()
+        theme = build_context.text_theme
+        text = " ".join(f"word{i}" for i in range(40))
+        paragraph = Paragraph(text)
+        root = BoxWidget((200, 400), (0, 0, 0), [paragraph], partial_shader=True)
+        app = AppHeadlessPygame((200, 400), build_context=build_context, child=root)
+        app.step()
+
+        # Wrapped to the width of the box, every line no wider than it
+        layout = paragraph.layout_object
+        lines = layout.lines()
+        line_height = theme.measure_text("normal", "").line_height
+        self.assertGreater(len(lines), 1)
+        self.assertEqual(" ".join(lines), text)
+        self.assertTrue(all(theme.measure_text("normal", x).width <= 200 for x in lines))
+        self.assertEqual(layout.rendered.as_float(), (200, len(lines) * line_height))
+        self.assertTrue(any(app.get_at((x, line_height // 2)) != (0, 0, 0, 255) for x in range(200)))
+        self.assertEqual(len(layout._breaks), 1)  # Shading wraps at the rendered width
+
+        paragraph.set_text(text + " last")
+        app.step()
+        self.assertEqual(layout.lines()[-1].split()[-1], "last")
@@ -0,0 +1,29 @@
+import unittest
+
+from benchmarks import bench_suite, bench_units
+from cheeze import *
+
+class TestBenchmarks(unittest.TestCase):
+    def test_quick(self):
+        # The suite runs headless and its results can be compared
+        results = bench_suite.run(quick=True, repeat=1)
+        self.assertIn("check_reshade_compiled", results["results"])
+        sizes = bench_suite.SIZES["quick"]
+        bvh = bench_suite.shader_bounds_tree(sizes["bounds_depth"], sizes["bounds_fanout"]).compile()
+        self.assertEqual(results["results"]["compile"]["nodes"], len(bvh))
+        for x in results["results"].values():
+            self.assertGreaterEqual(x["median_ms"], 0)
+            self.assertGreater(x["peak_kib"], 0)
+
+        self.assertEqual(bench_suite.compare(results, results), [])
+        slower = {"results": {"hit_test": {**results["results"]["hit_test"], "median_ms": 0.001}}}
+        self.assertEqual(len(bench_suite.compare(results, slower, tolerance=0)), 1)
+
+    def test_units(self):
+        # The plain units are only used inside of plain_units
+        results = bench_units.compare(rows=5, columns=5, repeat=1)
+        self.assertEqual(results["interned"]["nodes"], results["plain"]["nodes"])
+        self.assertGreater(results["plain"]["peak_kib"], results["interned"]["peak_kib"])
+        self.assertIs(LUnit(0), LUnit(0))
+        unit = LUnit(5)
+        self.assertIs(unit.abs(10, None), unit)
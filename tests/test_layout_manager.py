@@ -1,7 +1,11 @@
 import unittest
+import os
+import pickle
+import random
 
 from cheeze import *
 from tests.pgutils import *
+from cheeze.layout_manager import layout_numpy
 
 class TestLayoutManagerUnits(unittest.TestCase):
     def test_LUnit_abs(self):
@@ -48,6 +52,26 @@ class TestLayoutManagerUnits(unittest.TestCase):
         # Check repr
         self.assertEqual(repr(x), "(121.0px, 121.0px)")        
 
+    def test_LUnit_immutable(self):
+        x = LUnit("10 px")
+
+        # Parsed and common values are shared
+        self.assertIs(x, LUnit("10 px"))
+        self.assertIs(LUnit(0), LUnit("0 px"))
+        self.assertIs(LUnit2(0, 0).x, LUnit(0, UNIT.px))
+        self.assertIs(LUnit(1, "f"), LUnit("1 f"))
+
+        self.assertEqual(x, LUnit(10, UNIT.px))
+        self.assertEqual(LUnit2("10 px", 5), LUnit2(10, LUnit(5)))
+        self.assertNotEqual(LUnit2("10 %", 5), LUnit2(10, 5))
+
+        with self.assertRaises(AttributeError):
+            x.val = 20
+        with self.assertRaises(AttributeError):
+            LUnit2(1, 1).x = x
+
+        self.assertEqual(pickle.loads(pickle.dumps(LUnit2("2 vw", 3))), LUnit2("2 vw", 3))
+
     def test_LRect(self):
         r = LRect((10, 11), (10.4, 20.62))
         self.assertTrue(r.collides_withr(LRect((12, 12), (100, 100))))
@@ -73,5 +97,519 @@ class TestLayoutManagerUnits(unittest.TestCase):
         ])
 
         bounds.calculate_child_bounds()
+        a = bounds
+        b, c = bounds.children
+        b1, b2 = b.children
+
+        # Rendered bounds grow to cover the children sticking out
+        self.assertEqual(b.rendered.as_float(), (4, 4, 416, 336))
+        self.assertEqual(c.rendered.as_float(), (340, 230, 140, 120))
+
+        # A whole shader is reshaded completely, and its partial parents reshade where it is
+        self.assertEqual(bounds.check_reshade((50, 50, 10, 10)), [
+            (a, Region((4, 4, 120, 110))),
+            (b, Region((40, 40, 84, 74))),
+            (b1, None)
+        ])
+
+        # Partial shaders only reshade the rectangle, clipped to themselves
+        self.assertEqual(bounds.check_reshade((300, 100, 50, 20)), [
+            (a, Region((300, 100, 50, 20))),
+            (b, Region((300, 100, 40, 20))),
+            (b2, Region((300, 100, 50, 20)))
+        ])
+        self.assertEqual(bounds.check_reshade((450, 450, 10, 10)), [(a, Region((450, 450, 10, 10)))])
+
+        if os.environ.get("CHEEZE_INTERACTIVE"):
+            show_shaderbounds(bounds)
+
+    def test_region(self):
+        a = Region((0, 0, 10, 10))
+        b = Region([(5, 5, 10, 10), (5, 5, 5, 5)])
+
+        # Overlaps are only counted once
+        self.assertEqual(b.area, 100)
+        self.assertEqual((a | b).area, 175)
+        self.assertEqual((a & b).rects(), [(5, 5, 5, 5)])
+        self.assertEqual((a - b).area, 75)
+        self.assertTrue((a - a).is_empty())
+
+        # The same area is always coalesced into the same rectangles
+        self.assertEqual(Region([(0, 0, 10, 5), (0, 5, 10, 5)]).rects(), [(0, 0, 10, 10)])
+        self.assertEqual(Region([(0, 0, 5, 10), (5, 0, 5, 10)]), a)
+        self.assertEqual((a | b) - b, a - b)
+        self.assertEqual(len(a | b), 3)
+
+        self.assertTrue(a.contains((2, 2, 3, 3)))
+        self.assertFalse(a.contains(b))
+        self.assertEqual((a | b).bounds.as_float(), (0, 0, 15, 15))
+
+    def test_shaderbounds_partial_regions(self):
+        # A partial shader reshades the rectangle and whatever its children reshade, clipped to itself
+        child = ShaderBounds((50, 0), (100, 20), partial_shader=False, drawable=True, parent="B")
+        bounds = ShaderBounds((0, 0), (100, 100), partial_shader=True, drawable=True, parent="A", children=[child])
+        bounds.calculate_child_bounds()
+
+        reshades = bounds.check_reshade((40, 10, 20, 20))
+        self.assertEqual(reshades[1], (child, None))
+        self.assertEqual(reshades[0][1], Region([(40, 10, 20, 20), (50, 0, 50, 20)]))
+        self.assertEqual(reshades[0][1].area, 20*20 + 50*20 - 10*10)
+
+        # Completely covered, the whole shader is reshaded
+        self.assertEqual(bounds.check_reshade((0, 0, 200, 200))[0], (bounds, None))
+
+    def test_shaderbounds_occlusion(self):
+        # An opaque card over a panel over a background
+        hidden = ShaderBounds((20, 20), (10, 10), partial_shader=False, drawable=True, parent="hidden")
+        card = ShaderBounds((10, 10), (50, 50), partial_shader=False, drawable=True, parent="card", opaque=True)
+        panel = ShaderBounds((0, 0), (100, 100), partial_shader=True, drawable=True, parent="panel", children=[hidden, card])
+        background = ShaderBounds((0, 0), (200, 200), partial_shader=True, drawable=True, parent="background", children=[panel])
+        background.calculate_child_bounds()
+
+        reshades = background.check_reshade((15, 15, 80, 20))
+        self.assertEqual([x for x, _ in reshades], [background, panel, hidden, card])
+
+        culled = background.check_reshade((15, 15, 80, 20), cull_occluded=True)
+        self.assertEqual([x for x, _ in culled], [background, panel, card])
+        visible = Region((15, 15, 80, 20)) | Region((10, 10, 50, 50)) | Region((20, 20, 10, 10))
+        visible -= Region((10, 10, 50, 50))
+        self.assertEqual(dict(culled)[panel], visible)
+
+        # Compiled trees cull the same
+        background.compile()
+        self.assertEqual(background.check_reshade((15, 15, 80, 20), cull_occluded=True), culled)
+
+        # Opaque regions can be a part of the shader
+        card.opaque = Region((10, 10, 50, 5))
+        self.assertEqual([x for x, _ in background.check_reshade((15, 15, 80, 20), cull_occluded=True)], [background, panel, hidden, card])
+
+    def test_shaderbounds_incremental(self):
+        # Adding and removing children only refits the path to the root
+        rng = random.Random(4)
+        leaves = [ShaderBounds((rng.randint(0, 300), rng.randint(0, 300)), (20, 20), partial_shader=False, drawable=True, parent=None) for _ in range(8)]
+        groups = [ShaderBounds((100, 100), (10, 10), partial_shader=True, drawable=True, parent=None, children=leaves[i:i+4]) for i in (0, 4)]
+        root = ShaderBounds((0, 0), (50, 50), partial_shader=True, drawable=True, parent=None, children=groups)
+        root.calculate_child_bounds()
+        self.assertIs(leaves[5].root_shaderbounds, root)
+        self.assertIs(leaves[5].parent_bounds, groups[1])
+
+        def expected(bounds):
+            r = LRect(bounds.pos, bounds.size)
+            for x in bounds.children:
+                r += expected(x)
+            return r
+
+        child = ShaderBounds((500, 20), (10, 10), partial_shader=False, drawable=True, parent=None, children=[
+            ShaderBounds((600, 600), (5, 5), partial_shader=False, drawable=True, parent=None)
+        ])
+        groups[0].add_child(child)
+        self.assertIs(child.children[0].root_shaderbounds, root)
+        self.assertEqual(root.rendered.as_float(), expected(root).as_float())
+        self.assertEqual(root.rendered.as_float()[2:], (605, 605))
+
+        groups[0].remove_child(child)
+        self.assertIs(child.children[0].root_shaderbounds, child)
+        for x in [root] + groups:
+            self.assertEqual(x.rendered.as_float(), expected(x).as_float())
+
+        groups[1].remove_child(leaves[5])
+        leaves[0].pos = (-10, -10)
+        leaves[0].refit()
+        for x in [root] + groups:
+            self.assertEqual(x.rendered.as_float(), expected(x).as_float())
+
+    def test_shaderbounds_bvh(self):
+        # The compiled shaderbounds must reshade exactly the same as the recursive one
+        def random_bounds(rng, depth):
+            children = []
+            if depth > 0:
+                children = [random_bounds(rng, depth-1) for _ in range(rng.randint(0, 4))]
+            return ShaderBounds(
+                (rng.randint(0, 400), rng.randint(0, 400)), (rng.randint(0, 200), rng.randint(0, 200)),
+                partial_shader=rng.random() < 0.5, drawable=rng.random() < 0.8, parent=None, children=children
+            )
+
+        for seed in range(30):
+            rng = random.Random(seed)
+            bounds = random_bounds(rng, 4)
+            bounds.calculate_child_bounds()
+            rects = [(rng.randint(0, 500), rng.randint(0, 500), rng.randint(0, 150), rng.randint(0, 150)) for _ in range(20)]
+
+            rects.append(Region(rects[:3]))
+            expected = [bounds.check_reshade(r) for r in rects]
+            bounds.compile()
+            self.assertEqual([bounds.check_reshade(r) for r in rects], expected)
+
+        # Structural changes rebuild the compiled tree
+        child = ShaderBounds((450, 450), (20, 20), partial_shader=False, drawable=True, parent=None)
+        bounds.add_child(child)
+        self.assertIn((child, None), bounds.check_reshade((455, 455, 2, 2)))
+        bounds.remove_child(child)
+        self.assertNotIn((child, None), bounds.check_reshade((455, 455, 2, 2)))
+
+        # Moving a shaderbounds refits it and its ancestors
+        leaf = ShaderBounds((12, 12), (5, 5), partial_shader=False, drawable=True, parent=None)
+        group = ShaderBounds((10, 10), (20, 20), partial_shader=False, drawable=False, parent=None, children=[leaf])
+        bounds = ShaderBounds((0, 0), (100, 100), partial_shader=True, drawable=True, parent=None, children=[group])
+        bounds.calculate_child_bounds()
+        bvh = bounds.compile()
+
+        leaf.pos = (150, 150)
+        bvh.refit(leaf)
+        self.assertEqual(group.rendered.as_float(), (10, 10, 145, 145))
+        self.assertEqual(bounds.rendered.as_float(), (0, 0, 155, 155))
+        self.assertIn((leaf, None), bounds.check_reshade((152, 152, 1, 1)))
+
+class CountingLayoutSimple(LayoutSimple):
+    """
+    LayoutSimple that counts the number of times it was rendered
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.render_count = 0
+
+    def render(self, space, viewport, offset) -> None:
+        self.render_count += 1
+        super().render(space, viewport, offset)
+
+
+class TestLayoutManagerLayout(unittest.TestCase):
+    def test_dirty_relayout(self):
+        a = CountingLayoutSimple(LUnit2("50 px", "20 px"))
+        b = CountingLayoutSimple(LUnit2("30 px", "1 f"))
+        c = CountingLayoutSimple(LUnit2("10 px", "10 px"))
+        inner = LayoutSequence(LUnit2("1 f", "1 f"), main_axis="y", cross_axis="x", children=[c])
+        root = LayoutSequence(LUnit2("200 px", "100 px"), children=[a, inner, b])
+
+        root.calculate(LUnit2(300, 300), LUnit2(300, 300), LUnit2(5, 5))
+        self.assertFalse(root.dirty)
+        self.assertEqual(c.pos.as_float(), (55, 5))
+        self.assertEqual(b.pos.as_float(), (175, 5))
+
+        # Recalculating a clean tree must not move or render anything again
+        root.calculate(LUnit2(300, 300), LUnit2(300, 300), LUnit2(5, 5))
+        self.assertEqual((a.render_count, b.render_count, c.render_count), (1, 1, 1))
+        self.assertEqual(c.pos.as_float(), (55, 5))
+
+        # Changing the dimensions only dirties the ancestors
+        c.dim = LUnit2("20 px", "10 px")
+        self.assertTrue(c.dirty and inner.dirty and root.dirty)
+        self.assertFalse(a.dirty or b.dirty)
+
+        root.calculate(LUnit2(300, 300), LUnit2(300, 300), LUnit2(5, 5))
+        self.assertEqual((a.render_count, b.render_count, c.render_count), (1, 1, 2))
+        self.assertEqual(c.rendered.as_float(), (20, 10))
+        self.assertEqual(b.pos.as_float(), (175, 5))
+
+        # Adding a child shifts the flexible sibling
+        inner.add_child(CountingLayoutSimple(LUnit2("10 px", "10 px")))
+        root.calculate(LUnit2(300, 300), LUnit2(300, 300), LUnit2(5, 5))
+        self.assertEqual(inner.children[1].pos.as_float(), (55, 15))
+
+    def test_dirty_unrendered_child(self):
+        # Children without any space are never rendered, they must still be marked clean
+        b = LayoutSimple(("0 f", "1 f"))
+        root = LayoutSequence(children=[LayoutSimple(("100 px", "1 f")), b])
+        root.calculate(LUnit2(300, 300), LUnit2(300, 300))
+        self.assertFalse(b.dirty)
+
+        b.dim = LUnit2("200 px", "1 f")
+        self.assertTrue(root.dirty)
+        root.calculate(LUnit2(300, 300), LUnit2(300, 300))
+        self.assertEqual(b.rendered.as_float(), (200, 300))
+
+    def test_relative_positions(self):
+        c = LayoutSimple(LUnit2("10 px", "10 px"))
+        inner = LayoutSequence(LUnit2("50 px", "50 px"), main_axis="y", cross_axis="x", children=[c], cross_axis_align=CrossAxisAlignment.end)
+        root = LayoutSequence(LUnit2("200 px", "100 px"), children=[LayoutSimple(LUnit2("20 px", "20 px")), inner])
+
+        root.calculate(LUnit2(300, 300), LUnit2(300, 300))
+        self.assertEqual(c.offset.as_float(), (40, 0))
+        self.assertEqual(c.pos.as_float(), (60, 0))
+        self.assertTrue(c.collides_with((65, 5)))
+
+        # Moving the root only changes its own offset, descendants are resolved lazily
+        root.offset = LUnit2(100, 10)
+        self.assertEqual(c.offset.as_float(), (40, 0))
+        self.assertEqual(c.pos.as_float(), (160, 10))
+        self.assertFalse(c.collides_with((65, 5)))
+
+        # Setting an absolute position still works
+        inner.pos = LUnit2(0, 0)
+        self.assertEqual(inner.offset.as_float(), (-100, -10))
+        self.assertEqual(c.pos.as_float(), (40, 0))
+
+    def test_position_cache(self):
+        c = LayoutSimple(LUnit2("10 px", "10 px"))
+        inner = LayoutSequence(LUnit2("50 px", "50 px"), children=[c])
+        root = LayoutSequence(LUnit2("200 px", "100 px"), children=[LayoutSimple(LUnit2("20 px", "20 px")), inner])
+        other = LayoutSequence(children=[LayoutSimple(LUnit2("10 px", "10 px"))])
+        root.calculate(LUnit2(300, 300), LUnit2(300, 300))
+        other.calculate(LUnit2(300, 300), LUnit2(300, 300))
+        pos = c.pos
+        self.assertEqual(pos.as_float(), (20, 0))
+
+        # Placing layout objects where they already are, or in another tree, keeps the cached position
+        root.calculate(LUnit2(300, 300), LUnit2(300, 300))
+        other.children[0].offset = LUnit2(5, 5)
+        self.assertIs(c.pos, pos)
+
+        # Moving an ancestor moves it
+        inner.offset = LUnit2(30, 0)
+        self.assertEqual(c.pos.as_float(), (30, 0))
+
+        # So does moving it to another parent
+        inner.children.remove(c)
+        other.children[0].parent = None
+        other.children[0] = c
+        c.parent = other
+        self.assertEqual(c.pos.as_float(), (0, 0))
+
+    def test_layout_cache(self):
+        leaves = [CountingLayoutSimple(LUnit2(unit, "50 %")) for unit in ("10 %", "1 f", "40 px", "2 f")]
+        root = LayoutSequence(LUnit2("1 f", "1 f"), main_axis_align=MainAxisAlignment.space_around, children=[
+            LayoutSequence(LUnit2("1 f", "1 f"), main_axis="y", cross_axis="x", children=leaves[:2]),
+            *leaves[2:]
+        ])
+
+        def snapshot():
+            return [(x.pos.as_float(), x.rendered.as_float()) for x in leaves]
+
+        root.calculate(LUnit2(800, 600), LUnit2(800, 600))
+        first = snapshot()
+        root.calculate(LUnit2(1000, 700), LUnit2(1000, 700))
+        counts = [x.render_count for x in leaves]
+
+        # Going back to a previous size is only a lookup
+        root.calculate(LUnit2(800, 600), LUnit2(800, 600))
+        self.assertEqual([x.render_count for x in leaves], counts)
+        self.assertEqual(snapshot(), first)
+
+        # Unless something changed in between
+        leaves[2].dim = LUnit2("60 px", "50 %")
+        root.calculate(LUnit2(1000, 700), LUnit2(1000, 700))
+        self.assertEqual(leaves[2].render_count, counts[2] + 1)
+
+        # The cache is bounded
+        for w in range(10):
+            root.calculate(LUnit2(500 + w, 600), LUnit2(800, 600))
+        self.assertTrue(all(len(x._layout_cache) <= LayoutObject.layout_cache_size for x in leaves))
+
+    def test_viewport_invalidation(self):
+        island = [CountingLayoutSimple(LUnit2("1 f", "20 px")), CountingLayoutSimple(LUnit2("30 %", "1 f"))]
+        viewport_leaf = CountingLayoutSimple(LUnit2("10 vw", "1 f"))
+        flex_leaf = CountingLayoutSimple(LUnit2("1 f", "1 f"))
+        root = LayoutSequence(LUnit2("1 f", "1 f"), children=[
+            LayoutSequence(LUnit2("200 px", "100 px"), main_axis="y", cross_axis="x", children=island),
+            viewport_leaf,
+            flex_leaf
+        ])
+
+        root.calculate(LUnit2(800, 600), LUnit2(800, 600))
+        self.assertEqual(flex_leaf.rendered.as_float(), (520, 600))
+
+        # Resize, only the viewport dependent parts get recalculated
+        root.calculate(LUnit2(1000, 700), LUnit2(1000, 700))
+        self.assertEqual([x.render_count for x in island], [1, 1])
+        self.assertEqual(viewport_leaf.render_count, 2)
+        self.assertEqual(flex_leaf.render_count, 2)
+        self.assertEqual(flex_leaf.rendered.as_float(), (700, 700))
+        self.assertEqual(flex_leaf.pos.as_float(), (300, 0))
+
+        # A viewport change alone does not touch the siblings that are not affected
+        viewport_leaf.dim = LUnit2("200 px", "1 f")
+        root.calculate(LUnit2(1000, 700), LUnit2(1000, 700))
+        root.calculate(LUnit2(1000, 700), LUnit2(1200, 900))
+        self.assertEqual(viewport_leaf.render_count, 3)
+        self.assertEqual(flex_leaf.render_count, 3)
+
+    def test_virtual_sequence(self):
+        built = []
+
+        def build(i):
+            built.append(i)
+            return LayoutSimple(LUnit2("1 f", f"{20 + (i % 2)*10} px"))
+
+        virtual = LayoutVirtualSequence(item_count=50000, item_builder=build, item_extent=25, overscan=50)
+        root = LayoutSequence(LUnit2("1 f", "1 f"), children=[LayoutSimple(LUnit2("100 px", "1 f")), virtual])
+        root.calculate(LUnit2(800, 400), LUnit2(800, 400))
+
+        # Only the items within the window and the overscan are built
+        self.assertEqual(virtual.visible_range, (0, 18))
+        self.assertEqual(len(built), 18)
+        self.assertEqual(virtual.children[1].pos.as_float(), (100, 20))
+        self.assertEqual(virtual.children[1].rendered.as_float(), (700, 30))
+
+        # Measured extents replace the estimates
+        self.assertEqual(virtual.item_offset(18), 9*20 + 9*30)
+        self.assertEqual(virtual.content_extent, 9*20 + 9*30 + (50000-18)*25)
+
+        virtual.scroll_to_index(30000)
+        root.calculate(LUnit2(800, 400), LUnit2(800, 400))
+        first = virtual.visible_range[0]
+        self.assertEqual(virtual.index_at(virtual.scroll_offset - 50), first)
+        self.assertLess(len(virtual.children), 25)
+        self.assertTrue(all(x.parent is virtual for x in virtual.children))
+        for x in virtual.children:
+            self.assertLess(x.pos.y.val, 450)
+            self.assertGreater(x.pos.y.val + x.rendered.y.val, -50)
+
+    def test_hit_index(self):
+        cells = [[LayoutSimple(LUnit2("1 f", "1 f")) for _ in range(20)] for _ in range(20)]
+        rows = [LayoutSequence(LUnit2("1 f", "1 f"), children=list(row)) for row in cells]
+        root = LayoutSequence(LUnit2("1 f", "1 f"), main_axis="y", cross_axis="x", children=rows)
+        root.calculate(LUnit2(400, 400), LUnit2(400, 400))
+
+        index = LayoutHitIndex(root, cell_size=32)
+        self.assertEqual(len(index), 1 + 20 + 400)
+        self.assertIs(index.node_at((45, 65)), cells[3][2])
+        self.assertEqual(index.nodes_at((45, 65)), [root, rows[3], cells[3][2]])
+        self.assertIsNone(index.node_at((401, 10)))
+        self.assertEqual(set(index.nodes_in_rect((30, 30, 20, 20))), {root, rows[1], rows[2], cells[1][1], cells[1][2], cells[2][1], cells[2][2]})
+
+        # Results must agree with collides_with
+        for point in [(0, 0), (399, 399), (123.5, 77), (200, 200)]:
+            expected = [x for x in [root, *rows, *sum(cells, [])] if x.collides_with(point)]
+            self.assertEqual(set(index.nodes_at(point)), set(expected))
+
+        # Incremental updates after a relayout
+        rows[3].remove_child(cells[3][0])
+        rows[5].add_child(LayoutSimple(LUnit2("100 px", "1 f")))
+        root.calculate(LUnit2(400, 400), LUnit2(400, 400))
+        index.update()
+        self.assertEqual(len(index), 1 + 20 + 400)
+        self.assertIs(index.node_at((45, 65)), cells[3][3])
+        self.assertIs(index.node_at((350, 105)), rows[5].children[-1])
+        for point in [(10, 65), (350, 105), (100, 300)]:
+            expected = [x for x in [root, *rows, *sum(cells, []), rows[5].children[-1]] if x.parent is not None or x is root]
+            expected = [x for x in expected if x.collides_with(point)]
+            self.assertEqual(set(index.nodes_at(point)), set(expected))
+
+    def test_paragraph(self):
+        # Every letter is 10 pixels wide
+        text = "the quick brown fox jumps over the lazy dog"
+        paragraph = LayoutParagraph(text, measure=lambda x: 10*len(x), line_height=20)
+        root = LayoutSequence(LUnit2("1 f", "1 f"), main_axis="y", cross_axis="x", children=[paragraph])
+
+        root.calculate(LUnit2(200, 500), LUnit2(200, 500))
+        self.assertEqual(paragraph.lines(), ["the quick brown fox", "jumps over the lazy", "dog"])
+        self.assertEqual(paragraph.rendered.as_float(), (200, 60))
+        self.assertEqual(paragraph.preferred, (50, 20))
+
+        # Narrower, the paragraph gets taller
+        root.calculate(LUnit2(100, 500), LUnit2(100, 500))
+        self.assertEqual(paragraph.rendered.as_float(), (100, 100))
+
+        # Line breaks are cached per width
+        paragraph.wrapped_words = 0
+        root.clear_layout_cache()
+        paragraph.clear_layout_cache()
+        paragraph.mark_dirty()
+        root.calculate(LUnit2(200, 500), LUnit2(200, 500))
+        self.assertEqual(paragraph.wrapped_words, 0)
+
+        # Only the lines asked for are joined
+        lines = paragraph.lines(100)
+        for (first, last) in ((0, 2), (1, 4), (3, 10), (5, 6), (2, 2)):
+            self.assertEqual(paragraph.lines(100, first, last), lines[first:last])
+
+        # Hard line breaks always start a new line
+        paragraph.set_text("the quick\nbrown fox")
+        root.calculate(LUnit2(200, 500), LUnit2(200, 500))
+        self.assertEqual(paragraph.lines(), ["the quick", "brown fox"])
+        self.assertEqual(paragraph.lines(first=1), ["brown fox"])
+
+        # Only the widths of the words in the text are kept
+        self.assertEqual(set(paragraph._word_widths), {"the", "quick", "brown", "fox"})
+
+    def test_paragraph_optimal(self):
+        text = "aaa bb cc ddddd"
+        greedy = LayoutParagraph(text, measure=lambda x: 10*len(x), line_height=10)
+        optimal = LayoutParagraph(text, measure=lambda x: 10*len(x), line_height=10, wrap="optimal")
+        self.assertEqual(greedy.lines(60), ["aaa bb", "cc", "ddddd"])
+        self.assertEqual(optimal.lines(60), ["aaa", "bb cc", "ddddd"])
+
+        # Words wider than the line are on their own
+        self.assertEqual(optimal.lines(20), ["aaa", "bb", "cc", "ddddd"])
+        with self.assertRaises(ValueError):
+            LayoutParagraph(text, measure=len, line_height=10, wrap="ragged")
+
+    def test_paragraph_incremental(self):
+        rng = random.Random(3)
+        vocab = ["a", "to", "the", "lorem", "ipsum", "dolor", "consectetur", "adipiscing"]
+        for _ in range(200):
+            words = [rng.choice(vocab) for _ in range(rng.randint(0, 60))]
+            text = " ".join(words).replace(" the ", "\n", rng.randint(0, 1))
+            wrap = rng.choice(["greedy", "optimal"])
+            width = rng.randint(30, 400)
+            space = LUnit2(width, 1000)
+            paragraph = LayoutParagraph(text, measure=lambda x: 7*len(x), line_height=10, wrap=wrap)
+            paragraph.calculate(space, space)
+
+            words = text.split(" ")
+            i = rng.randrange(len(words))
+            match rng.randrange(3):
+                case 0: words[i] = rng.choice(vocab)
+                case 1: del words[i]
+                case 2: words.insert(i, rng.choice(vocab))
+            paragraph.set_text(" ".join(words))
+            paragraph.calculate(space, space)
+
+            # Wrapping again from the edit is the same as wrapping everything
+            fresh = LayoutParagraph(" ".join(words), measure=lambda x: 7*len(x), line_height=10, wrap=wrap)
+            fresh.calculate(space, space)
+            self.assertEqual(paragraph.lines(), fresh.lines())
+            self.assertEqual(paragraph.rendered, fresh.rendered)
+
+        # An edit near the end of a long paragraph only wraps the last lines again
+        text = " ".join(rng.choice(vocab) for _ in range(2000))
+        paragraph = LayoutParagraph(text, measure=lambda x: 7*len(x), line_height=10)
+        paragraph.calculate(LUnit2(300, 1000), LUnit2(300, 1000))
+        paragraph.set_text(text[:-20] + " edited " + text[-20:])
+        self.assertLess(paragraph.wrapped_words, 50)
+
+    @unittest.skipUnless(layout_numpy.available, "numpy is not installed")
+    def test_vectorized_engine(self):
+        def random_sequence(rng: random.Random, depth: int, vectorized: bool):
+            def unit():
+                unit = rng.choice(["px", "%", "f", "vw", "vh"])
+                val = rng.choice([1, 2, 0.5]) if unit == "f" else rng.uniform(0, 120)
+                return f"{val} {unit}"
+
+            children = []
+            for _ in range(rng.randint(1, 70)):
+                r = rng.random()
+                if depth > 0 and r < 0.1:
+                    children.append(random_sequence(rng, depth-1, vectorized))
+                elif r < 0.2:  # Layout objects that have their own render method
+                    children.append(CountingLayoutSimple(LUnit2(unit(), unit()), (rng.choice([None, 50]), None)))
+                else:
+                    children.append(LayoutSimple(LUnit2(unit(), unit()), (rng.choice([None, rng.uniform(0, 100)]), None)))
+
+            main_axis = rng.choice(["x", "y"])
+            return LayoutSequence(
+                LUnit2(unit(), unit()), main_axis=main_axis, cross_axis="y" if main_axis == "x" else "x",
+                main_axis_align=rng.choice(list(MainAxisAlignment)), cross_axis_align=rng.choice(list(CrossAxisAlignment)),
+                children=children, vectorized=vectorized
+            )
+
+        def flatten(layout):
+            r = [(layout.pos.as_float(), layout.rendered.as_float())]
+            for x in getattr(layout, "children", []):
+                r.extend(flatten(x))
+            return r
+
+        for seed in range(10):
+            results = []
+            for vectorized in (False, True):
+                rng = random.Random(seed)
+                root = random_sequence(rng, 2, vectorized)
+                space = LUnit2(rng.uniform(100, 3000), rng.uniform(100, 3000))
+                root.calculate(space, LUnit2(1000, 800))
+                first = flatten(root)
+
+                root.children[0].dim = LUnit2("33 px", "1 f")
+                root.calculate(space, LUnit2(900, 700))
+                results.append((first, flatten(root)))
 
-        show_shaderbounds(bounds)
\ No newline at end of file
+            self.assertEqual(results[0], results[1])